@@ -0,0 +1,297 @@
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import time
+import numpy as np
+from shared_arrays import SharedArrays
+from splendor_features import NUM_ACTIONS, OBS_SIZE
+from train_runner import ENV_TYPES
+
+# Same 2 x 64 tanh MLP as the SB3 MlpPolicy
+HIDDEN = 64
+
+
+def actor_param_shapes(obs_dim):
+    return [
+        ("fc0_w", (obs_dim, HIDDEN)), ("fc0_b", (HIDDEN,)),
+        ("fc1_w", (HIDDEN, HIDDEN)), ("fc1_b", (HIDDEN,)),
+        ("act_w", (HIDDEN, NUM_ACTIONS)), ("act_b", (NUM_ACTIONS,)),
+    ]
+
+
+def unflatten_params(flat, obs_dim):
+    params, i = {}, 0
+    for name, shape in actor_param_shapes(obs_dim):
+        size = int(np.prod(shape))
+        params[name] = flat[i:i + size].reshape(shape).copy()
+        i += size
+    return params
+
+
+def rollout_spec(num_slots, unroll, obs_dim):
+    return {
+        "obs": ((num_slots, unroll + 1, obs_dim), np.float32),  # +1: bootstrap observation
+        "mask": ((num_slots, unroll, NUM_ACTIONS), np.bool_),
+        "action": ((num_slots, unroll), np.int64),
+        "reward": ((num_slots, unroll), np.float32),
+        "done": ((num_slots, unroll), np.bool_),
+        "logp": ((num_slots, unroll), np.float32),
+    }
+
+
+def _actor_main(actor_id, cfg, rollout_names, weight_names, free_slots, full_slots, version, produced, stop):
+    import importlib
+    module_name, class_name = ENV_TYPES[cfg["env"]]
+    env = getattr(importlib.import_module(module_name), class_name)(num_players=4, opponent_model_path=cfg["opponent"])
+
+    obs_dim, unroll = cfg["obs_dim"], cfg["unroll"]
+    buf = SharedArrays(rollout_spec(cfg["num_slots"], unroll, obs_dim), rollout_names)
+    weights = SharedArrays({"flat": ((cfg["n_params"],), np.float32)}, weight_names)
+    rng = np.random.default_rng(cfg["seed"] + actor_id)
+
+    local_version = -1
+    params = None
+    obs, _ = env.reset(seed=cfg["seed"] + actor_id)
+    while not stop.is_set():
+        try:
+            slot = free_slots.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        # Pick up the newest snapshot between unrolls; the lock keeps the copy consistent
+        if version.value != local_version:
+            with version.get_lock():
+                params = unflatten_params(weights["flat"], obs_dim)
+                local_version = version.value
+
+        for t in range(unroll):
+            mask = np.asarray(env.action_masks(), dtype=bool)
+            x = np.tanh(obs @ params["fc0_w"] + params["fc0_b"])
+            x = np.tanh(x @ params["fc1_w"] + params["fc1_b"])
+            logits = np.where(mask, x @ params["act_w"] + params["act_b"], -1e8)
+            logits = logits - logits.max()
+            probs = np.exp(logits)
+            probs /= probs.sum()
+            action = int(rng.choice(NUM_ACTIONS, p=probs))
+
+            buf["obs"][slot, t] = obs
+            buf["mask"][slot, t] = mask
+            buf["action"][slot, t] = action
+            buf["logp"][slot, t] = np.log(probs[action] + 1e-12)
+
+            obs, reward, terminated, truncated, _ = env.step(action)
+            buf["reward"][slot, t] = reward
+            buf["done"][slot, t] = terminated or truncated
+            if terminated or truncated:
+                obs, _ = env.reset()
+        buf["obs"][slot, unroll] = obs
+
+        full_slots.put(slot)
+        with produced.get_lock():
+            produced.value += unroll
+
+    buf.close()
+    weights.close()
+
+
+def _take_full_slot(full_slots, procs, timeout=1.0):
+    """Next filled slot; raises instead of waiting forever once an actor has died (actors only exit on stop)."""
+    while True:
+        try:
+            return full_slots.get(timeout=timeout)
+        except queue.Empty:
+            dead = [(i, p.exitcode) for i, p in enumerate(procs) if not p.is_alive()]
+            if dead:
+                raise RuntimeError(f"Actor process(es) exited (actor, exit code): {dead}")
+
+
+def build_actor_critic(obs_dim):
+    import torch.nn as nn
+
+    class ActorCritic(nn.Module):
+        """Separate policy and value MLPs, like the SB3 MlpPolicy defaults."""
+        def __init__(self):
+            super().__init__()
+            self.fc0 = nn.Linear(obs_dim, HIDDEN)
+            self.fc1 = nn.Linear(HIDDEN, HIDDEN)
+            self.act = nn.Linear(HIDDEN, NUM_ACTIONS)
+            self.value_net = nn.Sequential(
+                nn.Linear(obs_dim, HIDDEN), nn.Tanh(), nn.Linear(HIDDEN, HIDDEN), nn.Tanh(), nn.Linear(HIDDEN, 1))
+
+        def forward(self, x):
+            h = self.fc1(self.fc0(x).tanh()).tanh()
+            return self.act(h), self.value_net(x).squeeze(-1)
+
+    return ActorCritic()
+
+
+def export_actor(net):
+    """Actor weights in LiteModel naming (x @ W layout)."""
+    params = {}
+    for layer in ["fc0", "fc1", "act"]:
+        mod = getattr(net, layer)
+        params[f"{layer}_w"] = mod.weight.detach().cpu().numpy().T.copy()
+        params[f"{layer}_b"] = mod.bias.detach().cpu().numpy().copy()
+    return params
+
+
+def vtrace(behavior_logp, target_logp, rewards, dones, values, bootstrap, gamma, rho_bar=1.0, c_bar=1.0):
+    """
+    V-trace targets (Espeholt et al. 2018) for [B, T] tensors.
+    Returns (vs, pg_advantages), both without gradient.
+    """
+    import torch as th
+    with th.no_grad():
+        rho = th.exp(target_logp - behavior_logp)
+        clipped_rho = th.clamp(rho, max=rho_bar)
+        c = th.clamp(rho, max=c_bar)
+        discounts = gamma * (~dones).float()
+
+        next_values = th.cat([values[:, 1:], bootstrap.unsqueeze(1)], dim=1)
+        deltas = clipped_rho * (rewards + discounts * next_values - values)
+
+        acc = th.zeros_like(bootstrap)
+        vs_minus_v = th.zeros_like(values)
+        for t in reversed(range(values.shape[1])):
+            acc = deltas[:, t] + discounts[:, t] * c[:, t] * acc
+            vs_minus_v[:, t] = acc
+        vs = vs_minus_v + values
+
+        next_vs = th.cat([vs[:, 1:], bootstrap.unsqueeze(1)], dim=1)
+        pg_adv = clipped_rho * (rewards + discounts * next_vs - values)
+    return vs, pg_adv
+
+
+def run(out_path="models/ai_4p_impala", env="p1", opponent="random", actors=4, unroll=64, batch_slots=8,
+        publish_every=1, total_samples=500_000, learning_rate=3e-4, gamma=0.99, ent_coef=0.01, vf_coef=0.5,
+        reward_scale=0.01, log_interval=10.0, seed=0):
+    """
+    IMPALA-style training: actors write unrolls into shared-memory slots (only slot
+    numbers go through the queues) and the learner corrects for policy lag with V-trace.
+    Runs `actors` actor processes and the learner in this process until
+    `total_samples` transitions have been consumed. Prints samples produced and
+    consumed per second every `log_interval` seconds and returns the final counters.
+    """
+    import torch as th
+    th.manual_seed(seed)
+
+    obs_dim = OBS_SIZE
+    num_slots = batch_slots * 2 + actors  # enough for one batch in training while actors keep filling
+    n_params = sum(int(np.prod(s)) for _, s in actor_param_shapes(obs_dim))
+    buf = SharedArrays(rollout_spec(num_slots, unroll, obs_dim))
+    weights = SharedArrays({"flat": ((n_params,), np.float32)})
+
+    net = build_actor_critic(obs_dim)
+    optimizer = th.optim.Adam(net.parameters(), lr=learning_rate)
+
+    ctx = mp.get_context("spawn")
+    free_slots, full_slots = ctx.Queue(), ctx.Queue()
+    for slot in range(num_slots):
+        free_slots.put(slot)
+    version = ctx.Value("i", -1)
+    produced = ctx.Value("q", 0)
+    stop = ctx.Event()
+
+    def publish():
+        flat = np.concatenate([v.ravel() for v in export_actor(net).values()])
+        with version.get_lock():
+            weights["flat"][:] = flat
+            version.value += 1
+
+    publish()
+    cfg = {"env": env, "opponent": opponent, "obs_dim": obs_dim, "unroll": unroll,
+           "num_slots": num_slots, "n_params": n_params, "seed": seed}
+    procs = [ctx.Process(target=_actor_main, daemon=True,
+                         args=(i, cfg, buf.names(), weights.names(), free_slots, full_slots, version, produced, stop))
+             for i in range(actors)]
+    for p in procs:
+        p.start()
+
+    consumed = 0
+    updates = 0
+    start = last_log = time.time()
+    last_produced = last_consumed = 0
+    try:
+        while consumed < total_samples:
+            slots = [_take_full_slot(full_slots, procs) for _ in range(batch_slots)]
+            batch = {k: th.as_tensor(np.array(buf[k][slots])) for k in ["obs", "mask", "action", "reward", "done", "logp"]}
+            for slot in slots:
+                free_slots.put(slot)
+
+            B, T = batch["action"].shape
+            logits, values = net(batch["obs"].reshape(B * (T + 1), obs_dim))
+            values = values.reshape(B, T + 1)
+            logits = logits.reshape(B, T + 1, NUM_ACTIONS)[:, :T].masked_fill(~batch["mask"], -1e8)
+            log_probs = th.log_softmax(logits, dim=-1)
+            target_logp = log_probs.gather(-1, batch["action"].unsqueeze(-1)).squeeze(-1)
+
+            vs, pg_adv = vtrace(batch["logp"], target_logp, batch["reward"] * reward_scale, batch["done"],
+                                values[:, :T].detach(), values[:, T].detach(), gamma)
+            policy_loss = -(pg_adv * target_logp).mean()
+            value_loss = 0.5 * ((vs - values[:, :T]) ** 2).mean()
+            probs = log_probs.exp()
+            entropy = -(probs * log_probs.clamp(min=-1e4)).sum(-1).mean()
+            loss = policy_loss + vf_coef * value_loss - ent_coef * entropy
+
+            optimizer.zero_grad()
+            loss.backward()
+            th.nn.utils.clip_grad_norm_(net.parameters(), 0.5)
+            optimizer.step()
+            updates += 1
+            consumed += B * T
+            if updates % publish_every == 0:
+                publish()
+
+            now = time.time()
+            if now - last_log >= log_interval:
+                dt = now - last_log
+                prod = produced.value
+                print(f"[{now - start:6.0f}s] updates {updates}, policy v{version.value}: "
+                      f"produced {(prod - last_produced) / dt:,.0f}/s, consumed {(consumed - last_consumed) / dt:,.0f}/s, "
+                      f"loss {loss.item():.3f}, entropy {entropy.item():.3f}")
+                last_log, last_produced, last_consumed = now, prod, consumed
+    finally:
+        stop.set()
+        for p in procs:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        buf.close()
+        weights.close()
+
+    elapsed = time.time() - start
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    np.savez_compressed(out_path, **export_actor(net))
+    stats = {
+        "updates": updates,
+        "samples_produced": produced.value,
+        "samples_consumed": consumed,
+        "produced_per_sec": produced.value / elapsed,
+        "consumed_per_sec": consumed / elapsed,
+    }
+    print(f"Done in {elapsed:.1f}s: {stats['produced_per_sec']:,.0f} samples/s produced, "
+          f"{stats['consumed_per_sec']:,.0f} samples/s consumed. Actor saved to {out_path}.npz")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Asynchronous actor-learner training")
+    parser.add_argument("--out", default="models/ai_4p_impala", help="Output path for the LiteModel .npz")
+    parser.add_argument("--env", choices=list(ENV_TYPES), default="p1")
+    parser.add_argument("--opponent", default="random")
+    parser.add_argument("--actors", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--unroll", type=int, default=64)
+    parser.add_argument("--batch-slots", type=int, default=8, help="Unrolls per learner update")
+    parser.add_argument("--publish-every", type=int, default=1, help="Publish weights every K updates")
+    parser.add_argument("--total-samples", type=int, default=500_000)
+    parser.add_argument("--lr", type=float, default=3e-4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    run(out_path=args.out, env=args.env, opponent=args.opponent, actors=args.actors, unroll=args.unroll,
+        batch_slots=args.batch_slots, publish_every=args.publish_every, total_samples=args.total_samples,
+        learning_rate=args.lr, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,40 +1,61 @@
 import numpy as np
+from obs_layout import players_for_obs_dim
 
 class LiteModel:
     def __init__(self, npz_path):
-        data = np.load(npz_path)
-        self.fc0_w = data['fc0_w']
-        self.fc0_b = data['fc0_b']
-        self.fc1_w = data['fc1_w']
-        self.fc1_b = data['fc1_b']
+        self._load(np.load(npz_path))
+
+    @classmethod
+    def from_params(cls, params):
+        """Builds a model from a dict of arrays in the .npz naming (see model_converter.extract_params)."""
+        model = cls.__new__(cls)
+        model._load(params)
+        return model
+
+    def _load(self, data):
+        # Hidden layers fc0, fc1, ... (converted PPO models have two, distilled students may have one)
+        self.layers = []
+        while f'fc{len(self.layers)}_w' in data:
+            i = len(self.layers)
+            self.layers.append((data[f'fc{i}_w'], data[f'fc{i}_b']))
         self.act_w = data['act_w']
         self.act_b = data['act_b']
-        
-    def predict(self, obs, action_masks=None, deterministic=True):
-        # Neural Network Forward Pass (MLP)
-        # Layer 0
-        x = np.tanh(obs @ self.fc0_w + self.fc0_b)
-        
-        # Layer 1
-        x = np.tanh(x @ self.fc1_w + self.fc1_b)
-        
+        self.obs_dim = self.layers[0][0].shape[0] if self.layers else self.act_w.shape[0]
+        # Player count the model was trained for (untagged padded models are 4p)
+        if 'num_players' in data:
+            self.num_players = int(data['num_players'])
+        else:
+            self.num_players = players_for_obs_dim(self.obs_dim) or 4
+
+    def logits(self, obs, action_masks=None):
+        """
+        Action logits; masked (invalid) actions get a very small number.
+        obs must be in the model's own layout (see obs_layout.to_model_layout).
+        """
+        x = obs
+
+        # Hidden layers (MLP, tanh)
+        for w, b in self.layers:
+            x = np.tanh(x @ w + b)
+
         # Output Layer (Logits)
         logits = x @ self.act_w + self.act_b
-        
+
         # Apply Action Mask
         if action_masks is not None:
             # Set invalid actions to a very small number (effectively -inf)
             HUGE_NEG = -1e8
-            # Assuming action_masks is boolean or 0/1 where 1 is valid
             # In SB3, mask=True means Valid.
-            # We want to keep valid logits, and squash invalid ones.
-            
             # Mask: [T, T, F, ...] -> [0, 0, -inf, ...]
-            # We construct a mask_penalty array
             mask_penalty = np.where(action_masks, 0.0, HUGE_NEG)
-            logits += mask_penalty
-            
+            logits = logits + mask_penalty
+        return logits
+
+    def predict(self, obs, action_masks=None, deterministic=True):
+        logits = self.logits(obs, action_masks)
+
         # Select Action (Argmax for deterministic)
-        action_idx = np.argmax(logits)
+        # Per row for batches, so (n, obs_dim) gives n actions like SB3
+        action_idx = np.argmax(logits, axis=-1)
         
         return action_idx, None # Return format matching SB3 (action, state)
@@ -0,0 +1,338 @@
+import argparse
+import math
+import multiprocessing as mp
+import os
+import random
+import time
+import numpy as np
+from game import Game
+from splendor_features import NUM_ACTIONS, OBS_SIZE, get_obs, get_action_mask, map_action
+
+HIDDEN = 64
+
+
+def apply_action(game, idx):
+    """Plays action `idx` for the current player. Like the tournament, a failed step passes the turn."""
+    try:
+        return game.step(map_action(idx, game, game.curr_player_idx))
+    except Exception:
+        game.next_turn()
+        return None
+
+
+def outcome(game, winner):
+    """Absolute per-seat result: one-hot winner, or an even split if nobody won."""
+    n = len(game.players)
+    if winner is None:
+        return np.full(n, 1.0 / n, dtype=np.float32)
+    v = np.zeros(n, dtype=np.float32)
+    v[game.players.index(winner)] = 1.0
+    return v
+
+
+def _softmax(x):
+    x = x - x.max(axis=-1, keepdims=True)
+    e = np.exp(x)
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+class NumpyPolicyValue:
+    """
+    Batched numpy forward pass of the exported weights (used by self-play workers).
+    Value head: one win probability per seat, in the observation's seat order (0 = player to move).
+    """
+    def __init__(self, params):
+        for k, v in params.items():
+            setattr(self, k, v)
+
+    def __call__(self, obs, masks):
+        x = np.tanh(obs @ self.fc0_w + self.fc0_b)
+        x = np.tanh(x @ self.fc1_w + self.fc1_b)
+        logits = x @ self.act_w + self.act_b
+        logits = np.where(masks, logits, -1e8)
+        return _softmax(logits), _softmax(x @ self.val_w + self.val_b)
+
+
+class Node:
+    """Search node. Edge statistics for all 52 actions live in the parent as arrays."""
+    __slots__ = ("game", "terminal", "priors", "mask", "children", "N", "W", "visits")
+
+    def __init__(self, game, terminal=None):
+        self.game = game
+        self.terminal = terminal      # absolute outcome vector if the game ended here
+        self.priors = None            # set on expansion
+        self.mask = None
+        self.children = {}
+        self.N = None
+        self.W = None
+        self.visits = 0
+
+    def expand(self, priors, mask, num_players):
+        self.priors = priors
+        self.mask = mask
+        self.N = np.zeros(NUM_ACTIONS, dtype=np.float32)
+        self.W = np.zeros((NUM_ACTIONS, num_players), dtype=np.float32)
+
+    def select_action(self, c_puct):
+        p = self.game.curr_player_idx
+        n_players = self.W.shape[1]
+        # Unvisited edges start at an even share of the win probability
+        q = np.where(self.N > 0, self.W[:, p] / np.maximum(self.N, 1), 1.0 / n_players)
+        u = c_puct * self.priors * math.sqrt(self.visits + 1) / (1 + self.N)
+        score = np.where(self.mask, q + u, -np.inf)
+        return int(np.argmax(score))
+
+
+class GameSearch:
+    """One MCTS tree for the current position of one self-play game."""
+    def __init__(self, game, c_puct, turn_limit, rng=None):
+        self.c_puct = c_puct
+        self.turn_limit = turn_limit
+        root_game = game.clone()
+        # The search must not know the hidden deck order
+        for tier in root_game.decks:
+            (rng or random).shuffle(root_game.decks[tier])
+        self.root = Node(root_game)
+
+    def select_leaf(self):
+        node = self.root
+        path = []
+        while node.terminal is None and node.priors is not None:
+            a = node.select_action(self.c_puct)
+            path.append((node, a))
+            child = node.children.get(a)
+            if child is None:
+                g = node.game.clone()
+                winner = apply_action(g, a)
+                ended = winner is not None or g.turn_count >= self.turn_limit
+                child = Node(g, outcome(g, winner) if ended else None)
+                node.children[a] = child
+            node = child
+        return path, node
+
+    @staticmethod
+    def backup(path, value):
+        for node, a in path:
+            node.N[a] += 1
+            node.W[a] += value
+            node.visits += 1
+
+
+def _relative_to_absolute(v_rel, p_idx):
+    return np.roll(v_rel, p_idx)
+
+
+def self_play(params, num_games, simulations=64, c_puct=1.5, temp_moves=30, dirichlet_alpha=0.3,
+              noise_frac=0.25, turn_limit=200, num_players=4, seed=None):
+    """
+    Plays `num_games` games concurrently. Every simulation round selects one leaf
+    per unfinished game and evaluates all of them in a single batched forward pass.
+    Returns training samples (obs, mask, pi, z) where z is relative to the player to move.
+    Deals, deck reshuffles, noise and move sampling come from private RNGs seeded with `seed`.
+    """
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    net = NumpyPolicyValue(params)
+    games = [Game(p_count=num_players, rng=rng) for _ in range(num_games)]
+    histories = [[] for _ in range(num_games)]
+    active = list(range(num_games))
+    samples = []
+    n_evals = 0
+
+    while active:
+        searches = {g: GameSearch(games[g], c_puct, turn_limit, rng) for g in active}
+        for sim in range(simulations):
+            pending = []
+            for g, search in searches.items():
+                path, leaf = search.select_leaf()
+                if leaf.terminal is not None:
+                    search.backup(path, leaf.terminal)
+                else:
+                    pending.append((search, path, leaf))
+            if not pending:
+                continue
+
+            obs = np.stack([get_obs(leaf.game, leaf.game.curr_player_idx) for _, _, leaf in pending])
+            masks = np.array([get_action_mask(leaf.game, leaf.game.curr_player_idx) for _, _, leaf in pending])
+            priors, values = net(obs, masks)
+            n_evals += 1
+
+            for i, (search, path, leaf) in enumerate(pending):
+                p = priors[i]
+                if leaf is search.root:
+                    noise = np_rng.dirichlet([dirichlet_alpha] * int(masks[i].sum()))
+                    p = p.copy()
+                    p[masks[i]] = (1 - noise_frac) * p[masks[i]] + noise_frac * noise
+                leaf.expand(p, masks[i], num_players)
+                search.backup(path, _relative_to_absolute(values[i], leaf.game.curr_player_idx))
+
+        for g in list(active):
+            game = games[g]
+            root = searches[g].root
+            p_idx = game.curr_player_idx
+            # With a single simulation only the root was evaluated; fall back to its priors
+            pi = root.N / root.N.sum() if root.N.sum() > 0 else root.priors
+            if len(histories[g]) < temp_moves:
+                action = int(np_rng.choice(NUM_ACTIONS, p=pi))
+            else:
+                action = int(np.argmax(pi))
+            histories[g].append((get_obs(game, p_idx), np.array(root.mask), pi, p_idx))
+
+            winner = apply_action(game, action)
+            if winner is not None or game.turn_count >= turn_limit:
+                result = outcome(game, winner)
+                for obs, mask, pi, player in histories[g]:
+                    samples.append((obs, mask, pi, np.roll(result, -player)))
+                active.remove(g)
+
+    return samples, n_evals
+
+
+class ReplayBuffer:
+    """Fixed-size ring buffer of (obs, mask, pi, z) samples."""
+    def __init__(self, capacity, obs_dim=OBS_SIZE, num_players=4):
+        self.capacity = capacity
+        self.obs = np.zeros((capacity, obs_dim), dtype=np.float32)
+        self.mask = np.zeros((capacity, NUM_ACTIONS), dtype=bool)
+        self.pi = np.zeros((capacity, NUM_ACTIONS), dtype=np.float32)
+        self.z = np.zeros((capacity, num_players), dtype=np.float32)
+        self.pos = 0
+        self.size = 0
+
+    def add(self, samples):
+        for obs, mask, pi, z in samples:
+            i = self.pos
+            self.obs[i], self.mask[i], self.pi[i], self.z[i] = obs, mask, pi, z
+            self.pos = (self.pos + 1) % self.capacity
+            self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batch_size, rng):
+        idx = rng.integers(0, self.size, size=batch_size)
+        return self.obs[idx], self.mask[idx], self.pi[idx], self.z[idx]
+
+
+def build_net(obs_dim=OBS_SIZE, num_players=4):
+    import torch.nn as nn
+
+    class PolicyValueNet(nn.Module):
+        """Same actor as the SB3 MlpPolicy (2 x 64 tanh) plus a per-seat value head on its trunk."""
+        def __init__(self):
+            super().__init__()
+            self.fc0 = nn.Linear(obs_dim, HIDDEN)
+            self.fc1 = nn.Linear(HIDDEN, HIDDEN)
+            self.act = nn.Linear(HIDDEN, NUM_ACTIONS)
+            self.val = nn.Linear(HIDDEN, num_players)
+
+        def forward(self, x):
+            h = (self.fc1(self.fc0(x).tanh())).tanh()
+            return self.act(h), self.val(h)
+
+    return PolicyValueNet()
+
+
+def export_params(net):
+    """Weights in LiteModel naming (x @ W layout); val_* is ignored by LiteModel."""
+    def to_np(t):
+        return t.detach().cpu().numpy()
+    params = {}
+    for layer in ["fc0", "fc1", "act", "val"]:
+        mod = getattr(net, layer)
+        params[f"{layer}_w"] = to_np(mod.weight).T.copy()
+        params[f"{layer}_b"] = to_np(mod.bias).copy()
+    return params
+
+
+def train_steps(net, optimizer, buffer, steps, batch_size, rng):
+    import torch as th
+    import torch.nn.functional as F
+
+    total_p, total_v = 0.0, 0.0
+    for _ in range(steps):
+        obs, mask, pi, z = (th.as_tensor(a) for a in buffer.sample(batch_size, rng))
+        logits, v_logits = net(obs)
+        logits = logits.masked_fill(~mask, -1e8)
+        policy_loss = -(pi * F.log_softmax(logits, dim=1)).sum(dim=1).mean()
+        value_loss = -(z * F.log_softmax(v_logits, dim=1)).sum(dim=1).mean()
+        loss = policy_loss + value_loss
+
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+        total_p += policy_loss.item()
+        total_v += value_loss.item()
+    return total_p / steps, total_v / steps
+
+
+def _self_play_task(args):
+    params, num_games, kwargs = args
+    return self_play(params, num_games, **kwargs)
+
+
+def run_pipeline(out_dir="models/az", iterations=10, workers=4, games_per_worker=16, simulations=64,
+                 train_steps_per_iter=200, batch_size=256, learning_rate=1e-3, buffer_size=200_000, seed=0):
+    import torch as th
+    th.manual_seed(seed)
+    os.makedirs(out_dir, exist_ok=True)
+
+    net = build_net()
+    optimizer = th.optim.Adam(net.parameters(), lr=learning_rate, weight_decay=1e-4)
+    start_iter = 0
+    state_path = os.path.join(out_dir, "az_latest.pt")
+    if os.path.exists(state_path):
+        state = th.load(state_path)
+        net.load_state_dict(state["net"])
+        optimizer.load_state_dict(state["optimizer"])
+        start_iter = state["iteration"] + 1
+        print(f"Resuming from iteration {start_iter}")
+
+    buffer = ReplayBuffer(buffer_size)
+    rng = np.random.default_rng(seed)
+    pool = mp.get_context("spawn").Pool(workers)
+
+    try:
+        for it in range(start_iter, iterations):
+            start = time.time()
+            params = export_params(net)
+            tasks = [(params, games_per_worker, {"simulations": simulations, "seed": seed * 100003 + it * workers + w})
+                     for w in range(workers)]
+            n_games = workers * games_per_worker
+            n_evals = 0
+            for samples, evals in pool.imap_unordered(_self_play_task, tasks):
+                buffer.add(samples)
+                n_evals += evals
+            play_time = time.time() - start
+
+            policy_loss, value_loss = train_steps(net, optimizer, buffer, train_steps_per_iter, batch_size, rng)
+
+            npz_path = os.path.join(out_dir, f"az_{it:04d}.npz")
+            np.savez_compressed(npz_path, **export_params(net))
+            th.save({"net": net.state_dict(), "optimizer": optimizer.state_dict(), "iteration": it}, state_path)
+            print(f"Iter {it}: {n_games} games in {play_time:.1f}s ({n_evals} batched evals), "
+                  f"buffer {buffer.size}, policy loss {policy_loss:.3f}, value loss {value_loss:.3f} -> {npz_path}")
+    finally:
+        pool.close()
+        pool.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AlphaZero-style self-play training")
+    parser.add_argument("--out-dir", default="models/az")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--games-per-worker", type=int, default=16, help="Concurrent games (= leaf batch size) per worker")
+    parser.add_argument("--simulations", type=int, default=64)
+    parser.add_argument("--train-steps", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--buffer-size", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    run_pipeline(out_dir=args.out_dir, iterations=args.iterations, workers=args.workers,
+                 games_per_worker=args.games_per_worker, simulations=args.simulations,
+                 train_steps_per_iter=args.train_steps, batch_size=args.batch_size,
+                 learning_rate=args.lr, buffer_size=args.buffer_size, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+import csv
+import io
+import json
+import multiprocessing as mp
+import os
+import queue
+import random
+import time
+from stable_baselines3.common.callbacks import BaseCallback
+
+EVAL_CSV = "eval.csv"
+EVAL_FIELDS = ["num_timesteps", "checkpoint", "win_rate_vs_random", "win_rate_vs_best", "is_best", "eval_seconds"]
+
+
+def play_match_set(candidate, opponent, games_per_seat, seed, turn_limit=200, num_players=4):
+    """
+    Plays the candidate in every seat against num_players - 1 copies of `opponent`.
+    Game i is dealt from seed + i and its random moves come from a private stream,
+    so every candidate sees the same deals and the random module is left alone.
+    Returns the candidate's win rate.
+    """
+    from evaluate_models import play_game
+
+    wins = 0
+    total = 0
+    for seat in range(num_players):
+        seat_map = {s: (candidate if s == seat else opponent) for s in range(num_players)}
+        for g in range(games_per_seat):
+            game_seed = seed + seat * games_per_seat + g
+            rng = random.Random(f"{game_seed}-moves")
+            if play_game(seat_map, turn_limit=turn_limit, deal_seed=game_seed, rng=rng) == seat:
+                wins += 1
+            total += 1
+    return wins / total
+
+
+def _write_bytes_atomic(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _open_summary_writer(log_dir):
+    try:
+        from torch.utils.tensorboard import SummaryWriter
+    except ImportError:
+        print("tensorboard not found, evaluation results go to eval.csv only.")
+        return None
+    return SummaryWriter(os.path.join(log_dir, "eval"))
+
+
+def _evaluator_main(jobs, config):
+    """Evaluator process: pulls (checkpoint bytes, timesteps) until it gets None."""
+    import torch
+    torch.set_num_threads(config["threads"])
+    from evaluate_models import ModelWrapper
+
+    log_dir = config["log_dir"]
+    model_dir = config["model_dir"]
+    writer = _open_summary_writer(log_dir)
+    random_bot = ModelWrapper("random")
+
+    csv_path = os.path.join(log_dir, EVAL_CSV)
+    new_file = not os.path.exists(csv_path)
+    csv_file = open(csv_path, "a", newline="")
+    csv_writer = csv.DictWriter(csv_file, fieldnames=EVAL_FIELDS)
+    if new_file:
+        csv_writer.writeheader()
+
+    best = None
+    best_path = os.path.join(model_dir, "best.zip")
+    if os.path.exists(best_path):
+        best = ModelWrapper("best", best_path)
+
+    while True:
+        item = jobs.get()
+        if item is None:
+            break
+        data, num_timesteps, ckpt_path = item
+
+        start = time.time()
+        candidate = ModelWrapper(f"ckpt_{num_timesteps}", io.BytesIO(data))
+        seed = config["seed"]
+        games = config["games_per_seat"]
+        limit = config["turn_limit"]
+        num_players = config["num_players"]
+
+        wr_random = play_match_set(candidate, random_bot, games, seed, limit, num_players)
+        # A model equal to the best wins 1/num_players of the games against copies of it
+        wr_best = play_match_set(candidate, best, games, seed, limit, num_players) if best else None
+        is_best = best is None or wr_best > 1.0 / num_players
+
+        if is_best:
+            _write_bytes_atomic(best_path, data)
+            with open(os.path.join(model_dir, "best.json"), "w") as f:
+                json.dump({"checkpoint": ckpt_path, "num_timesteps": num_timesteps,
+                           "win_rate_vs_random": wr_random, "win_rate_vs_best": wr_best}, f, indent=2)
+            best = candidate
+
+        elapsed = time.time() - start
+        if writer:
+            writer.add_scalar("eval/win_rate_vs_random", wr_random, num_timesteps)
+            if wr_best is not None:
+                writer.add_scalar("eval/win_rate_vs_best", wr_best, num_timesteps)
+            writer.add_scalar("eval/is_best", int(is_best), num_timesteps)
+            writer.flush()
+        csv_writer.writerow({
+            "num_timesteps": num_timesteps, "checkpoint": ckpt_path,
+            "win_rate_vs_random": wr_random, "win_rate_vs_best": wr_best,
+            "is_best": int(is_best), "eval_seconds": round(elapsed, 2),
+        })
+        csv_file.flush()
+        best_str = "n/a" if wr_best is None else f"{wr_best:.2%}"
+        print(f"[eval] {num_timesteps} steps: vs random {wr_random:.2%}, vs best {best_str}"
+              f"{' (new best)' if is_best else ''} in {elapsed:.1f}s")
+
+    csv_file.close()
+    if writer:
+        writer.close()
+
+
+class BackgroundEvalCallback(BaseCallback):
+    """
+    Hands every new checkpoint to a separate evaluator process.
+
+    Register `on_checkpoint` with checkpoints.CheckpointCallback(on_save=[...]).
+    The checkpoint is read into memory and queued without waiting, so the learner
+    never blocks and checkpoint retention can delete the file at any time.
+    The evaluator plays a fixed-seed match set against random bots and against
+    the previous best checkpoint (models/<name>/best.zip), and logs the win
+    rates under <log_dir>/eval for TensorBoard and to <log_dir>/eval.csv.
+    """
+    def __init__(self, log_dir, model_dir, games_per_seat=10, seed=0, turn_limit=200, threads=1, num_players=4,
+                 verbose=1):
+        super().__init__(verbose)
+        self.config = {
+            "log_dir": log_dir,
+            "model_dir": model_dir,
+            "games_per_seat": games_per_seat,
+            "seed": seed,
+            "turn_limit": turn_limit,
+            "threads": threads,
+            "num_players": num_players,
+        }
+        self.jobs = None
+        self.process = None
+
+    def _on_training_start(self):
+        ctx = mp.get_context("spawn")
+        self.jobs = ctx.Queue()
+        self.process = ctx.Process(target=_evaluator_main, args=(self.jobs, self.config))
+        self.process.start()
+
+    def _on_step(self):
+        return True
+
+    def on_checkpoint(self, path, num_timesteps):
+        if self.jobs is None:
+            return
+        with open(path, "rb") as f:
+            data = f.read()
+        try:
+            self.jobs.put_nowait((data, num_timesteps, path))
+        except queue.Full:
+            print(f"Evaluator queue full, skipping checkpoint {path}")
+
+    def _on_training_end(self):
+        # Training is over, so waiting here costs the learner nothing; it also
+        # makes sure the final checkpoint gets evaluated before the job exits.
+        if self.jobs is None:
+            return
+        self.jobs.put_nowait(None)
+        if self.verbose:
+            print("Waiting for background evaluation to finish...")
+        self.process.join()
+        self.jobs.close()
+        self.jobs = None
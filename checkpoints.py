@@ -0,0 +1,147 @@
+import json
+import os
+import re
+from stable_baselines3.common.callbacks import BaseCallback
+
+CKPT_PREFIX = "ckpt_"
+CKPT_RE = re.compile(r"^ckpt_(\d+)\.zip$")
+LATEST_FILE = "latest.json"
+
+
+def _fsync_replace(tmp_path, path):
+    os.replace(tmp_path, path)
+    # Make the rename itself durable where the platform allows it
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def atomic_save_model(model, path):
+    """Saves an SB3 model (weights + optimizer state + counters) so `path` is never half-written."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        model.save(f)
+        f.flush()
+        os.fsync(f.fileno())
+    _fsync_replace(tmp_path, path)
+
+
+def atomic_write_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    _fsync_replace(tmp_path, path)
+
+
+def checkpoint_path(ckpt_dir, num_timesteps):
+    return os.path.join(ckpt_dir, f"{CKPT_PREFIX}{num_timesteps:012d}.zip")
+
+
+def list_checkpoints(ckpt_dir):
+    """Returns [(num_timesteps, path), ...] sorted by timestep."""
+    if not os.path.isdir(ckpt_dir):
+        return []
+    found = []
+    for fname in os.listdir(ckpt_dir):
+        m = CKPT_RE.match(fname)
+        if m:
+            found.append((int(m.group(1)), os.path.join(ckpt_dir, fname)))
+    return sorted(found)
+
+
+def latest_checkpoint(ckpt_dir):
+    """Returns the path of the newest complete checkpoint, or None."""
+    latest = os.path.join(ckpt_dir, LATEST_FILE)
+    if os.path.exists(latest):
+        try:
+            with open(latest) as f:
+                path = json.load(f)["path"]
+            if os.path.exists(path):
+                return path
+        except (OSError, ValueError, KeyError):
+            pass
+    ckpts = list_checkpoints(ckpt_dir)
+    return ckpts[-1][1] if ckpts else None
+
+
+def remove_stale_tmp_files(ckpt_dir):
+    """Deletes leftovers of saves that were interrupted by a crash."""
+    if not os.path.isdir(ckpt_dir):
+        return
+    for fname in os.listdir(ckpt_dir):
+        if fname.endswith(".tmp"):
+            os.remove(os.path.join(ckpt_dir, fname))
+
+
+class CheckpointCallback(BaseCallback):
+    """
+    Saves a checkpoint every `save_freq` timesteps and once more when training ends.
+
+    Checkpoints are taken at the start of a rollout, right after the PPO update,
+    so a resumed run (`learn(..., reset_num_timesteps=False)`) continues from a
+    clean update boundary with the same optimizer state, update counter and
+    learning-rate/clip schedule progress.
+
+    Retention: the newest `keep_last` checkpoints (at least one) are kept, plus
+    every checkpoint whose timestep is a multiple of `keep_every` (if given).
+    Everything else is deleted.
+
+    `on_save` callables are invoked with (path, num_timesteps) after each save.
+    """
+    def __init__(self, ckpt_dir, save_freq, keep_last=3, keep_every=None, on_save=None, verbose=1):
+        super().__init__(verbose)
+        self.ckpt_dir = ckpt_dir
+        self.save_freq = save_freq
+        self.keep_last = keep_last
+        self.keep_every = keep_every
+        self.on_save = list(on_save or [])
+        self.last_saved = 0
+
+    def _init_callback(self):
+        os.makedirs(self.ckpt_dir, exist_ok=True)
+        remove_stale_tmp_files(self.ckpt_dir)
+
+    def _on_training_start(self):
+        self.last_saved = self.num_timesteps
+
+    def _on_rollout_start(self):
+        if self.save_freq and self.num_timesteps - self.last_saved >= self.save_freq:
+            self.save()
+
+    def _on_step(self):
+        return True
+
+    def _on_training_end(self):
+        if self.num_timesteps != self.last_saved or not list_checkpoints(self.ckpt_dir):
+            self.save()
+
+    def save(self):
+        path = checkpoint_path(self.ckpt_dir, self.num_timesteps)
+        atomic_save_model(self.model, path)
+        atomic_write_json(os.path.join(self.ckpt_dir, LATEST_FILE), {
+            "path": path,
+            "num_timesteps": self.num_timesteps,
+            "total_timesteps": self.model._total_timesteps,
+        })
+        self.last_saved = self.num_timesteps
+        if self.verbose:
+            print(f"Checkpoint saved: {path}")
+
+        self._prune()
+        for fn in self.on_save:
+            fn(path, self.num_timesteps)
+
+    def _prune(self):
+        ckpts = list_checkpoints(self.ckpt_dir)
+        keep = set(path for _, path in ckpts[-max(1, self.keep_last):])
+        for steps, path in ckpts:
+            if path in keep:
+                continue
+            if self.keep_every and steps % self.keep_every == 0:
+                continue
+            os.remove(path)
@@ -0,0 +1,72 @@
+import argparse
+import numpy as np
+from gymnasium import spaces
+from sb3_contrib.common.maskable.buffers import MaskableRolloutBuffer
+# The layout helpers live in the torch-free obs_layout (ai_lite needs them); re-exported here
+from obs_layout import PADDED_OBS_SIZE, compact_obs_size, players_for_obs_dim
+
+
+def make_observation_space(num_players, compact=False):
+    """
+    Compact observations are uint8 (every feature is a small non-negative integer)
+    and trimmed to the player count. SB3 widens them to float at the network input
+    (preprocess_obs calls .float() on Box observations).
+    """
+    if compact:
+        return spaces.Box(low=0, high=255, shape=(compact_obs_size(num_players),), dtype=np.uint8)
+    return spaces.Box(low=-1, high=100, shape=(PADDED_OBS_SIZE,), dtype=np.float32)
+
+
+class CompactMaskableRolloutBuffer(MaskableRolloutBuffer):
+    """
+    MaskableRolloutBuffer that stores observations in the observation space dtype,
+    action masks as bool and actions as uint8 instead of float32/int64.
+    Samples are widened on the way to torch (masks are cast to bool and actions
+    to long by MaskablePPO itself), so training is unchanged.
+    Pass it as MaskablePPO(..., rollout_buffer_class=CompactMaskableRolloutBuffer).
+    """
+    def reset(self):
+        super().reset()
+        self.observations = np.zeros((self.buffer_size, self.n_envs, *self.obs_shape), dtype=self.observation_space.dtype)
+        self.action_masks = np.ones((self.buffer_size, self.n_envs, self.mask_dims), dtype=bool)
+        if isinstance(self.action_space, spaces.Discrete) and self.action_space.n <= 256:
+            self.actions = np.zeros((self.buffer_size, self.n_envs, self.action_dim), dtype=np.uint8)
+
+
+def buffer_nbytes(buffer):
+    """Bytes held by the per-step arrays of a rollout buffer."""
+    names = ["observations", "actions", "rewards", "returns", "episode_starts",
+             "values", "log_probs", "advantages", "action_masks"]
+    return {name: buffer.__dict__[name].nbytes for name in names}
+
+
+def memory_report(n_steps, num_envs, num_players=4):
+    """Allocates both buffer kinds for n_steps x num_envs and returns their measured sizes."""
+    action_space = spaces.Discrete(52)
+    legacy = MaskableRolloutBuffer(n_steps, make_observation_space(num_players), action_space,
+                                   device="cpu", n_envs=num_envs)
+    compact = CompactMaskableRolloutBuffer(n_steps, make_observation_space(num_players, compact=True),
+                                           action_space, device="cpu", n_envs=num_envs)
+    return buffer_nbytes(legacy), buffer_nbytes(compact)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure rollout buffer memory for padded vs compact observations")
+    parser.add_argument("--n-steps", type=int, default=2048)
+    parser.add_argument("--num-envs", type=int, nargs="*", default=[1, 8, 64])
+    parser.add_argument("--players", type=int, default=4)
+    args = parser.parse_args()
+
+    mb = 1024 * 1024
+    print(f"Observation: padded float32 x {PADDED_OBS_SIZE} -> uint8 x {compact_obs_size(args.players)} "
+          f"({args.players} players)")
+    print(f"{'n_steps x envs':<16} | {'obs (MB)':<20} | {'total (MB)':<20} | {'saved':<6}")
+    for num_envs in args.num_envs:
+        legacy, compact = memory_report(args.n_steps, num_envs, args.players)
+        lo, co = legacy["observations"] / mb, compact["observations"] / mb
+        lt, ct = sum(legacy.values()) / mb, sum(compact.values()) / mb
+        print(f"{args.n_steps:>6} x {num_envs:<7} | {lo:8.1f} -> {co:7.1f} | {lt:8.1f} -> {ct:7.1f} | {lt / ct:4.1f}x")
+
+
+if __name__ == "__main__":
+    main()
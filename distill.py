@@ -0,0 +1,166 @@
+import argparse
+import time
+import numpy as np
+import torch as th
+from ai_lite import LiteModel
+from obs_layout import PADDED_OBS_SIZE, compact_obs_size, to_model_layout
+from trajectory_recorder import TrajectoryDataset
+
+HUGE_NEG = -1e8
+
+
+def _fit_obs(obs, num_players, model):
+    """
+    Recorded observations of num_players games -> float32 rows in the model's layout.
+    Padded rows are cut to their compact part first, then remapped (see obs_layout.to_model_layout).
+    """
+    if obs.shape[1] == PADDED_OBS_SIZE:
+        obs = obs[:, :compact_obs_size(num_players)]
+    return to_model_layout(obs, model.num_players, model.obs_dim).astype(np.float32)
+
+
+def load_teacher(path):
+    """Returns (fn(obs, masks) -> masked logits as a float32 array, LiteModel of the teacher); obs in the teacher's layout."""
+    from evaluate_models import load_model
+    lite = load_model(path, backend="lite")
+
+    def teacher_logits(obs, masks):
+        return lite.logits(obs, masks).astype(np.float32)
+    return teacher_logits, lite
+
+
+def build_student(obs_dim, hidden, n_actions=52):
+    """Tanh MLP with the given hidden sizes (e.g. [32] or [32, 32]), same shape family as the PPO actor."""
+    layers = []
+    in_dim = obs_dim
+    for size in hidden:
+        layers += [th.nn.Linear(in_dim, size), th.nn.Tanh()]
+        in_dim = size
+    layers.append(th.nn.Linear(in_dim, n_actions))
+    return th.nn.Sequential(*layers)
+
+
+def export_student(student):
+    """Student weights in LiteModel naming (x @ W layout)."""
+    linears = [m for m in student if isinstance(m, th.nn.Linear)]
+    params = {}
+    for i, layer in enumerate(linears[:-1]):
+        params[f"fc{i}_w"] = layer.weight.detach().cpu().numpy().T
+        params[f"fc{i}_b"] = layer.bias.detach().cpu().numpy()
+    params["act_w"] = linears[-1].weight.detach().cpu().numpy().T
+    params["act_b"] = linears[-1].bias.detach().cpu().numpy()
+    return params
+
+
+def masked_kl(student_logits, teacher_logits, masks, temperature=1.0):
+    """KL(teacher || student) over the valid actions, averaged over the batch."""
+    penalty = th.where(masks, 0.0, HUGE_NEG)
+    t_logp = th.log_softmax((teacher_logits + penalty) / temperature, dim=1)
+    s_logp = th.log_softmax((student_logits + penalty) / temperature, dim=1)
+    # Masked actions have zero teacher probability and contribute nothing
+    kl = (t_logp.exp() * (t_logp - s_logp)).masked_fill(~masks, 0.0).sum(dim=1)
+    return kl.mean() * temperature ** 2
+
+
+def agreement(a, b, obs, masks, batch_size=4096):
+    """Share of rows where the two LiteModels pick the same (masked argmax) action."""
+    same = 0
+    for start in range(0, len(obs), batch_size):
+        o, m = obs[start:start + batch_size], masks[start:start + batch_size]
+        same += (a.logits(o, m).argmax(axis=1) == b.logits(o, m).argmax(axis=1)).sum()
+    return same / max(1, len(obs))
+
+
+def latency_us(model, obs, masks, n=2000):
+    """Mean microseconds per single-observation predict(), the way the server calls it."""
+    n = min(n, len(obs))
+    start = time.perf_counter()
+    for i in range(n):
+        model.predict(obs[i], action_masks=masks[i])
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def distill(teacher_path, data_dir, output, hidden=(32,), epochs=5, batch_size=512, learning_rate=1e-3,
+            temperature=1.0, val_fraction=0.05, seed=0):
+    """
+    Trains a small student MLP to match the teacher's masked action distribution on
+    recorded observations and saves it as a LiteModel .npz. Returns a report dict
+    with teacher/student agreement and per-move latency.
+    """
+    th.manual_seed(seed)
+    teacher_logits, teacher = load_teacher(teacher_path)
+    dataset = TrajectoryDataset(data_dir)
+    print(f"Loaded {len(dataset)} transitions from {len(dataset.shards)} shard(s) "
+          f"({dataset.obs_dtype.name} x {dataset.obs_dim})")
+
+    # The student reads the teacher's layout, so it drops into the same places
+    obs_dim = teacher.obs_dim
+    data_players = dataset.num_players
+    student = build_student(obs_dim, list(hidden))
+    optimizer = th.optim.Adam(student.parameters(), lr=learning_rate)
+
+    # Hold out the most recent rows; neighbouring rows come from the same games
+    n_val = max(1, int(len(dataset) * val_fraction))
+    train_idx = np.arange(len(dataset) - n_val)
+    val_idx = np.arange(len(dataset) - n_val, len(dataset))
+
+    for epoch in range(epochs):
+        total_loss, n_batches = 0.0, 0
+        for batch in dataset.iter_epoch(batch_size, seed=seed + epoch, indices=train_idx):
+            obs = _fit_obs(batch["obs"], data_players, teacher)
+            masks = batch["mask"]
+            target = th.as_tensor(teacher_logits(obs, masks))
+            loss = masked_kl(student(th.as_tensor(obs)), target, th.as_tensor(masks), temperature)
+
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total_loss += loss.item()
+            n_batches += 1
+        print(f"Epoch {epoch + 1}/{epochs}: KL {total_loss / max(1, n_batches):.4f}")
+
+    params = export_student(student)
+    n_student_params = sum(v.size for v in params.values())
+    params["num_players"] = np.array(teacher.num_players)
+    np.savez_compressed(output, **params)
+    student_lite = LiteModel.from_params(params)
+
+    val = dataset.gather(val_idx)
+    val_obs = _fit_obs(val["obs"], data_players, teacher)
+    val_masks = val["mask"]
+    report = {
+        "agreement": float(agreement(teacher, student_lite, val_obs, val_masks)),
+        "teacher_us": latency_us(teacher, val_obs, val_masks),
+        "student_us": latency_us(student_lite, val_obs, val_masks),
+        "teacher_params": sum(w.size + b.size for w, b in teacher.layers) + teacher.act_w.size + teacher.act_b.size,
+        "student_params": n_student_params,
+    }
+    print(f"\nSaved student to {output}")
+    print(f"Agreement with teacher (held-out argmax): {report['agreement']:.2%} on {len(val_idx)} rows")
+    print(f"Per-move latency: teacher {report['teacher_us']:.1f} us, student {report['student_us']:.1f} us "
+          f"({report['teacher_us'] / report['student_us']:.2f}x faster)")
+    print(f"Parameters: teacher {report['teacher_params']}, student {report['student_params']}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distill a policy into a smaller LiteModel student")
+    parser.add_argument("teacher", help="Teacher model (.zip or LiteModel .npz)")
+    parser.add_argument("data_dir", help="Directory written by TrajectoryRecorder (searched recursively)")
+    parser.add_argument("output", help="Output .npz path, e.g. models/ai_4p_p1_small.npz")
+    parser.add_argument("--hidden", type=int, nargs="+", default=[32], help="Hidden layer sizes, e.g. 32 or 32 32")
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=512)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--temperature", type=float, default=1.0)
+    parser.add_argument("--val-fraction", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    distill(args.teacher, args.data_dir, args.output, hidden=args.hidden, epochs=args.epochs,
+            batch_size=args.batch_size, learning_rate=args.lr, temperature=args.temperature,
+            val_fraction=args.val_fraction, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import time
+from stable_baselines3.common.callbacks import BaseCallback
+
+# Phases measured inside SplendorEnv.step and reset
+PHASES = ["reset", "agent_step", "opp_obs", "opp_mask", "opp_predict", "opp_apply", "reward", "final_obs"]
+
+
+class PhaseTimer:
+    """
+    Accumulates wall time per phase.
+    mark() starts the clock, lap(phase) charges the time since the last mark/lap to `phase`.
+    """
+    def __init__(self):
+        self.totals = dict.fromkeys(PHASES, 0.0)
+        self.agent_steps = 0
+        self.opponent_moves = 0
+        self.resets = 0
+        self._last = 0.0
+
+    def mark(self):
+        self._last = time.perf_counter()
+
+    def lap(self, phase):
+        now = time.perf_counter()
+        self.totals[phase] += now - self._last
+        self._last = now
+
+    def pop(self):
+        """Returns the accumulated numbers and starts a new window."""
+        data = {
+            "totals": dict(self.totals),
+            "agent_steps": self.agent_steps,
+            "opponent_moves": self.opponent_moves,
+            "resets": self.resets,
+        }
+        self.totals = dict.fromkeys(PHASES, 0.0)
+        self.agent_steps = 0
+        self.opponent_moves = 0
+        self.resets = 0
+        return data
+
+
+def merge_timings(timings):
+    """Sums PhaseTimer.pop() results from several envs (None entries are skipped)."""
+    merged = {"totals": dict.fromkeys(PHASES, 0.0), "agent_steps": 0, "opponent_moves": 0, "resets": 0}
+    for t in timings:
+        if not t:
+            continue
+        for phase, sec in t["totals"].items():
+            merged["totals"][phase] += sec
+        merged["agent_steps"] += t["agent_steps"]
+        merged["opponent_moves"] += t["opponent_moves"]
+        merged["resets"] += t["resets"]
+    return merged
+
+
+class EnvTimingCallback(BaseCallback):
+    """
+    Collects env phase timings at the end of each rollout and records them with
+    the model's logger, so they land in the run's tensorboard_log directory:
+      env_time/<phase>_us   mean microseconds per agent step
+      env_time/<phase>_pct  share of the total env time
+      env_time/opponent_moves_per_step
+    The envs must be created with timing=True.
+    """
+    def _on_step(self):
+        return True
+
+    def _on_rollout_end(self):
+        merged = merge_timings(self.training_env.env_method("pop_timings"))
+        steps = merged["agent_steps"]
+        if not steps:
+            return
+        totals = merged["totals"]
+        grand_total = sum(totals.values()) or 1.0
+        for phase, sec in totals.items():
+            self.logger.record(f"env_time/{phase}_us", sec / steps * 1e6)
+            self.logger.record(f"env_time/{phase}_pct", 100.0 * sec / grand_total)
+        self.logger.record("env_time/opponent_moves_per_step", merged["opponent_moves"] / steps)
@@ -4,193 +4,621 @@ from classdef import Gem
 import random
 import sys
 import os
-from itertools import combinations, permutations
-from sb3_contrib import MaskablePPO
+import math
+import argparse
+import csv
+import json
+import itertools
+from statistics import NormalDist
+from itertools import permutations
+from ai_lite import LiteModel
+from obs_layout import model_players
+import splendor_features
 import time
 
+def load_model(path, backend="torch"):
+    """
+    LiteModel for .npz (and for .zip with backend="lite", converted in memory), else MaskablePPO.
+    File-like objects (e.g. in-memory checkpoints) always go to MaskablePPO.load.
+    """
+    if isinstance(path, (str, os.PathLike)) and os.fspath(path).endswith(".npz"):
+        return LiteModel(path)
+    from sb3_contrib import MaskablePPO
+    model = MaskablePPO.load(path)
+    if backend == "lite":
+        from model_converter import extract_params
+        return LiteModel.from_params(extract_params(model, model_players(model)))
+    return model
+
 class ModelWrapper:
-    def __init__(self, name, model_path=None):
+    """
+    A tournament contestant. LiteModel .npz files are played with numpy; .zip files
+    are loaded with MaskablePPO (backend="torch") or converted to a LiteModel in
+    memory (backend="lite"), which skips torch's per-call overhead.
+    A model that fails to load plays as the random bot, or raises with strict=True.
+    """
+    def __init__(self, name, model_path=None, backend="torch", strict=False):
         self.name = name
         self.is_random = (name.lower() == "random")
         self.model = None
-        self.combos_3 = list(combinations(range(5), 3))
+        # Inference counters: forward passes and the decisions they made
+        self.forward_calls = 0
+        self.decisions = 0
         
         if not self.is_random:
             try:
                 print(f"Loading {name} from {model_path}...")
-                self.model = MaskablePPO.load(model_path)
+                self.model = load_model(model_path, backend)
+                # Observations are built for the game's player count and remapped to the model's
+                if isinstance(self.model, LiteModel):
+                    self.obs_dim, self.num_players = self.model.obs_dim, self.model.num_players
+                else:
+                    self.obs_dim = self.model.observation_space.shape[0]
+                    self.num_players = model_players(self.model)
             except Exception as e:
+                if strict:
+                    raise
                 print(f"Error loading {name}: {e}. Defaulting to Random.")
                 self.is_random = True
 
-    def predict(self, game, player_idx):
+    def predict(self, game, player_idx, trace=None, rng=None):
+        """
+        Returns an action dict for player_idx.
+        If `trace` is a list, model decisions are appended to it as (player_idx, obs, mask, action_idx).
+        The random bot draws from `rng` (default: the random module).
+        """
         if self.is_random:
             actions = game.get_valid_actions()
             if not actions: return None
-            return random.choice(actions)
+            return (rng or random).choice(actions)
         
-        # RL Prediction
-        obs = self._get_obs(game, player_idx)
-        mask = self._get_action_mask(game, player_idx)
-        action_idx, _ = self.model.predict(obs, action_masks=mask, deterministic=False) # Use stochastic for eval variety? Or deterministic?
-        # Usually deterministic=True for evaluation.
-        # But Splendor has hidden info (decks), so deterministic might be fine.
-        # Let's stick to True for "best play".
-        action_idx, _ = self.model.predict(obs, action_masks=mask, deterministic=True)
-        return self._map_action(int(action_idx), game, player_idx)
-
-    def _get_action_mask(self, game, p_idx):
-        mask = [False] * 52
-        p = game.players[p_idx]
-        bank = game.bank
+        return self.predict_batch([game], [player_idx], [trace])[0]
+
+    def predict_batch(self, games, player_idxs, traces=None):
+        """
+        Model decisions for several games in one forward pass (one inference per decision).
+        Deterministic (argmax) play: Splendor's hidden info is in the decks, so "best play" is fine.
+        """
+        obs = np.stack([splendor_features.get_model_obs(g, p, self.num_players, self.obs_dim)
+                        for g, p in zip(games, player_idxs)])
+        masks = np.array([splendor_features.get_action_mask(g, p) for g, p in zip(games, player_idxs)])
+        action_idxs, _ = self.model.predict(obs, action_masks=masks, deterministic=True)
+        self.forward_calls += 1
+        self.decisions += len(games)
+
+        actions = []
+        for i, (game, p_idx) in enumerate(zip(games, player_idxs)):
+            action_idx = int(action_idxs[i])
+            if traces is not None and traces[i] is not None:
+                # Recorded in the padded layout, whatever the model reads
+                traces[i].append((p_idx, splendor_features.get_obs(game, p_idx), masks[i], action_idx))
+            actions.append(splendor_features.map_action(action_idx, game, p_idx))
+        return actions
+
+def _new_game(p_count, deal_seed=None, rng=None):
+    """A fresh game; with deal_seed the decks and nobles are shuffled by random.Random(deal_seed), else by rng."""
+    return Game(p_count=p_count, rng=random.Random(deal_seed) if deal_seed is not None else rng)
+
+def play_game(seat_map, turn_limit=200, recorder=None, deal_seed=None, info=None, rng=None):
+    """
+    Plays one game. seat_map: {seat_idx: ModelWrapper}.
+    Returns the winning seat index, or None if nobody won within turn_limit.
+    With a TrajectoryRecorder, the decisions of model (non-random) seats are recorded.
+    The same deal_seed always deals the same cards and nobles.
+    If `info` is a dict, it receives the game's telemetry (see _finish_info); if
+    it holds a "points" list, the scores are appended to it at every new turn.
+    Random moves and deals without deal_seed come from `rng` (default: the random module).
+    """
+    game = _new_game(len(seat_map), deal_seed, rng)
+    trace = [] if recorder is not None else None
+    winner_seat = None
+    step_errors = passes = 0
+    points = info.get("points") if info is not None else None
+    if points is not None:
+        points.append([p.points() for p in game.players])
+    
+    while not game.game_over and game.turn_count < turn_limit: # prevent infinite games
+        curr_p_idx = game.curr_player_idx
+        agent = seat_map[curr_p_idx]
         
-        if p.token_count() > 10:
-            for i in range(6):
-                if p.tokens[i] > 0: mask[46 + i] = True
-            return mask
-
-        for i in range(5):
-            if bank[i] >= 4: mask[i] = True
-        for i, combo in enumerate(self.combos_3):
-            if all(bank[c] > 0 for c in combo): mask[5 + i] = True
-        for i in range(12):
-            tier, slot = (i // 4) + 1, i % 4
-            if slot < len(game.board[tier]) and p.can_buy(game.board[tier][slot]):
-                mask[15 + i] = True
-        for i in range(min(3, len(p.keeped))):
-            if p.can_buy(p.keeped[i]): mask[27 + i] = True
-        if p.can_reserve_card():
-            for i in range(12):
-                tier, slot = (i // 4) + 1, i % 4
-                if slot < len(game.board[tier]): mask[30 + i] = True
-        if p.can_reserve_card():
-            for i in range(3):
-                if len(game.decks[i+1]) > 0: mask[42 + i] = True
-        mask[45] = True
-        return mask
-
-    def _map_action(self, idx, game, p_idx):
-        p = game.players[p_idx]
-        if 0 <= idx <= 4:
-            t = [0]*6; t[idx] = 2
-            return {'type': 'get_token', 'tokens': t}
-        if 5 <= idx <= 14:
-            t = [0]*6
-            for c in self.combos_3[idx - 5]: t[c] = 1
-            return {'type': 'get_token', 'tokens': t}
-        if 15 <= idx <= 26:
-            tier, slot = ((idx - 15) // 4) + 1, (idx - 15) % 4
-            if slot < len(game.board[tier]):
-                return {'type': 'buy_card', 'card': game.board[tier][slot], 'tier': tier}
-        if 27 <= idx <= 29:
-            slot = idx - 27
-            if slot < len(p.keeped):
-                return {'type': 'buy_reserved', 'card': p.keeped[slot]}
-        if 30 <= idx <= 41:
-            tier, slot = ((idx - 30) // 4) + 1, (idx - 30) % 4
-            if slot < len(game.board[tier]):
-                return {'type': 'reserve_card', 'card': game.board[tier][slot], 'tier': tier}
-        if 42 <= idx <= 44:
-            return {'type': 'reserve_deck', 'tier': idx - 41}
-        if 46 <= idx <= 51:
-            return {'type': 'discard_token', 'gem_idx': idx - 46}
-        return {'type': 'do_nothing'}
-
-    def _get_obs(self, game, p_idx):
-        obs = []
-        obs.extend(game.bank)
-        for t in [1, 2, 3]: 
-            for s in range(4):
-                if s < len(game.board[t]):
-                    c = game.board[t][s]
-                    obs.extend(c.cost); obs.append(c.points); obs.append(c.gem.value)
-                else: obs.extend([0]*7)
-        p = game.players[p_idx]
-        obs.extend(p.tokens); obs.extend(p.card_gem()); obs.append(p.points())
-        for i in range(3):
-            if i < len(p.keeped):
-                c = p.keeped[i]; obs.extend(c.cost); obs.append(c.points); obs.append(c.gem.value)
-            else: obs.extend([0]*7)
-        num_p = len(game.players)
-        for i in range(1, num_p):
-            op_idx = (p_idx + i) % num_p
-            op = game.players[op_idx]
-            obs.extend(op.tokens); obs.extend(op.card_gem()); obs.append(op.points()); obs.append(len(op.keeped))
-        for i in range(5):
-            if i < len(game.tiles): obs.extend(game.tiles[i].cost)
-            else: obs.extend([0]*5)
-        obs.extend([0] * (250 - len(obs)))
-        return np.array(obs, dtype=np.float32)
-
-def run_tournament(model_paths):
-    # Prepare Models
-    models = []
-    for path in model_paths:
-        name = "Random" if path.lower() == "random" else os.path.splitext(path)[0]
-        models.append(ModelWrapper(name, path))
+        action = agent.predict(game, curr_p_idx, trace, rng)
+        
+        if action is None:
+            passes += 1
+            game.next_turn() 
+        else:
+            try:
+                winner = game.step(action)
+                if winner:
+                    winner_seat = game.players.index(winner)
+            except Exception:
+                step_errors += 1
+                game.next_turn()
+        if points is not None and game.turn_count >= len(points):
+            points.append([p.points() for p in game.players])
+        if winner_seat is not None:
+            break
+
+    if trace:
+        _record_trace(recorder, trace, winner_seat)
+    if info is not None:
+        _finish_info(info, game, winner_seat, turn_limit, step_errors, passes)
+    return winner_seat
+
+def _finish_info(info, game, winner_seat, turn_limit, step_errors, passes):
+    """Per-game telemetry: length, whether turn_limit ended it, skipped turns (step exceptions / no action)."""
+    info["turns"] = game.turn_count
+    info["turn_limit_hit"] = winner_seat is None and game.turn_count >= turn_limit
+    info["step_errors"] = step_errors
+    info["passes"] = passes
+
+def play_games_lockstep(seat_map, n_games, concurrent=8, turn_limit=200, recorder=None, deal_seeds=None, infos=None,
+                        rng=None):
+    """
+    Plays n_games with the same seat_map, keeping up to `concurrent` games in flight.
+    Every tick advances each game by one move; the games waiting on the same model
+    are decided by a single batched forward pass, so model cost per game does not
+    grow with `concurrent`. Same rules as play_game; game i is dealt from
+    deal_seeds[i] if given, and infos[i] (a dict) is filled like play_game's info;
+    rng as in play_game.
+    Returns the winner seats in game order (None for games without a winner).
+    """
+    results = [None] * n_games
+    started = 0
+    active = []
+    while active or started < n_games:
+        while len(active) < concurrent and started < n_games:
+            deal_seed = deal_seeds[started] if deal_seeds is not None else None
+            entry = {"game": _new_game(len(seat_map), deal_seed, rng), "idx": started, "step_errors": 0, "passes": 0,
+                     "trace": [] if recorder is not None else None,
+                     "points": infos[started].get("points") if infos is not None else None}
+            if entry["points"] is not None:
+                entry["points"].append([p.points() for p in entry["game"].players])
+            active.append(entry)
+            started += 1
+
+        # Random seats act directly; model seats are grouped per model
+        actions = [None] * len(active)
+        waiting = {}
+        for i, entry in enumerate(active):
+            game = entry["game"]
+            agent = seat_map[game.curr_player_idx]
+            if agent.is_random:
+                actions[i] = agent.predict(game, game.curr_player_idx, rng=rng)
+            else:
+                waiting.setdefault(id(agent), (agent, []))[1].append(i)
+        for agent, idxs in waiting.values():
+            games = [active[i]["game"] for i in idxs]
+            chosen = agent.predict_batch(games, [g.curr_player_idx for g in games], [active[i]["trace"] for i in idxs])
+            for i, action in zip(idxs, chosen):
+                actions[i] = action
+
+        still_active = []
+        for entry, action in zip(active, actions):
+            game = entry["game"]
+            winner_seat = None
+            if action is None:
+                entry["passes"] += 1
+                game.next_turn()
+            else:
+                try:
+                    winner = game.step(action)
+                    if winner:
+                        winner_seat = game.players.index(winner)
+                except Exception:
+                    entry["step_errors"] += 1
+                    game.next_turn()
+            if entry["points"] is not None and game.turn_count >= len(entry["points"]):
+                entry["points"].append([p.points() for p in game.players])
+            if winner_seat is None and not game.game_over and game.turn_count < turn_limit:
+                still_active.append(entry)
+                continue
+            if entry["trace"]:
+                _record_trace(recorder, entry["trace"], winner_seat)
+            results[entry["idx"]] = winner_seat
+            if infos is not None:
+                _finish_info(infos[entry["idx"]], game, winner_seat, turn_limit, entry["step_errors"], entry["passes"])
+        active = still_active
+    return results
+
+def _record_trace(recorder, trace, winner_seat):
+    """Writes a finished game seat by seat; the seat's last move gets the reward and done flag."""
+    for seat in sorted(set(t[0] for t in trace)):
+        moves = [t for t in trace if t[0] == seat]
+        reward = 100 if seat == winner_seat else 0 # Same as Policy 1
+        for i, (_, obs, mask, action_idx) in enumerate(moves):
+            last = i == len(moves) - 1
+            recorder.add(obs, mask, action_idx, reward if last else 0, last)
+
+def _model_name(path):
+    return "Random" if path.lower() == "random" else os.path.splitext(path)[0]
+
+# Per-process state of tournament workers (models are loaded once per process)
+_WORKER = {}
+
+def _init_worker(model_paths, record_dir=None, threads=None, settings=None):
+    """settings: concurrent_games, backend, strict, deal_seed, seed and turn_limit (see run_tournament)."""
+    # Only .zip contestants load torch (MaskablePPO.load, also for backend="lite"); .npz ones never do
+    if threads and any(path.lower() != "random" and not path.endswith(".npz") for path in model_paths):
+        import torch
+        torch.set_num_threads(threads)
+    settings = settings or {}
+    _WORKER["models"] = [ModelWrapper(_model_name(path), path, settings.get("backend", "torch"),
+                                      settings.get("strict", False))
+                         for path in model_paths]
+    _WORKER["record_dir"] = record_dir
+    _WORKER["concurrent_games"] = settings.get("concurrent_games", 1)
+    _WORKER["deal_seed"] = settings.get("deal_seed")
+    _WORKER["seed"] = settings.get("seed")
+    _WORKER["turn_limit"] = settings.get("turn_limit", 200)
+    _WORKER["telemetry"] = settings.get("telemetry", False)
+
+def start_workers(model_paths, workers=1, record_dir=None, settings=None):
+    """
+    Loads the models once per worker. Returns (pool, play_chunks): play_chunks(tasks)
+    yields _play_chunk results for (order, start, n_games) tasks, in completion
+    order; pool is None when workers <= 1 (games are played in this process).
+    """
+    if workers > 1:
+        import multiprocessing as mp
+        # One math thread per worker; the workers themselves use the cores
+        pool = mp.get_context("spawn").Pool(workers, initializer=_init_worker, initargs=(model_paths, record_dir, 1, settings))
+        return pool, lambda tasks: pool.imap_unordered(_play_chunk, tasks)
+    _init_worker(model_paths, record_dir, settings=settings)
+    return None, lambda tasks: map(_play_chunk, tasks)
+
+def _chunk_rng(seed, order, start):
+    """Private random stream of a chunk, keyed by (seed, order, start)."""
+    # Separated indices for 11+ models ("1-12-11-2" vs "11-2-1-12"); single-digit
+    # orders keep the unseparated key so existing seeded runs play the same games
+    key = ('' if max(order) < 10 else '-').join(map(str, order))
+    return random.Random(f"{seed}-{key}-{start}")
+
+def _play_chunk(task):
+    """
+    Plays games start..start+n_games-1 with one seat order. Returns a dict with
+    order, start, n_games, wins (wins[model_idx][seat] counts the games model_idx
+    won from that seat), winners (winners[i] is the winning model_idx of game
+    start+i, or None) and turns (game lengths). In duplicate mode game g is
+    dealt from seed deal_seed + g under every seat order. With telemetry on,
+    infos holds each game's telemetry (see play_game). With a seed, the
+    chunk's random moves and deals come from a private stream seeded by (seed, order,
+    start), so the caller's random module state is left alone.
+    """
+    order, start, n_games = task
+    rng = _chunk_rng(_WORKER["seed"], order, start) if _WORKER["seed"] is not None else None
+    models = _WORKER["models"]
+    recorder = None
+    if _WORKER["record_dir"]:
+        # One recorder directory per process; TrajectoryDataset picks up all of them
+        from trajectory_recorder import TrajectoryRecorder
+        recorder = TrajectoryRecorder(os.path.join(_WORKER["record_dir"], f"worker_{os.getpid()}"), obs_dim=250,
+                                      metadata={"source": "tournament", "num_players": 4})
+
+    seat_map = {seat: models[model_idx] for seat, model_idx in enumerate(order)}
+    wins = [[0] * 4 for _ in models]
+    deal_seeds = None
+    if _WORKER["deal_seed"] is not None:
+        deal_seeds = [_WORKER["deal_seed"] + start + i for i in range(n_games)]
+    infos = [{"points": []} if _WORKER["telemetry"] else {} for _ in range(n_games)]
+    turn_limit = _WORKER["turn_limit"]
+    if _WORKER["concurrent_games"] > 1:
+        winner_seats = play_games_lockstep(seat_map, n_games, concurrent=_WORKER["concurrent_games"],
+                                           turn_limit=turn_limit, recorder=recorder, deal_seeds=deal_seeds, infos=infos,
+                                           rng=rng)
+    else:
+        winner_seats = [play_game(seat_map, turn_limit=turn_limit, recorder=recorder,
+                                  deal_seed=deal_seeds[i] if deal_seeds else None, info=infos[i], rng=rng)
+                        for i in range(n_games)]
+    winners = []
+    for winner_seat in winner_seats:
+        if winner_seat is not None:
+            wins[order[winner_seat]][winner_seat] += 1
+        winners.append(order[winner_seat] if winner_seat is not None else None)
+
+    if recorder:
+        recorder.close()
+    return {"order": order, "start": start, "n_games": n_games, "wins": wins, "winners": winners,
+            "turns": [info["turns"] for info in infos], "infos": infos if _WORKER["telemetry"] else None}
+
+def wilson_interval(wins, n, confidence=0.95):
+    """Wilson score interval for a win rate of wins/n."""
+    if n == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = wins / n
+    center = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return center - half, center + half
+
+def sprt_decision(wins_a, wins_b, alpha=0.05, beta=0.05, margin=0.05):
+    """
+    SPRT on the games won by A or B, p = P(A wins | A or B won):
+    H1 p = 0.5 + margin (A better) against H0 p = 0.5 - margin (B better).
+    Returns +1 (A better), -1 (B better) or 0 (keep playing), and the log-likelihood ratio.
+    """
+    p0, p1 = 0.5 - margin, 0.5 + margin
+    llr = wins_a * math.log(p1 / p0) + wins_b * math.log((1 - p1) / (1 - p0))
+    if llr >= math.log((1 - beta) / alpha):
+        return 1, llr
+    if llr <= math.log(beta / (1 - alpha)):
+        return -1, llr
+    return 0, llr
+
+def interval_decision(wins_a, wins_b, alpha=0.05):
+    """+1 / -1 once the (1 - alpha) interval of P(A wins | A or B won) excludes 0.5, else 0."""
+    low, high = wilson_interval(wins_a, wins_a + wins_b, 1 - alpha)
+    if low > 0.5:
+        return 1
+    if high < 0.5:
+        return -1
+    return 0
+
+def run_tournament(model_paths, record_dir=None, games_per_perm=100, workers=1, chunk_size=10, concurrent_games=1,
+                   backend="torch", stop_rule=None, compare=(0, 1), alpha=0.05, beta=0.05, margin=0.05,
+                   duplicate=False, seed=None, first_game=0, turn_limit=200, telemetry_dir=None, checkpoint=None,
+                   strict=False, orders=None, verbose=True):
+    """
+    Plays every seat permutation of the 4 models games_per_perm times.
+    With workers > 1 the (permutation x game) grid is split into chunks of
+    chunk_size games and played by a process pool; each worker loads the
+    models once and returns per-seat win tallies, which are merged here.
+    concurrent_games > 1 plays each chunk in lockstep (see play_games_lockstep);
+    chunk_size should then be at least as large. backend="lite" plays .zip models
+    as in-memory LiteModels (see load_model); .npz models always are.
+
+    Games are played in blocks of chunk_size games on every permutation. With
+    stop_rule="sprt" or "interval", after each completed block the contestants
+    model_paths[compare[0]] (A) and model_paths[compare[1]] (B) are tested on the
+    games either of them won (see sprt_decision / interval_decision) and the
+    tournament stops as soon as one is better at the alpha/beta error rates.
+
+    duplicate=True deals game g of every permutation from the same seed
+    (seed + g; seed is drawn at random if None), so all 24 seat orders play
+    the same cards and nobles and card luck cancels out of the comparison.
+    With a seed, every chunk also seeds the random bots (and non-duplicate deals),
+    so a run is reproducible for a given chunk_size, whatever the worker count.
+    diff/diff_se is A's minus B's win rate and its standard error over deals.
+    first_game offsets the game indices (and so the deal seeds), which lets a
+    caller extend an earlier duplicate run without replaying it.
+    telemetry_dir streams per-game telemetry (length, turn-limit hits, step
+    exceptions, scores by turn) into columnar chunks (see game_telemetry.py).
+    strict=True raises when a model fails to load instead of playing it as the
+    random bot. orders limits the seat orders to a subset of the 24 permutations
+    (e.g. one per distinct seating when a model is listed more than once).
+
+    checkpoint is a .jsonl file that gets one line per completed chunk (seat
+    order, game indices, outcomes). Running again with the same file and
+    settings only plays the missing chunks; with a seed the final table is the
+    same as that of an uninterrupted run. Telemetry still buffered when a run
+    was interrupted is not rewritten on resume.
+    Returns {"stats", "total_games", "duration", "decision", "games_saved", "diff",
+    "diff_se", "games", "avg_turns", "games_per_sec"}; games lists
+    (order, game_idx, winner model_idx or None).
+    """
+    deal_seed = None
+    if duplicate:
+        deal_seed = seed if seed is not None else random.randrange(2**31)
+    restored = []
+    if checkpoint:
+        header = {"models": list(model_paths), "games_per_perm": games_per_perm, "first_game": first_game,
+                  "chunk_size": chunk_size, "seed": seed, "duplicate": duplicate, "deal_seed": deal_seed,
+                  "turn_limit": turn_limit}
+        if orders is not None:
+            header["orders"] = [list(order) for order in orders]
+        restored, deal_seed = _open_checkpoint(checkpoint, header)
+    names = [_model_name(path) for path in model_paths]
 
     # Stats: { "ModelName": { "total_wins": 0, "seat_wins": [0,0,0,0], "games_played": 0 } }
     stats = {}
-    for m in models:
-        if m.name not in stats:
-            stats[m.name] = {"total_wins": 0, "seat_wins": [0,0,0,0], "games_played": 0}
+    for name in names:
+        if name not in stats:
+            stats[name] = {"total_wins": 0, "seat_wins": [0,0,0,0], "games_played": 0}
 
     # Generate Permutations (Indices 0, 1, 2, 3)
-    perms = list(permutations(range(4)))
-    total_perms = len(perms) # 24
-    games_per_perm = 100
+    perms = [tuple(order) for order in orders] if orders is not None else list(permutations(range(4)))
+    total_perms = len(perms) # 24 unless orders is given
     total_games = total_perms * games_per_perm
+    # Block-major, so every prefix of completed blocks is seat-balanced
+    end_game = first_game + games_per_perm
+    blocks = range(first_game, end_game, chunk_size)
+    tasks = [(order, start, min(chunk_size, end_game - start)) for start in blocks for order in perms]
+    done = {(chunk["order"], chunk["start"]) for chunk in restored}
+    tasks = [task for task in tasks if (task[0], task[1]) not in done]
 
-    print(f"\nStarting Tournament!")
-    print(f"Models: {[m.name for m in models]}")
-    print(f"Total Games: {total_games} ({total_perms} orders * {games_per_perm} games)")
+    if verbose:
+        print(f"\nStarting Tournament!")
+        print(f"Models: {names}")
+        print(f"Total Games: {total_games} ({total_perms} orders * {games_per_perm} games), {workers} worker(s)")
+        if restored:
+            print(f"Resuming from {checkpoint}: {sum(c['n_games'] for c in restored)} game(s) already played")
     
     start_time = time.time()
     
     # Use tqdm for progress bar tracking every game
-    try:
-        from tqdm import tqdm
-        pbar = tqdm(total=total_games, desc="Tournament Progress", unit="game")
-    except ImportError:
-        print("tqdm not found, running without progress bar.")
-        pbar = None
-
-    for order in perms:
-        # order is tuple of indices
-        current_seat_map = {seat: models[model_idx] for seat, model_idx in enumerate(order)}
-        
-        for _ in range(games_per_perm):
-            game = Game(p_count=4)
-            turn_limit = 200 # prevent infinite games
-            
-            while not game.game_over and game.turn_count < turn_limit:
-                curr_p_idx = game.curr_player_idx
-                agent = current_seat_map[curr_p_idx]
-                
-                action = agent.predict(game, curr_p_idx)
-                
-                if action is None:
-                    game.next_turn() 
-                else:
-                    try:
-                        winner = game.step(action)
-                        if winner:
-                            winner_seat = game.players.index(winner)
-                            winning_model = current_seat_map[winner_seat]
-                            
-                            stats[winning_model.name]["total_wins"] += 1
-                            stats[winning_model.name]["seat_wins"][winner_seat] += 1
-                            break
-                    except Exception:
-                        game.next_turn()
-            
-            if pbar:
-                pbar.update(1)
+    pbar = None
+    if verbose:
+        try:
+            from tqdm import tqdm
+            pbar = tqdm(total=total_games, desc="Tournament Progress", unit="game")
+        except ImportError:
+            print("tqdm not found, running without progress bar.")
+
+    settings = {"concurrent_games": concurrent_games, "backend": backend, "strict": strict, "deal_seed": deal_seed,
+                "seed": seed, "turn_limit": turn_limit, "telemetry": telemetry_dir is not None}
+    pool, play_chunks = start_workers(model_paths, workers, record_dir, settings)
+    telemetry = None
+    if telemetry_dir:
+        from game_telemetry import TelemetryWriter
+        telemetry = TelemetryWriter(telemetry_dir, turn_limit=turn_limit)
+    # Restored chunks go through the same merge as new ones, so the tallies come out identical
+    results = itertools.chain(restored, play_chunks(tasks))
+    checkpoint_file = open(checkpoint, "a") if checkpoint else None
 
+    log = pbar.write if pbar else print
+    # Chunks finish out of order; results are merged block by block, in order
+    pending = {}
+    next_block = 0
+    played = 0
+    model_wins = [0] * len(model_paths)
+    # deal_wins[g][model_idx]: wins of each model over the permutations of game index g
+    deal_wins = {}
+    games = []
+    total_turns = 0
+    decision = None
+    for chunk in results:
+        if checkpoint_file and not chunk.get("restored"):
+            _append_checkpoint(checkpoint_file, chunk)
+        pending.setdefault(chunk["start"], []).append(chunk)
+        if pbar:
+            pbar.update(chunk["n_games"])
+        while next_block < len(blocks) and len(pending.get(blocks[next_block], [])) == total_perms:
+            for chunk in pending.pop(blocks[next_block]):
+                order, wins, winners = chunk["order"], chunk["wins"], chunk["winners"]
+                played += chunk["n_games"]
+                total_turns += sum(chunk["turns"])
+                for i, model_idx in enumerate(winners):
+                    games.append((order, blocks[next_block] + i, model_idx))
+                    if telemetry and chunk["infos"]:
+                        telemetry.add(blocks[next_block] + i, order,
+                                      order.index(model_idx) if model_idx is not None else None, chunk["infos"][i])
+                    game_wins = deal_wins.setdefault(blocks[next_block] + i, [0] * len(model_paths))
+                    if model_idx is not None:
+                        game_wins[model_idx] += 1
+                for model_idx, seat_wins in enumerate(wins):
+                    name = names[model_idx]
+                    model_wins[model_idx] += sum(seat_wins)
+                    for seat, count in enumerate(seat_wins):
+                        stats[name]["total_wins"] += count
+                        stats[name]["seat_wins"][seat] += count
+            next_block += 1
+            if stop_rule:
+                decision = _check_stop(stop_rule, names, model_wins, played, compare, alpha, beta, margin,
+                                       log if verbose else None)
+                if decision:
+                    break
+        if decision:
+            break
+
+    if pool:
+        if decision:
+            pool.terminate()
+        else:
+            pool.close()
+        pool.join()
     if pbar:
         pbar.close()
+    if telemetry:
+        telemetry.close()
+    if checkpoint_file:
+        checkpoint_file.close()
+    if record_dir and verbose:
+        print(f"Recorded transitions to {record_dir}")
 
     duration = time.time() - start_time
+    games_saved = total_games - played
+    diff, diff_se = _paired_difference(deal_wins, compare, total_perms)
+    if verbose:
+        print_stats(stats, played, duration)
+        mode = f"duplicate deals, seed {deal_seed}" if duplicate else "independent deals"
+        print(f"{names[compare[0]]} - {names[compare[1]]} win rate: {diff:+.1%} +/- {diff_se:.1%} (SE, {mode})")
+        if stop_rule:
+            a, b = names[compare[0]], names[compare[1]]
+            verdict = {1: f"{a} better than {b}", -1: f"{b} better than {a}", None: "undecided"}[decision]
+            print(f"{stop_rule.upper()}: {verdict} after {played} games; saved {games_saved} of {total_games} "
+                  f"({games_saved / total_games:.0%})")
+    return {"stats": stats, "total_games": played, "duration": duration, "decision": decision,
+            "games_saved": games_saved, "diff": diff, "diff_se": diff_se, "games": games,
+            "avg_turns": total_turns / max(1, played), "games_per_sec": played / max(duration, 1e-9)}
+
+def _open_checkpoint(path, header):
+    """
+    Starts a tournament checkpoint, or reads an existing one. Returns (chunks, deal_seed):
+    the completed chunks in _play_chunk's format and the deal seed of the original run.
+    A torn last line (crash while writing) is dropped; a file without a readable
+    header holds no usable games and is started over.
+    """
+    saved = None
+    if os.path.exists(path):
+        with open(path) as f:
+            text = f.read()
+        if not text.endswith("\n"):
+            # Drop the torn line so new records start on a line of their own
+            text = text[:text.rfind("\n") + 1]
+            with open(path, "r+") as f:
+                f.truncate(len(text.encode()))
+        lines = text.split("\n")
+        try:
+            saved = json.loads(lines[0])["header"]
+        except (json.JSONDecodeError, KeyError, TypeError):
+            saved = None
+    if saved is None:
+        with open(path, "w") as f:
+            f.write(json.dumps({"header": header}) + "\n")
+        return [], header["deal_seed"]
+
+    # A duplicate run without a fixed seed keeps the deal seed it drew first
+    if header["duplicate"] and header["seed"] is None:
+        header = dict(header, deal_seed=saved["deal_seed"])
+    if saved != header:
+        diff = {k: (saved.get(k), header.get(k)) for k in header if saved.get(k) != header.get(k)}
+        raise ValueError(f"{path} belongs to a different tournament (saved, requested): {diff}")
+
+    chunks = []
+    for line in lines[1:]:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        order = tuple(record["order"])
+        wins = [[0] * 4 for _ in header["models"]]
+        for model_idx in record["winners"]:
+            if model_idx is not None:
+                wins[model_idx][order.index(model_idx)] += 1
+        chunks.append({"order": order, "start": record["start"], "n_games": len(record["winners"]), "wins": wins,
+                       "winners": record["winners"], "turns": record["turns"], "infos": None, "restored": True})
+    return chunks, header["deal_seed"]
+
+def _append_checkpoint(f, chunk):
+    f.write(json.dumps({"order": chunk["order"], "start": chunk["start"], "winners": chunk["winners"],
+                        "turns": chunk["turns"]}) + "\n")
+    f.flush()
+    os.fsync(f.fileno())
+
+def _paired_difference(deal_wins, compare, n_perms):
+    """Mean and standard error of A's minus B's win rate, with each game index (deal) as one sample."""
+    a, b = compare
+    diffs = [(w[a] - w[b]) / n_perms for w in deal_wins.values()]
+    if not diffs:
+        return 0.0, 0.0
+    mean = sum(diffs) / len(diffs)
+    if len(diffs) < 2:
+        return mean, float("nan")
+    var = sum((d - mean) ** 2 for d in diffs) / (len(diffs) - 1)
+    return mean, math.sqrt(var / len(diffs))
+
+def _check_stop(stop_rule, names, model_wins, played, compare, alpha, beta, margin, log=None):
+    """Early-stopping check after a completed block; returns +1 / -1 for a decision, else None."""
+    wins_a, wins_b = model_wins[compare[0]], model_wins[compare[1]]
+    if stop_rule == "sprt":
+        decision, llr = sprt_decision(wins_a, wins_b, alpha, beta, margin)
+        detail = f"LLR {llr:+.2f} (bounds {math.log(beta / (1 - alpha)):+.2f}, {math.log((1 - beta) / alpha):+.2f})"
+    elif stop_rule == "interval":
+        decision = interval_decision(wins_a, wins_b, alpha)
+        low, high = wilson_interval(wins_a, wins_a + wins_b, 1 - alpha)
+        detail = f"P(A beats B) in [{low:.3f}, {high:.3f}]"
+    else:
+        raise ValueError(f"Unknown stop_rule: {stop_rule}")
+
+    if log:
+        rates = []
+        for model_idx, name in enumerate(names):
+            low, high = wilson_interval(model_wins[model_idx], played, 1 - alpha)
+            rates.append(f"{name} {model_wins[model_idx] / played:.1%} [{low:.1%}, {high:.1%}]")
+        log(f"After {played} games: {', '.join(rates)}; A {wins_a} - B {wins_b}, {detail}")
+    return decision or None
+
+def print_stats(stats, total_games, duration):
     print(f"\nTournament Finished in {duration:.2f} seconds.")
     print("-" * 80)
     print(f"{'Model Name':<20} | {'Win Rate':<10} | {'Seat 1':<8} | {'Seat 2':<8} | {'Seat 3':<8} | {'Seat 4':<8}")
@@ -208,8 +636,124 @@ def run_tournament(model_paths):
         print(f"{name:<20} | {win_rate:6.2f}%   | {seat_1_wr:6.1f}%  | {seat_2_wr:6.1f}%  | {seat_3_wr:6.1f}%  | {seat_4_wr:6.1f}%")
     print("-" * 80)
 
-if __name__ == "__main__":
-    # Input 4 models
+def measure_lockstep(model_path, games=64, concurrency=(1, 4, 16, 64), backend="torch"):
+    """
+    Prints games/s and forward passes per game when `model_path` plays all 4 seats
+    with M games in lockstep. Returns {M: games/s}.
+    """
+    model = ModelWrapper(_model_name(model_path), model_path, backend, strict=True)
+    seat_map = {seat: model for seat in range(4)}
+    print(f"Lockstep inference for {games} games:")
+    rates = {}
+    for m in concurrency:
+        model.forward_calls = model.decisions = 0
+        start = time.time()
+        play_games_lockstep(seat_map, games, concurrent=m)
+        duration = time.time() - start
+        rates[m] = games / duration
+        print(f"  M={m:<3}: {games / duration:7.1f} games/s, {model.forward_calls / games:6.1f} forward passes "
+              f"and {model.decisions / games:6.1f} decisions per game")
+    return rates
+
+def compare_backends(model_path, n_samples=2000, seed=0):
+    """
+    Checks that the torch and LiteModel versions of a .zip model pick the same
+    (masked argmax) action on positions from random games, and times one
+    single-position decision with each backend.
+    """
+    torch_model = ModelWrapper(_model_name(model_path), model_path, backend="torch", strict=True)
+    lite_model = ModelWrapper(_model_name(model_path), model_path, backend="lite", strict=True)
+
+    # Sample positions by playing random moves
+    rng = random.Random(seed)
+    obs, masks = [], []
+    game = Game(p_count=4, rng=rng)
+    while len(obs) < n_samples:
+        if game.game_over or game.turn_count >= 200:
+            game = Game(p_count=4, rng=rng)
+        p_idx = game.curr_player_idx
+        obs.append(splendor_features.get_model_obs(game, p_idx, torch_model.num_players, torch_model.obs_dim))
+        masks.append(splendor_features.get_action_mask(game, p_idx))
+        actions = game.get_valid_actions()
+        if not actions:
+            game.next_turn()
+            continue
+        try:
+            game.step(rng.choice(actions))
+        except Exception:
+            game.next_turn()
+    obs, masks = np.array(obs), np.array(masks)
+
+    torch_actions, _ = torch_model.model.predict(obs, action_masks=masks, deterministic=True)
+    lite_actions, _ = lite_model.model.predict(obs, action_masks=masks)
+    agreement = float(np.mean(torch_actions == lite_actions))
+
+    timings = {}
+    n = min(n_samples, 500)
+    for label, wrapper in (("torch", torch_model), ("lite", lite_model)):
+        start = time.perf_counter()
+        for i in range(n):
+            wrapper.model.predict(obs[i], action_masks=masks[i], deterministic=True)
+        timings[label] = (time.perf_counter() - start) / n * 1e6
+
+    print(f"Argmax agreement: {agreement:.2%} on {n_samples} positions")
+    print(f"Per-decision latency: torch {timings['torch']:.1f} us, lite {timings['lite']:.1f} us "
+          f"({timings['torch'] / timings['lite']:.2f}x faster)")
+    return {"agreement": agreement, "torch_us": timings["torch"], "lite_us": timings["lite"]}
+
+def measure_speedup(model_paths, games_per_perm=10, max_workers=None):
+    """Runs the same tournament with 1..max_workers workers, prints wall-clock speedups and returns the durations."""
+    max_workers = max_workers or os.cpu_count() or 1
+    print(f"Speedup for {24 * games_per_perm} games:")
+    durations = []
+    for workers in range(1, max_workers + 1):
+        duration = run_tournament(model_paths, games_per_perm=games_per_perm, workers=workers, verbose=False)["duration"]
+        durations.append(duration)
+        print(f"  {workers:>2} worker(s): {duration:7.2f}s  {durations[0] / duration:5.2f}x")
+    return durations
+
+def tournament_report(result, model_paths, settings=None):
+    """Machine-readable summary of a run_tournament result (see --json / --csv)."""
+    games = result["total_games"]
+    models = []
+    for name, data in result["stats"].items():
+        models.append({
+            "name": name,
+            "contestants": sum(1 for path in model_paths if _model_name(path) == name),
+            "wins": data["total_wins"],
+            "win_rate": data["total_wins"] / games if games else 0.0,
+            "seat_wins": data["seat_wins"],
+            "seat_rates": [w / (games / 4) if games else 0.0 for w in data["seat_wins"]],
+        })
+    report = {
+        "models": models,
+        "games": games,
+        "duration": result["duration"],
+        "games_per_sec": result["games_per_sec"],
+        "avg_turns": result["avg_turns"],
+        "settings": settings or {},
+    }
+    if result["decision"] is not None:
+        report["decision"] = result["decision"]
+        report["games_saved"] = result["games_saved"]
+    return report
+
+def write_report(report, json_path=None, csv_path=None):
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(report, f, indent=2)
+    if csv_path:
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["name", "contestants", "games", "wins", "win_rate", "seat1_rate", "seat2_rate",
+                             "seat3_rate", "seat4_rate", "avg_turns", "games_per_sec"])
+            for m in report["models"]:
+                writer.writerow([m["name"], m["contestants"], report["games"], m["wins"], f"{m['win_rate']:.4f}",
+                                 *(f"{r:.4f}" for r in m["seat_rates"]), f"{report['avg_turns']:.2f}",
+                                 f"{report['games_per_sec']:.2f}"])
+
+def _prompt_paths():
+    """The original interactive mode: asks for 4 model paths, the worker count and the backend."""
     print("Enter 4 model paths or 'random' (duplicates allowed).")
     defaults = ["random", "random", "random", "random"]
     paths = []
@@ -217,5 +761,69 @@ if __name__ == "__main__":
         val = input(f"Model {i+1} (default: {defaults[i]}): ").strip()
         if not val: val = defaults[i]
         paths.append(val)
-        
-    run_tournament(paths)
+    val = input("Workers (default: 1): ").strip()
+    workers = int(val) if val else 1
+    val = input("Backend for .zip models, torch or lite (default: torch): ").strip().lower()
+    backend = val if val else "torch"
+    return paths, workers, backend
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="4-player tournament over all seat permutations "
+                                                 "(no arguments: interactive mode)")
+    parser.add_argument("models", nargs=4, help="Model paths (.zip / .npz) or 'random'")
+    parser.add_argument("--games-per-perm", type=int, default=100, help="Games per seat permutation (24 of them)")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=10, help="Games per task; also the early-stopping block")
+    parser.add_argument("--concurrent-games", type=int, default=1, help="Games played in lockstep per worker")
+    parser.add_argument("--backend", choices=["torch", "lite"], default="torch", help="How .zip models are played")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for deals and random moves (reproducible runs)")
+    parser.add_argument("--duplicate", action="store_true", help="Same deal for game g on every permutation")
+    parser.add_argument("--turn-limit", type=int, default=200)
+    parser.add_argument("--stop-rule", choices=["sprt", "interval"], default=None, help="Stop early once A vs B is decided")
+    parser.add_argument("--compare", type=int, nargs=2, default=[0, 1], metavar=("A", "B"),
+                        help="Model indices compared by --stop-rule")
+    parser.add_argument("--record-dir", default=None, help="Record model decisions with TrajectoryRecorder")
+    parser.add_argument("--telemetry-dir", default=None, help="Write per-game telemetry chunks (see game_telemetry.py)")
+    parser.add_argument("--checkpoint", default=None, help="Progress file (.jsonl); rerun with it to resume")
+    parser.add_argument("--json", dest="json_path", help="Write the results as JSON")
+    parser.add_argument("--csv", dest="csv_path", help="Write one CSV row per model")
+    parser.add_argument("--quiet", action="store_true", help="No progress bar or table")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Instead of one run, time the tournament with 1..--workers workers")
+    parser.add_argument("--compare-backends", action="store_true",
+                        help="Instead of a tournament, check and time torch vs lite on each .zip model")
+    parser.add_argument("--measure-lockstep", action="store_true",
+                        help="Instead of a tournament, time lockstep batching for each model (with --backend)")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        return measure_speedup(args.models, args.games_per_perm, args.workers)
+    if args.compare_backends or args.measure_lockstep:
+        results = {}
+        for path in dict.fromkeys(args.models):
+            if args.compare_backends and path.endswith(".zip"):
+                results.setdefault("backends", {})[path] = compare_backends(path)
+            if args.measure_lockstep and path.lower() != "random":
+                results.setdefault("lockstep", {})[path] = measure_lockstep(path, backend=args.backend)
+        return results
+
+    settings = {"games_per_perm": args.games_per_perm, "workers": args.workers, "chunk_size": args.chunk_size,
+                "concurrent_games": args.concurrent_games, "backend": args.backend, "seed": args.seed,
+                "duplicate": args.duplicate, "turn_limit": args.turn_limit, "stop_rule": args.stop_rule}
+    result = run_tournament(args.models, record_dir=args.record_dir, games_per_perm=args.games_per_perm,
+                            workers=args.workers, chunk_size=args.chunk_size, concurrent_games=args.concurrent_games,
+                            backend=args.backend, stop_rule=args.stop_rule, compare=tuple(args.compare),
+                            duplicate=args.duplicate, seed=args.seed, turn_limit=args.turn_limit,
+                            telemetry_dir=args.telemetry_dir, checkpoint=args.checkpoint, verbose=not args.quiet)
+    report = tournament_report(result, args.models, settings)
+    write_report(report, args.json_path, args.csv_path)
+    if not args.quiet:
+        print(f"{report['games_per_sec']:.1f} games/s, {report['avg_turns']:.1f} turns per game")
+    return report
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main()
+    else:
+        paths, workers, backend = _prompt_paths()
+        run_tournament(paths, workers=workers, backend=backend)
@@ -5,7 +5,7 @@ from copy import deepcopy
 from itertools import combinations
 
 class Game:
-    def __init__(self, p_count:int):
+    def __init__(self, p_count:int, rng:random.Random=None):
         self.turn_count = 0
         self.curr_player_idx = 0
         self.game_over = False
@@ -18,19 +18,22 @@ class Game:
         self.decks:dict[int,list[Card]] = {1: [], 2: [], 3: []}
         self.board:dict[int,list[Card]] = {1: [], 2: [], 3: []}
         self.tiles:list[Tile] = []
-        self.init_game()
+        self.init_game(rng)
         
-    def init_game(self):
-        """카드 90장과 귀족 타일을 로드하고 셔플하는 로직"""
+    def init_game(self, rng:random.Random=None):
+        """카드 90장과 귀족 타일을 로드하고 셔플하는 로직 (rng: 셔플에 쓸 난수 생성기, 기본값은 random 모듈)"""
+        if rng is None:
+            rng = random
+
         card1 = deepcopy(CARD1_SET)
         card2 = deepcopy(CARD2_SET)
         card3 = deepcopy(CARD3_SET)
         tiles = deepcopy(TILE_SET)
         
-        random.shuffle(card1)
-        random.shuffle(card2)
-        random.shuffle(card3)
-        random.shuffle(tiles)
+        rng.shuffle(card1)
+        rng.shuffle(card2)
+        rng.shuffle(card3)
+        rng.shuffle(tiles)
         
         self.board[1] = deepcopy(card1[:4])
         del card1[:4]
@@ -0,0 +1,172 @@
+import argparse
+import glob
+import json
+import os
+import numpy as np
+
+SCALAR_FIELDS = {
+    "game_idx": np.int32,
+    "winner_seat": np.int8,     # -1: no winner
+    "turns": np.int16,
+    "turn_limit_hit": np.bool_,
+    "step_errors": np.int16,    # game.step raised and the turn was skipped
+    "passes": np.int16,         # no valid action, turn skipped
+}
+
+
+def _chunk_files(out_dir):
+    return sorted(glob.glob(os.path.join(out_dir, "telemetry_*.npz")))
+
+
+class TelemetryWriter:
+    """
+    Buffers per-game records and writes them as columnar .npz chunks of
+    `chunk_games` games (telemetry_00000.npz, ...). Scores by turn are stored as
+    int8 (games, turn_limit + 1, players), with -1 after the game ended.
+    Writing into a directory that has chunks continues after them.
+    """
+    def __init__(self, out_dir, turn_limit=200, n_players=4, chunk_games=1000):
+        self.out_dir = out_dir
+        self.turn_limit = turn_limit
+        self.n_players = n_players
+        self.chunk_games = chunk_games
+        os.makedirs(out_dir, exist_ok=True)
+        self.next_chunk = len(_chunk_files(out_dir))
+        self.records = []
+
+    def add(self, game_idx, order, winner_seat, info):
+        """info: the dict filled by play_game / play_games_lockstep with telemetry enabled."""
+        self.records.append((game_idx, order, winner_seat, info))
+        if len(self.records) >= self.chunk_games:
+            self.flush()
+
+    def flush(self):
+        if not self.records:
+            return
+        n = len(self.records)
+        arrays = {field: np.zeros(n, dtype=dtype) for field, dtype in SCALAR_FIELDS.items()}
+        arrays["order"] = np.zeros((n, self.n_players), dtype=np.int16)
+        arrays["points"] = np.full((n, self.turn_limit + 1, self.n_players), -1, dtype=np.int8)
+        for i, (game_idx, order, winner_seat, info) in enumerate(self.records):
+            arrays["game_idx"][i] = game_idx
+            arrays["order"][i] = order
+            arrays["winner_seat"][i] = -1 if winner_seat is None else winner_seat
+            for field in ("turns", "turn_limit_hit", "step_errors", "passes"):
+                arrays[field][i] = info[field]
+            points = info["points"][:self.turn_limit + 1]
+            arrays["points"][i, :len(points)] = points
+
+        path = os.path.join(self.out_dir, f"telemetry_{self.next_chunk:05d}.npz")
+        # Written under a temporary name so readers never see a partial chunk
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(path + ".tmp", path)
+        self.next_chunk += 1
+        self.records = []
+
+    def close(self):
+        self.flush()
+
+
+class TelemetrySummary:
+    """Streaming aggregate of telemetry chunks; memory does not grow with the number of games."""
+    def __init__(self):
+        self.games = 0
+        self.turn_hist = np.zeros(0, dtype=np.int64)
+        self.turn_limit_hits = 0
+        self.step_errors = 0
+        self.games_with_errors = 0
+        self.passes = 0
+        self.seat_wins = None
+        self.points_sum = None
+        self.points_count = None
+
+    def update(self, chunk):
+        turns = chunk["turns"].astype(np.int64)
+        self.games += len(turns)
+        hist = np.bincount(turns)
+        if len(hist) > len(self.turn_hist):
+            self.turn_hist = np.pad(self.turn_hist, (0, len(hist) - len(self.turn_hist)))
+        self.turn_hist[:len(hist)] += hist
+        self.turn_limit_hits += int(chunk["turn_limit_hit"].sum())
+        self.step_errors += int(chunk["step_errors"].sum())
+        self.games_with_errors += int((chunk["step_errors"] > 0).sum())
+        self.passes += int(chunk["passes"].sum())
+
+        points = chunk["points"]
+        n_players = points.shape[2]
+        if self.seat_wins is None:
+            self.seat_wins = np.zeros(n_players, dtype=np.int64)
+            self.points_sum = np.zeros((0, n_players), dtype=np.int64)
+            self.points_count = np.zeros(0, dtype=np.int64)
+        winners = chunk["winner_seat"]
+        self.seat_wins += np.bincount(winners[winners >= 0], minlength=n_players)
+        # Mean score by turn over the games still running at that turn (chunks may use other turn limits)
+        n_turns = points.shape[1]
+        if n_turns > len(self.points_count):
+            grow = n_turns - len(self.points_count)
+            self.points_sum = np.pad(self.points_sum, ((0, grow), (0, 0)))
+            self.points_count = np.pad(self.points_count, (0, grow))
+        self.points_sum[:n_turns] += np.where(points >= 0, points, 0).sum(axis=0)
+        self.points_count[:n_turns] += (points[:, :, 0] >= 0).sum(axis=0)
+
+    def report(self):
+        games = max(1, self.games)
+        turns = np.arange(len(self.turn_hist))
+        cdf = np.cumsum(self.turn_hist)
+        percentile = lambda q: int(np.searchsorted(cdf, q * self.games)) if self.games else 0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_points = self.points_sum / self.points_count[:, None] if self.points_sum is not None else None
+        return {
+            "games": self.games,
+            "avg_turns": float((turns * self.turn_hist).sum() / games),
+            "turns_p50": percentile(0.5),
+            "turns_p90": percentile(0.9),
+            "turn_limit_hits": self.turn_limit_hits,
+            "turn_limit_rate": self.turn_limit_hits / games,
+            "step_errors": self.step_errors,
+            "step_errors_per_game": self.step_errors / games,
+            "games_with_step_errors": self.games_with_errors,
+            "passes": self.passes,
+            "seat_win_rates": (self.seat_wins / games).tolist() if self.seat_wins is not None else [],
+            # Seat-averaged score by turn, for turns some game reached
+            "points_by_turn": [round(float(row.mean()), 3) for row, count in
+                               zip(mean_points, self.points_count) if count > 0] if mean_points is not None else [],
+        }
+
+
+def summarize(out_dir):
+    """Reads the telemetry chunks of out_dir one at a time and returns the aggregate report."""
+    summary = TelemetrySummary()
+    for path in _chunk_files(out_dir):
+        with np.load(path) as chunk:
+            summary.update(chunk)
+    return summary.report()
+
+
+def print_report(report, every=20):
+    print(f"Games: {report['games']}")
+    print(f"Game length: mean {report['avg_turns']:.1f} turns, median {report['turns_p50']}, p90 {report['turns_p90']}")
+    print(f"Turn limit reached: {report['turn_limit_hits']} ({report['turn_limit_rate']:.2%})")
+    print(f"Step exceptions: {report['step_errors']} ({report['step_errors_per_game']:.3f} per game, "
+          f"{report['games_with_step_errors']} games); passes: {report['passes']}")
+    print("Seat win rates: " + ", ".join(f"{r:.1%}" for r in report["seat_win_rates"]))
+    print("Mean score by turn: " + ", ".join(f"{t}: {p:.1f}" for t, p in enumerate(report["points_by_turn"])
+                                              if t % every == 0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize per-game tournament telemetry")
+    parser.add_argument("dir", help="Directory with telemetry_*.npz chunks")
+    parser.add_argument("--json", dest="json_path", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    report = summarize(args.dir)
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
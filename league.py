@@ -0,0 +1,144 @@
+import argparse
+import json
+import random
+import time
+
+from evaluate_models import start_workers, wilson_interval, _model_name
+from rating_ladder import update_ratings
+
+
+def plan_round(n_models, met, exposure, rng, scores=None):
+    """
+    Splits the models into 4-seat tables for one round.
+    Round-robin (scores=None): each table starts with the least-played model and
+    adds the models it has met least, so pairings and exposure even out over rounds.
+    Swiss (scores given): models are sorted by score and seated with their neighbours.
+    A short last table is filled with the least-played models from other tables.
+    """
+    order = list(range(n_models))
+    rng.shuffle(order)
+    tables = []
+    if scores is not None:
+        order.sort(key=lambda m: -scores[m])
+        tables = [order[i:i + 4] for i in range(0, n_models, 4)]
+    else:
+        remaining = sorted(order, key=lambda m: exposure[m])
+        while remaining:
+            table = [remaining.pop(0)]
+            while len(table) < 4 and remaining:
+                best = min(remaining, key=lambda m: (sum(met[m][t] for t in table), exposure[m]))
+                remaining.remove(best)
+                table.append(best)
+            tables.append(table)
+    if len(tables[-1]) < 4:
+        last = tables[-1]
+        extra = sorted((m for m in range(n_models) if m not in last), key=lambda m: exposure[m])
+        last += extra[:4 - len(last)]
+    return tables
+
+
+def run_league(model_paths, rounds=5, games_per_seat=2, swiss=False, workers=1, seed=0, duplicate=False,
+               backend="torch", concurrent_games=1, turn_limit=200, verbose=True):
+    """
+    Ranks any number (>= 4) of models with 4-seat tables. Every round seats all
+    models (plan_round); each table plays games_per_seat games on each of its 4
+    seat rotations. The models are loaded once per worker for the whole league,
+    and results stream into one ranking (multi-player Elo, see rating_ladder)
+    that is printed after every round. With duplicate=True the rotations of a
+    table replay the same deals. Returns the final ranking as a list of dicts.
+    """
+    n = len(model_paths)
+    if n < 4:
+        raise ValueError("A league needs at least 4 entries (use 'random' to fill)")
+    names = [_model_name(path) for path in model_paths]
+    rng = random.Random(seed)
+    settings = {"concurrent_games": concurrent_games, "backend": backend, "seed": seed, "turn_limit": turn_limit,
+                "deal_seed": seed if duplicate else None}
+    pool, play_chunks = start_workers(model_paths, workers, settings=settings)
+
+    met = [[0] * n for _ in range(n)]
+    exposure = [0] * n
+    wins = [0] * n
+    ratings = {m: 1000.0 for m in range(n)}
+    ranking = []
+    next_game = 0
+    start_time = time.time()
+    for round_idx in range(rounds):
+        scores = [wins[m] / exposure[m] if exposure[m] else 0.0 for m in range(n)] if swiss else None
+        tables = plan_round(n, met, exposure, rng, scores)
+        tasks = []
+        for table in tables:
+            for a in table:
+                for b in table:
+                    if a != b:
+                        met[a][b] += 1
+            # Every rotation of a table plays the same game indices (the same deals with duplicate=True)
+            for r in range(4):
+                tasks.append((tuple(table[r:] + table[:r]), next_game, games_per_seat))
+            next_game += games_per_seat
+
+        # Elo is applied in task order once the round is in, so it does not depend on worker timing
+        position = {(order, start): i for i, (order, start, _) in enumerate(tasks)}
+        results = sorted(play_chunks(tasks), key=lambda chunk: position[(chunk["order"], chunk["start"])])
+        for chunk in results:
+            order = chunk["order"]
+            for model_idx in order:
+                exposure[model_idx] += chunk["n_games"]
+            for winner_idx in chunk["winners"]:
+                if winner_idx is not None:
+                    wins[winner_idx] += 1
+                update_ratings(ratings, list(order), order.index(winner_idx) if winner_idx is not None else None)
+
+        ranking = league_ranking(names, ratings, wins, exposure)
+        if verbose:
+            print(f"\nRound {round_idx + 1}/{rounds}: {len(tables)} table(s), {time.time() - start_time:.1f}s")
+            print_ranking(ranking)
+
+    if pool:
+        pool.close()
+        pool.join()
+    return ranking
+
+
+def league_ranking(names, ratings, wins, exposure):
+    ranking = []
+    for m, name in enumerate(names):
+        low, high = wilson_interval(wins[m], exposure[m])
+        ranking.append({"index": m, "name": name, "rating": ratings[m], "games": exposure[m], "wins": wins[m],
+                        "win_rate": wins[m] / exposure[m] if exposure[m] else 0.0, "ci": [low, high]})
+    ranking.sort(key=lambda row: -row["rating"])
+    return ranking
+
+
+def print_ranking(ranking):
+    print(f"{'#':>3} {'Model':<30} {'Rating':>8} {'Games':>7} {'Win%':>7} {'95% CI':>15}")
+    for rank, row in enumerate(ranking, 1):
+        ci = f"[{row['ci'][0]:.1%}, {row['ci'][1]:.1%}]"
+        print(f"{rank:>3} {row['name']:<30} {row['rating']:8.1f} {row['games']:>7} {row['win_rate']:7.1%} {ci:>15}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank any number of models with 4-seat round-robin or Swiss tables")
+    parser.add_argument("models", nargs="+", help="Model paths (.zip / .npz) or 'random'; at least 4 entries")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--games-per-seat", type=int, default=2, help="Games per seat rotation of each table")
+    parser.add_argument("--swiss", action="store_true", help="Seat models with similar scores together")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--duplicate", action="store_true", help="Same deals on every rotation of a table")
+    parser.add_argument("--backend", choices=["torch", "lite"], default="torch")
+    parser.add_argument("--concurrent-games", type=int, default=1)
+    parser.add_argument("--turn-limit", type=int, default=200)
+    parser.add_argument("--json", dest="json_path", help="Write the final ranking as JSON")
+    args = parser.parse_args(argv)
+
+    ranking = run_league(args.models, rounds=args.rounds, games_per_seat=args.games_per_seat, swiss=args.swiss,
+                         workers=args.workers, seed=args.seed, duplicate=args.duplicate, backend=args.backend,
+                         concurrent_games=args.concurrent_games, turn_limit=args.turn_limit)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(ranking, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
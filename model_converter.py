@@ -1,57 +1,68 @@
 import os
 import glob
+import argparse
 import numpy as np
 import torch
 from sb3_contrib import MaskablePPO
+from obs_layout import players_for_obs_dim
 
-def extract_weights(model_path, output_path):
-    print(f"Processing {model_path}...")
-    model = MaskablePPO.load(model_path)
-    
-    # Access the internal neural network (Policy)
+def extract_params(model, num_players=None):
+    """
+    Actor weights of a MaskablePPO MlpPolicy as a dict of arrays in LiteModel naming.
+    The player-count tag comes from the model's num_players attribute (saved by
+    train_runner), else from the input length of compact models, else from num_players;
+    untagged padded models default to 4 players like LiteModel does.
+    """
     # Structure: features_extractor -> mlp_extractor -> action_net
-    # We assume a standard MlpPolicy structure
-    
-    params = {}
-    
-    # 1. Feature Extractor (usually identity, but let's check)
-    # SB3 Default: Flatten -> Linear layers
-    
-    # We need to extract weights from the shared net or separate actor/critic
-    # MaskablePPO uses ActorCriticPolicy.
     # We only care about the ACTOR (Action Net) for inference.
-    
-    # Iterate named parameters to find actor weights
     # Typical names: mlp_extractor.policy_net.0.weight, mlp_extractor.policy_net.0.bias, ... action_net.weight
-    
     policy = model.policy
-    
+
     # Helper to convert torch tensor to numpy
     def to_np(tensor):
         return tensor.detach().cpu().numpy()
 
-    # Extract Policy Network (Actor)
-    # Layer 0
-    params['fc0_w'] = to_np(policy.mlp_extractor.policy_net[0].weight).T # Transpose for x @ W
-    params['fc0_b'] = to_np(policy.mlp_extractor.policy_net[0].bias)
-    
-    # Layer 2 (Layer 1 is Tanh usually)
-    params['fc1_w'] = to_np(policy.mlp_extractor.policy_net[2].weight).T
-    params['fc1_b'] = to_np(policy.mlp_extractor.policy_net[2].bias)
-    
+    params = {}
+    # Linear layers of the policy net (every other module is the Tanh activation)
+    linears = [m for m in policy.mlp_extractor.policy_net if isinstance(m, torch.nn.Linear)]
+    for i, layer in enumerate(linears):
+        params[f'fc{i}_w'] = to_np(layer.weight).T # Transpose for x @ W
+        params[f'fc{i}_b'] = to_np(layer.bias)
+
     # Action Net (Output)
     params['act_w'] = to_np(policy.action_net.weight).T
     params['act_b'] = to_np(policy.action_net.bias)
+
+    # Player-count tag; the server uses it to pick the model variant for a room
+    num_players = (getattr(model, "num_players", None) or players_for_obs_dim(model.observation_space.shape[0])
+                   or num_players)
+    if num_players is None:
+        # Untagged padded models come from the 4-player training scripts
+        print("  No player count saved with the model, assuming 4 (override with --players)")
+        num_players = 4
+    params['num_players'] = np.array(num_players)
+    return params
+
+def extract_weights(model_path, output_path, num_players=None):
+    print(f"Processing {model_path}...")
+    model = MaskablePPO.load(model_path)
+    params = extract_params(model, num_players)
     
     print(f"Extracted weights shapes:")
-    print(f"  FC0: {params['fc0_w'].shape}")
-    print(f"  FC1: {params['fc1_w'].shape}")
-    print(f"  ACT: {params['act_w'].shape}")
+    for key, value in params.items():
+        if key.endswith('_w'):
+            print(f"  {key[:-2].upper()}: {value.shape}")
+    print(f"  Players: {int(params['num_players'])}")
     
     np.savez_compressed(output_path, **params)
     print(f"Saved to {output_path}")
 
 def main():
+    parser = argparse.ArgumentParser(description="Convert models/*.zip to LiteModel .npz files")
+    parser.add_argument("--players", type=int, choices=[2, 3, 4], default=None,
+                        help="Player count of padded models saved without one (default: 4)")
+    args = parser.parse_args()
+
     if not os.path.exists("models"):
         print("Error: 'models' folder not found.")
         return
@@ -64,7 +75,7 @@ def main():
     for zip_file in files:
         npz_file = os.path.splitext(zip_file)[0] + ".npz"
         try:
-            extract_weights(zip_file, npz_file)
+            extract_weights(zip_file, npz_file, args.players)
         except Exception as e:
             print(f"Failed to convert {zip_file}: {e}")
 
@@ -0,0 +1,66 @@
+import numpy as np
+
+# Legacy layout: float32, zero padded to 250 for every player count
+PADDED_OBS_SIZE = 250
+
+# Blocks of the observation, in order (see splendor_features.get_obs):
+# bank(6) + board(12 cards x 7) + self(6 tokens + 5 gems + 1 points) + reserved(3 x 7)
+# + opponents((n-1) x 13) + nobles(5 x 5)
+HEAD_SIZE = 6 + 12 * 7 + 12 + 3 * 7
+OPPONENT_SIZE = 13
+NOBLES_SIZE = 5 * 5
+
+
+def compact_obs_size(num_players):
+    """Length of the observation without padding."""
+    return HEAD_SIZE + (num_players - 1) * OPPONENT_SIZE + NOBLES_SIZE
+
+
+def players_for_obs_dim(obs_dim):
+    """Player count of a tight (compact) layout of length obs_dim; None for the padded layout or unknown sizes."""
+    for n in (2, 3, 4):
+        if compact_obs_size(n) == obs_dim:
+            return n
+    return None
+
+
+def model_players(model):
+    """
+    Player count an SB3 model was trained for: its num_players attribute (set by
+    train_runner), else the compact layout's length, else 4 (untagged padded
+    models come from the 4-player training scripts).
+    """
+    return getattr(model, "num_players", None) or players_for_obs_dim(model.observation_space.shape[0]) or 4
+
+
+def remap_players(obs, num_players):
+    """
+    Converts a compact observation (or a batch of them, one per row) to the compact
+    layout of another player count, block by block: the head and the nobles keep
+    their meaning, the opponents are cut to the first num_players - 1 (in seat
+    order after the observer) or padded with empty opponents.
+    """
+    have = players_for_obs_dim(obs.shape[-1])
+    if have is None:
+        raise ValueError(f"Not a compact observation: length {obs.shape[-1]}")
+    if have == num_players:
+        return obs
+    out = np.zeros(obs.shape[:-1] + (compact_obs_size(num_players),), dtype=obs.dtype)
+    out[..., :HEAD_SIZE] = obs[..., :HEAD_SIZE]
+    n_opp = OPPONENT_SIZE * (min(have, num_players) - 1)
+    out[..., HEAD_SIZE:HEAD_SIZE + n_opp] = obs[..., HEAD_SIZE:HEAD_SIZE + n_opp]
+    out[..., -NOBLES_SIZE:] = obs[..., -NOBLES_SIZE:]
+    return out
+
+
+def to_model_layout(obs, num_players, obs_dim):
+    """
+    Compact observation(s) of a game with any player count -> the input of a model
+    trained for num_players with obs_dim inputs: the compact layout of that player
+    count, or the padded float32 layout if obs_dim is PADDED_OBS_SIZE.
+    """
+    obs = remap_players(obs, num_players)
+    if obs_dim == PADDED_OBS_SIZE:
+        pad = [(0, 0)] * (obs.ndim - 1) + [(0, PADDED_OBS_SIZE - obs.shape[-1])]
+        return np.pad(obs.astype(np.float32), pad)
+    return obs
@@ -0,0 +1,101 @@
+import argparse
+import numpy as np
+import torch as th
+from sb3_contrib import MaskablePPO
+from splendor_env_4p_p1 import SplendorEnv4PP1
+from trajectory_recorder import TrajectoryDataset
+
+
+def _to_tensors(batch, device):
+    obs = th.as_tensor(batch["obs"], device=device)
+    actions = th.as_tensor(batch["action"].astype(np.int64), device=device)
+    return obs, actions, batch["mask"]
+
+
+def masked_accuracy(policy, dataset, indices, batch_size=1024):
+    """Share of rows where the argmax of the masked policy equals the recorded action."""
+    if len(indices) == 0:
+        return float("nan")
+    hits = 0
+    with th.no_grad():
+        for batch in dataset.iter_epoch(batch_size, seed=0, indices=indices):
+            obs, actions, masks = _to_tensors(batch, policy.device)
+            dist = policy.get_distribution(obs, action_masks=masks)
+            hits += (dist.distribution.probs.argmax(dim=1) == actions).sum().item()
+    return hits / len(indices)
+
+
+def pretrain(data_dir, output, epochs=5, batch_size=256, learning_rate=1e-3, val_fraction=0.05, seed=0):
+    """
+    Behavior cloning: fits a fresh MaskablePPO MlpPolicy to recorded (obs, mask, action)
+    rows by minimizing the masked cross-entropy (-log pi(a|s) with invalid actions masked).
+    Minibatches are streamed from the memory-mapped shards, so the dataset can exceed RAM.
+    The result is a regular MaskablePPO .zip (use it as --start-model in train_runner.py,
+    or convert it with model_converter.extract_weights).
+    """
+    dataset = TrajectoryDataset(data_dir)
+    compact = dataset.obs_dtype == np.uint8
+    num_players = dataset.num_players
+    print(f"Loaded {len(dataset)} transitions from {len(dataset.shards)} shard(s) "
+          f"({dataset.obs_dtype.name} x {dataset.obs_dim})")
+
+    # The env only supplies the observation/action spaces
+    env = SplendorEnv4PP1(num_players=num_players, compact_obs=compact)
+    if env.observation_space.shape[0] != dataset.obs_dim:
+        raise ValueError(f"Recorded obs length {dataset.obs_dim} does not match the env ({env.observation_space.shape[0]})")
+    kwargs = {}
+    if compact:
+        from compact_obs import CompactMaskableRolloutBuffer
+        kwargs["rollout_buffer_class"] = CompactMaskableRolloutBuffer
+    model = MaskablePPO("MlpPolicy", env, learning_rate=learning_rate, seed=seed, verbose=0, **kwargs)
+    # Saved with the model; model_converter tags the .npz with it
+    model.num_players = num_players
+    policy = model.policy
+    optimizer = policy.optimizer
+
+    # Hold out the most recent rows; neighbouring rows come from the same games
+    n_val = int(len(dataset) * val_fraction)
+    train_idx = np.arange(len(dataset) - n_val)
+    val_idx = np.arange(len(dataset) - n_val, len(dataset))
+
+    for epoch in range(epochs):
+        policy.set_training_mode(True)
+        total_loss, n_batches = 0.0, 0
+        for batch in dataset.iter_epoch(batch_size, seed=seed + epoch, indices=train_idx):
+            obs, actions, masks = _to_tensors(batch, policy.device)
+            _, log_prob, _ = policy.evaluate_actions(obs, actions, action_masks=masks)
+            loss = -log_prob.mean()
+
+            optimizer.zero_grad()
+            loss.backward()
+            th.nn.utils.clip_grad_norm_(policy.parameters(), model.max_grad_norm)
+            optimizer.step()
+            total_loss += loss.item()
+            n_batches += 1
+
+        policy.set_training_mode(False)
+        val_acc = masked_accuracy(policy, dataset, val_idx)
+        print(f"Epoch {epoch + 1}/{epochs}: loss {total_loss / max(1, n_batches):.4f}, val accuracy {val_acc:.2%}")
+
+    model.save(output)
+    print(f"Saved behavior-cloned model to {output}")
+    return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Behavior-cloning pretraining from recorded trajectories")
+    parser.add_argument("data_dir", help="Directory written by TrajectoryRecorder (searched recursively)")
+    parser.add_argument("output", help="Output model path, e.g. models/ai_4p_bc")
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--val-fraction", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    pretrain(args.data_dir, args.output, epochs=args.epochs, batch_size=args.batch_size,
+             learning_rate=args.lr, val_fraction=args.val_fraction, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
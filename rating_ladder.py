@@ -0,0 +1,260 @@
+import argparse
+import hashlib
+import itertools
+import os
+import sqlite3
+
+from evaluate_models import run_tournament
+
+DB_NAME = "ladder.db"
+
+# The random bot anchors the scale: its rating never moves
+ANCHOR = "random"
+ANCHOR_RATING = 1000.0
+K_FACTOR = 32.0
+
+
+def init_db(db_path):
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS models (
+            hash TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            path TEXT NOT NULL,
+            rating REAL NOT NULL,
+            games INTEGER NOT NULL DEFAULT 0,
+            wins INTEGER NOT NULL DEFAULT 0,
+            added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # One row per game. lineup: the sorted model hashes; perm: the seat order as
+    # indices into the lineup (e.g. "2013"); seats: the hashes in seat order
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS games (
+            lineup TEXT NOT NULL,
+            perm TEXT NOT NULL,
+            game_idx INTEGER NOT NULL,
+            seats TEXT NOT NULL,
+            deal_seed INTEGER NOT NULL,
+            winner_seat INTEGER,
+            played_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (lineup, perm, game_idx)
+        )
+    ''')
+    c.execute("INSERT OR IGNORE INTO models (hash, name, path, rating) VALUES (?, 'Random', 'random', ?)",
+              (ANCHOR, ANCHOR_RATING))
+    conn.commit()
+    return conn
+
+
+def model_hash(path):
+    """Content hash of a model file (so renamed or copied checkpoints keep their results)."""
+    if path.lower() == "random":
+        return ANCHOR
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+
+def register_model(conn, path, name=None):
+    """Adds a model at the anchor rating (a known hash only gets its path updated). Returns its hash."""
+    h = model_hash(path)
+    name = name or os.path.splitext(os.path.basename(path))[0]
+    c = conn.cursor()
+    c.execute("INSERT OR IGNORE INTO models (hash, name, path, rating) VALUES (?, ?, ?, ?)",
+              (h, name, path, ANCHOR_RATING))
+    if h != ANCHOR:
+        c.execute("UPDATE models SET path = ? WHERE hash = ?", (path, h))
+    conn.commit()
+    return h
+
+
+def update_ratings(ratings, seats, winner_seat, k=K_FACTOR):
+    """
+    Multi-player Elo for one game: the winner beat each distinct other model
+    once, each win being a pairwise game worth k / (number of distinct losers),
+    so a game moves the winner by at most k however the seats are shared.
+    A model on several seats counts once (e.g. three random seats are one
+    loss for the anchor), and the winner's own other seats are ignored.
+    Games without a winner change nothing. Returns the updated dict.
+    """
+    if winner_seat is None:
+        return ratings
+    winner = seats[winner_seat]
+    losers = sorted(set(seats) - {winner})
+    for loser in losers:
+        expected = 1.0 / (1.0 + 10 ** ((ratings[loser] - ratings[winner]) / 400.0))
+        delta = k * (1.0 - expected) / len(losers)
+        ratings[winner] += delta
+        ratings[loser] -= delta
+    if ANCHOR in ratings:
+        ratings[ANCHOR] = ANCHOR_RATING
+    return ratings
+
+
+def record_games(conn, lineup_hashes, games, deal_seed):
+    """
+    Stores tournament games (order, game_idx, winner model_idx) of a sorted lineup
+    and applies the rating update of every game that was not already stored.
+    """
+    c = conn.cursor()
+    lineup = ",".join(lineup_hashes)
+    c.execute("SELECT hash, rating FROM models")
+    ratings = dict(c.fetchall())
+    new = 0
+    for order, game_idx, winner_idx in games:
+        seats = [lineup_hashes[model_idx] for model_idx in order]
+        winner_seat = order.index(winner_idx) if winner_idx is not None else None
+        c.execute("INSERT OR IGNORE INTO games (lineup, perm, game_idx, seats, deal_seed, winner_seat) "
+                  "VALUES (?, ?, ?, ?, ?, ?)",
+                  (lineup, "".join(map(str, order)), game_idx, ",".join(seats), deal_seed + game_idx, winner_seat))
+        if c.rowcount != 1:
+            continue
+        new += 1
+        update_ratings(ratings, seats, winner_seat)
+        for h in set(seats):
+            c.execute("UPDATE models SET games = games + 1 WHERE hash = ?", (h,))
+        if winner_seat is not None:
+            c.execute("UPDATE models SET wins = wins + 1 WHERE hash = ?", (seats[winner_seat],))
+    for h, rating in ratings.items():
+        c.execute("UPDATE models SET rating = ? WHERE hash = ?", (rating, h))
+    conn.commit()
+    return new
+
+
+def distinct_orders(lineup_hashes):
+    """
+    One seat order (indices into the lineup) per distinct seating: a lineup with
+    three random bots has 4 seatings instead of 24, the other orders replay them.
+    """
+    seatings = {}
+    for order in itertools.permutations(range(len(lineup_hashes))):
+        seatings.setdefault(tuple(lineup_hashes[i] for i in order), order)
+    return list(seatings.values())
+
+
+def games_done(conn, lineup_hashes):
+    """Number of leading game indices the sorted lineup has already played on all its distinct seat orders."""
+    c = conn.cursor()
+    c.execute("SELECT game_idx, COUNT(*) FROM games WHERE lineup = ? GROUP BY game_idx ORDER BY game_idx",
+              (",".join(lineup_hashes),))
+    n_orders = len(distinct_orders(lineup_hashes))
+    done = 0
+    for game_idx, count in c.fetchall():
+        if game_idx != done or count < n_orders:
+            break
+        done += 1
+    return done
+
+
+def check_paths(conn, lineup_hashes):
+    """
+    Stored paths of a sorted lineup. Returns (paths, problem): problem names the
+    first model whose file is missing or no longer has its stored content hash, else None.
+    """
+    c = conn.cursor()
+    paths = []
+    for h in lineup_hashes:
+        c.execute("SELECT path FROM models WHERE hash = ?", (h,))
+        paths.append(c.fetchone()[0])
+    for h, path in zip(lineup_hashes, paths):
+        if h == ANCHOR:
+            continue
+        if not os.path.exists(path):
+            return paths, f"{path} not found"
+        if model_hash(path) != h:
+            return paths, f"{path} changed since it was rated (hash {model_hash(path)}, expected {h})"
+    return paths, None
+
+
+def plan_lineups(conn, new_hash, n_lineups=3):
+    """
+    Opponent triples that place `new_hash` on the ladder: the other models are
+    sorted by rating and split into consecutive triples, so the lineups span the
+    whole ladder. Triples are filled up with the random bot.
+    """
+    c = conn.cursor()
+    c.execute("SELECT hash FROM models WHERE hash != ? AND hash != ? ORDER BY rating DESC", (new_hash, ANCHOR))
+    others = [row[0] for row in c.fetchall()]
+    if not others:
+        return [sorted([new_hash, ANCHOR, ANCHOR, ANCHOR])]
+    n_lineups = max(1, min(n_lineups, (len(others) + 2) // 3))
+    # Evenly spaced starting points down the ladder
+    lineups = []
+    for i in range(n_lineups):
+        start = round(i * max(0, len(others) - 3) / max(1, n_lineups - 1))
+        triple = others[start:start + 3]
+        triple += [ANCHOR] * (3 - len(triple))
+        # Sorted, so the same four models are always stored under the same key
+        lineups.append(sorted([new_hash] + triple))
+    return lineups
+
+
+def place_model(path, db_path=DB_NAME, games_per_perm=10, n_lineups=3, seed=0, workers=1, backend="torch",
+                concurrent_games=1):
+    """
+    Registers the model at `path` and plays the lineups from plan_lineups with
+    duplicate deals (seed + game index). Game indices a lineup has already
+    played are skipped, so adding games or re-placing a known model never
+    replays a stored game. A lineup with a model whose file is missing or changed
+    is skipped, and models must load (strict), so a game is never rated under a
+    model that did not play it. Prints the ladder afterwards.
+    """
+    conn = init_db(db_path)
+    new_hash = register_model(conn, path)
+    for lineup in plan_lineups(conn, new_hash, n_lineups):
+        done = games_done(conn, lineup)
+        todo = games_per_perm - done
+        paths, problem = check_paths(conn, lineup)
+        if problem:
+            print(f"Lineup {paths}: skipped, {problem}")
+            continue
+        if todo <= 0:
+            print(f"Lineup {paths}: {done} game(s) per order already played, skipped")
+            continue
+        print(f"Lineup {paths}: playing games {done}..{games_per_perm - 1} on every order")
+        result = run_tournament(paths, games_per_perm=todo, first_game=done, duplicate=True, seed=seed,
+                                workers=workers, backend=backend, concurrent_games=concurrent_games,
+                                chunk_size=max(1, min(10, todo)), strict=True, orders=distinct_orders(lineup),
+                                verbose=False)
+        new = record_games(conn, lineup, result["games"], seed)
+        print(f"  recorded {new} game(s) in {result['duration']:.1f}s")
+    print_ladder(conn)
+    conn.close()
+
+
+def print_ladder(conn):
+    c = conn.cursor()
+    c.execute("SELECT name, hash, rating, games, wins FROM models ORDER BY rating DESC")
+    print(f"\n{'#':>3} {'Model':<30} {'Hash':<16} {'Rating':>8} {'Games':>7} {'Win%':>7}")
+    for rank, (name, h, rating, games, wins) in enumerate(c.fetchall(), 1):
+        win_rate = f"{wins / games:7.1%}" if games else "      -"
+        print(f"{rank:>3} {name:<30} {h:<16} {rating:8.1f} {games:>7} {win_rate}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Persistent multi-player Elo ladder for Splendor models")
+    parser.add_argument("models", nargs="*", help="Model files (.zip or .npz) to place on the ladder, in order")
+    parser.add_argument("--db", default=DB_NAME, help="SQLite ladder database")
+    parser.add_argument("--games-per-perm", type=int, default=10, help="Games per seat order of each lineup")
+    parser.add_argument("--lineups", type=int, default=3, help="Opponent lineups used to place a model")
+    parser.add_argument("--seed", type=int, default=0, help="Base deal seed (game g is dealt from seed + g)")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--backend", choices=["torch", "lite"], default="torch")
+    parser.add_argument("--concurrent-games", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    for path in args.models:
+        place_model(path, args.db, games_per_perm=args.games_per_perm, n_lineups=args.lineups, seed=args.seed,
+                    workers=args.workers, backend=args.backend, concurrent_games=args.concurrent_games)
+    if not args.models:
+        conn = init_db(args.db)
+        print_ladder(conn)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import numpy as np
+
+# Reward terms. Each one works on arrays with one entry per game:
+#   outcome        +1 the agent won, -1 an opponent won, 0 game still running
+#   points_gained  agent's prestige points after its move (and the opponents' turns) minus before
+#   terminated     bool, the game ended this step
+# and returns a float array, so a single env and a vectorized env share the same code.
+
+def win_only(outcome, points_gained, terminated):
+    return np.where(outcome > 0, 100.0, 0.0)
+
+
+def win_loss(outcome, points_gained, terminated):
+    return 100.0 * outcome
+
+
+def point_diff(outcome, points_gained, terminated):
+    return np.where(terminated, 0.0, 5.0 * np.maximum(points_gained, 0))
+
+
+def step_penalty(outcome, points_gained, terminated):
+    return np.where(terminated, 0.0, -0.1)
+
+
+REWARD_TERMS = {
+    "win_only": win_only,
+    "win_loss": win_loss,
+    "point_diff": point_diff,
+    "step_penalty": step_penalty,
+}
+
+# Named schemes; "p1"/"p2" are the rewards of SplendorEnv4PP1 / SplendorEnv4PP2
+REWARD_SCHEMES = {
+    "p1": "win_only",
+    "p2": "win_loss+point_diff+step_penalty",
+}
+
+
+def make_reward(spec):
+    """
+    Returns fn(outcome, points_gained, terminated) -> float array.
+    `spec` is a scheme name ("p2"), terms joined with '+' ("win_loss+step_penalty"),
+    or a callable with that signature.
+    """
+    if callable(spec):
+        return spec
+    spec = REWARD_SCHEMES.get(spec, spec)
+    terms = []
+    for name in spec.split("+"):
+        if name not in REWARD_TERMS:
+            raise ValueError(f"Unknown reward term '{name}' (expected one of {list(REWARD_TERMS)})")
+        terms.append(REWARD_TERMS[name])
+    if len(terms) == 1:
+        return terms[0]
+
+    def reward_fn(outcome, points_gained, terminated):
+        return sum(term(outcome, points_gained, terminated) for term in terms)
+    return reward_fn
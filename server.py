@@ -7,9 +7,8 @@ import glob
 import os
 import random
 import re # Added for validation
-import numpy as np
-from itertools import combinations
 from ai_lite import LiteModel
+import splendor_features
 from game import Game
 from classdef import Gem, Card, Player
 import database
@@ -143,6 +142,24 @@ class SplendorServer:
                 except:
                     pass
 
+    def _model_family(self, name, num_players):
+        """'ai_2p_p1' and 'ai_4p_p1' are variants of the same bot for different player counts."""
+        return re.sub(rf'(^|_){num_players}p(_|$)', r'\1Np\2', name)
+
+    def _model_for_room(self, name, num_players):
+        """
+        The chosen bot, or its variant trained for this player count if one is loaded.
+        Without a variant the bot plays anyway, on observations remapped to its player count.
+        """
+        model = self.ai_models.get(name)
+        if model is None or model.num_players == num_players:
+            return model
+        family = self._model_family(name, model.num_players)
+        for other_name, other in self.ai_models.items():
+            if other.num_players == num_players and self._model_family(other_name, num_players) == family:
+                return other
+        return model
+
     def broadcast_time_loop(self):
         while True:
             time.sleep(1)
@@ -371,7 +388,7 @@ class SplendorServer:
                             if pinfo["bot"]:
                                 m = pinfo["model"]
                                 room.game.players[i].name = f"Bot {i+1} ({m})"
-                                room.ai_map[i] = self.ai_models.get(m)
+                                room.ai_map[i] = self._model_for_room(m, room.max_players)
                             else:
                                 room.game.players[i].name = pinfo["name"]
                                 room.seat_map[pinfo["id"]] = i
@@ -558,11 +575,12 @@ class SplendorServer:
                 if not room.game_started: break
                 model = room.ai_map[idx]
                 try:
-                    obs = self._get_obs_for_player(g, idx)
                     if model:
-                        mask = self._get_action_mask_for_player(g, idx)
+                        # The model may be trained for another player count (see _model_for_room)
+                        obs = splendor_features.get_model_obs(g, idx, model.num_players, model.obs_dim)
+                        mask = splendor_features.get_action_mask(g, idx)
                         act_idx, _ = model.predict(obs, action_masks=mask, deterministic=False)
-                        act = self._map_action(int(act_idx), g, idx)
+                        act = splendor_features.map_action(int(act_idx), g, idx)
                     else:
                         acts = g.get_valid_actions()
                         act = random.choice(acts) if acts else {'type':'do_nothing'}
@@ -618,75 +636,5 @@ class SplendorServer:
         if t == 'discard_token': return f"{name} discarded {colors[action['gem_idx']]}"
         return f"{name} performed {t}"
 
-    def _get_obs_for_player(self, game, p_idx):
-        obs = []
-        obs.extend(game.bank)
-        for t in [1, 2, 3]:
-            for s in range(4):
-                if s < len(game.board[t]):
-                    c = game.board[t][s]
-                    obs.extend(c.cost); obs.append(c.points); obs.append(c.gem.value)
-                else: obs.extend([0]*7)
-        p = game.players[p_idx]
-        obs.extend(p.tokens); obs.extend(p.card_gem()); obs.append(p.points())
-        for i in range(3):
-            if i < len(p.keeped):
-                c = p.keeped[i]; obs.extend(c.cost); obs.append(c.points); obs.append(c.gem.value)
-            else: obs.extend([0]*7)
-        for i in range(1, len(game.players)):
-            op = game.players[(p_idx + i) % len(game.players)]
-            obs.extend(op.tokens); obs.extend(op.card_gem()); obs.append(op.points()); obs.append(len(op.keeped))
-        for i in range(5):
-            if i < len(game.tiles): obs.extend(game.tiles[i].cost)
-            else: obs.extend([0]*5)
-        obs.extend([0] * (250 - len(obs)))
-        return np.array(obs, dtype=np.float32)
-
-    def _get_action_mask_for_player(self, game, p_idx):
-        mask = [False] * 52
-        p = game.players[p_idx]; bank = game.bank
-        combos = list(combinations(range(5), 3))
-        if p.token_count() > 10:
-            for i in range(6):
-                if p.tokens[i] > 0: mask[46 + i] = True
-            return mask
-        for i in range(5):
-            if bank[i] >= 4: mask[i] = True
-        for i, combo in enumerate(combos):
-            if all(bank[c] > 0 for c in combo): mask[5 + i] = True
-        for i in range(12):
-            t, s = (i // 4) + 1, i % 4
-            if s < len(game.board[t]) and p.can_buy(game.board[t][s]): mask[15 + i] = True
-        for i in range(min(3, len(p.keeped))):
-            if p.can_buy(p.keeped[i]): mask[27 + i] = True
-        if p.can_reserve_card():
-            for i in range(12):
-                t, s = (i // 4) + 1, i % 4
-                if s < len(game.board[t]): mask[30 + i] = True
-            for i in range(3):
-                if len(game.decks[i+1]) > 0: mask[42 + i] = True
-        mask[45] = True
-        return mask
-
-    def _map_action(self, idx, game, p_idx):
-        combos = list(combinations(range(5), 3))
-        if 0 <= idx <= 4:
-            t = [0]*6; t[idx] = 2
-            return {'type': 'get_token', 'tokens': t}
-        if 5 <= idx <= 14:
-            t = [0]*6
-            for c in combos[idx - 5]: t[c] = 1
-            return {'type': 'get_token', 'tokens': t}
-        if 15 <= idx <= 26:
-            t, s = ((idx - 15) // 4) + 1, (idx - 15) % 4
-            return {'type': 'buy_card', 'card': game.board[t][s], 'tier': t}
-        if 27 <= idx <= 29: return {'type': 'buy_reserved', 'card': game.players[p_idx].keeped[idx - 27]}
-        if 30 <= idx <= 41:
-            t, s = ((idx - 30) // 4) + 1, (idx - 30) % 4
-            return {'type': 'reserve_card', 'card': game.board[t][s], 'tier': t}
-        if 42 <= idx <= 44: return {'type': 'reserve_deck', 'tier': idx - 41}
-        if 46 <= idx <= 51: return {'type': 'discard_token', 'gem_idx': idx - 46}
-        return {'type': 'do_nothing'}
-
 if __name__ == "__main__":
     SplendorServer().start()
@@ -0,0 +1,31 @@
+from multiprocessing import shared_memory
+import numpy as np
+
+
+class SharedArrays:
+    """Named numpy arrays backed by SharedMemory; children attach with the same spec and names."""
+    def __init__(self, spec, names=None):
+        self.blocks = {}
+        self.arrays = {}
+        for key, (shape, dtype) in spec.items():
+            nbytes = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+            if names is None:
+                block = shared_memory.SharedMemory(create=True, size=nbytes)
+            else:
+                block = shared_memory.SharedMemory(name=names[key])
+            self.blocks[key] = block
+            self.arrays[key] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        self.owner = names is None
+
+    def names(self):
+        return {key: block.name for key, block in self.blocks.items()}
+
+    def __getitem__(self, key):
+        return self.arrays[key]
+
+    def close(self):
+        self.arrays = {}
+        for block in self.blocks.values():
+            block.close()
+            if self.owner:
+                block.unlink()
@@ -0,0 +1,341 @@
+import argparse
+import multiprocessing as mp
+import time
+import numpy as np
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv, CloudpickleWrapper
+from sb3_contrib.common.maskable.buffers import MaskableRolloutBuffer
+from shared_arrays import SharedArrays
+
+
+def shared_spec(n_steps, n_envs, observation_space, n_actions):
+    """Obs/mask rows 0..n_steps (row n_steps is the bootstrap observation), reward/done rows 0..n_steps-1."""
+    return {
+        "obs": ((n_steps + 1, n_envs, *observation_space.shape), observation_space.dtype),
+        "mask": ((n_steps + 1, n_envs, n_actions), np.bool_),
+        "reward": ((n_steps, n_envs), np.float32),
+        "done": ((n_steps, n_envs), np.bool_),
+        "action": ((n_envs,), np.int64),
+    }
+
+
+def _worker(remote, parent_remote, env_fn_wrapper, env_idx):
+    from stable_baselines3.common.env_util import is_wrapped
+
+    parent_remote.close()
+    env = env_fn_wrapper.var()
+    buf = None
+    while True:
+        try:
+            cmd, data = remote.recv()
+            if cmd == "step":
+                t = data
+                obs, reward, terminated, truncated, info = env.step(int(buf["action"][env_idx]))
+                done = terminated or truncated
+                if done:
+                    info["TimeLimit.truncated"] = truncated and not terminated
+                    if truncated:
+                        # Only needed to bootstrap truncated episodes
+                        info["terminal_observation"] = obs
+                    obs, _ = env.reset()
+                buf["obs"][t + 1, env_idx] = obs
+                buf["mask"][t + 1, env_idx] = env.action_masks()
+                buf["reward"][t, env_idx] = reward
+                buf["done"][t, env_idx] = done
+                remote.send(info if done else None)
+            elif cmd == "reset":
+                seed, options = data
+                maybe_options = {"options": options} if options else {}
+                obs, reset_info = env.reset(seed=seed, **maybe_options)
+                buf["obs"][0, env_idx] = obs
+                buf["mask"][0, env_idx] = env.action_masks()
+                remote.send(reset_info)
+            elif cmd == "attach":
+                buf = SharedArrays(*data)
+                remote.send(None)
+            elif cmd == "get_spaces":
+                remote.send((env.observation_space, env.action_space))
+            elif cmd == "env_method":
+                method = env.get_wrapper_attr(data[0])
+                remote.send(method(*data[1], **data[2]))
+            elif cmd == "get_attr":
+                remote.send(env.get_wrapper_attr(data))
+            elif cmd == "has_attr":
+                try:
+                    env.get_wrapper_attr(data)
+                    remote.send(True)
+                except AttributeError:
+                    remote.send(False)
+            elif cmd == "set_attr":
+                setattr(env, data[0], data[1])
+                remote.send(None)
+            elif cmd == "is_wrapped":
+                remote.send(is_wrapped(env, data))
+            elif cmd == "close":
+                env.close()
+                if buf is not None:
+                    buf.close()
+                remote.close()
+                break
+            else:
+                raise NotImplementedError(f"`{cmd}` is not implemented in the worker")
+        except (EOFError, KeyboardInterrupt):
+            break
+
+
+class SharedMemoryVecEnv(VecEnv):
+    """
+    VecEnv with one worker process per env. Workers write observations, masks, rewards and
+    dones into shared arrays indexed by (step, env); the pipes only carry step numbers and infos.
+    The arrays hold `n_steps` steps and wrap around afterwards; with n_steps equal
+    to the PPO n_steps, row t of the arrays is row t of the rollout buffer.
+    Returned observations, rewards and dones are views into the shared arrays.
+    The envs must provide action_masks(); masks are read from shared memory too.
+    """
+    def __init__(self, env_fns, n_steps, start_method=None):
+        n_envs = len(env_fns)
+        if start_method is None:
+            start_method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        ctx = mp.get_context(start_method)
+
+        self.remotes, self.work_remotes = zip(*[ctx.Pipe() for _ in range(n_envs)])
+        self.processes = []
+        for idx, (work_remote, remote, env_fn) in enumerate(zip(self.work_remotes, self.remotes, env_fns)):
+            process = ctx.Process(target=_worker, args=(work_remote, remote, CloudpickleWrapper(env_fn), idx),
+                                  daemon=True)
+            process.start()
+            self.processes.append(process)
+            work_remote.close()
+
+        self.remotes[0].send(("get_spaces", None))
+        observation_space, action_space = self.remotes[0].recv()
+        super().__init__(n_envs, observation_space, action_space)
+
+        self.n_steps = n_steps
+        self.array_spec = shared_spec(n_steps, n_envs, observation_space, int(action_space.n))
+        self.shared = SharedArrays(self.array_spec)
+        for remote in self.remotes:
+            remote.send(("attach", (self.array_spec, self.shared.names())))
+        for remote in self.remotes:
+            remote.recv()
+        self.t = 0
+        self.closed = False
+
+    def shared_names(self):
+        """Pass to SharedMaskableRolloutBuffer.attach()."""
+        return self.shared.names()
+
+    def reset(self):
+        for env_idx, remote in enumerate(self.remotes):
+            remote.send(("reset", (self._seeds[env_idx], self._options[env_idx])))
+        self.reset_infos = [remote.recv() for remote in self.remotes]
+        self._reset_seeds()
+        self._reset_options()
+        self.t = 0
+        return self.shared["obs"][0]
+
+    def step_async(self, actions):
+        if self.t == self.n_steps:
+            # Wrap around: the bootstrap row becomes the first row of the next rollout
+            self.shared["obs"][0] = self.shared["obs"][self.n_steps]
+            self.shared["mask"][0] = self.shared["mask"][self.n_steps]
+            self.t = 0
+        self.shared["action"][:] = actions
+        for remote in self.remotes:
+            remote.send(("step", self.t))
+        self.waiting = True
+
+    def step_wait(self):
+        infos = [remote.recv() for remote in self.remotes]
+        self.waiting = False
+        t = self.t
+        self.t += 1
+        infos = [info if info is not None else {} for info in infos]
+        return self.shared["obs"][t + 1], self.shared["reward"][t], self.shared["done"][t], infos
+
+    def close(self):
+        if self.closed:
+            return
+        if getattr(self, "waiting", False):
+            for remote in self.remotes:
+                remote.recv()
+        for remote in self.remotes:
+            remote.send(("close", None))
+        for process in self.processes:
+            process.join()
+        # Unlink without unmapping: arrays handed out earlier (e.g. the model's _last_obs,
+        # which model.save() pickles) stay readable until they are garbage collected
+        for block in self.shared.blocks.values():
+            block.unlink()
+        self.closed = True
+
+    def _get_target_remotes(self, indices):
+        indices = self._get_indices(indices)
+        return [self.remotes[i] for i in indices]
+
+    def has_attr(self, attr_name):
+        if attr_name == "action_masks":
+            return True
+        for remote in self.remotes:
+            remote.send(("has_attr", attr_name))
+        return all(remote.recv() for remote in self.remotes)
+
+    def get_attr(self, attr_name, indices=None):
+        target_remotes = self._get_target_remotes(indices)
+        for remote in target_remotes:
+            remote.send(("get_attr", attr_name))
+        return [remote.recv() for remote in target_remotes]
+
+    def set_attr(self, attr_name, value, indices=None):
+        target_remotes = self._get_target_remotes(indices)
+        for remote in target_remotes:
+            remote.send(("set_attr", (attr_name, value)))
+        for remote in target_remotes:
+            remote.recv()
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        if method_name == "action_masks":
+            # Written by the workers together with the observation
+            return [self.shared["mask"][self.t, i] for i in self._get_indices(indices)]
+        target_remotes = self._get_target_remotes(indices)
+        for remote in target_remotes:
+            remote.send(("env_method", (method_name, method_args, method_kwargs)))
+        return [remote.recv() for remote in target_remotes]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        target_remotes = self._get_target_remotes(indices)
+        for remote in target_remotes:
+            remote.send(("is_wrapped", wrapper_class))
+        return [remote.recv() for remote in target_remotes]
+
+
+class SharedMaskableRolloutBuffer(MaskableRolloutBuffer):
+    """
+    MaskableRolloutBuffer whose observations and action masks are the shared arrays
+    of a SharedMemoryVecEnv with the same n_steps. Bind it with
+    model.rollout_buffer.attach(venv.shared_names()) after building or loading the
+    model; the names are not constructor kwargs, so they never end up in a saved
+    model. add() skips the observation copy when the observation already is the
+    buffer row, and get() flattens with views instead of copies. Until attach()
+    (and after detach()) it behaves like a plain MaskableRolloutBuffer.
+    """
+    def __init__(self, *args, shared_names=None, **kwargs):
+        # shared_names is accepted and ignored: models saved by older versions carry it
+        # in rollout_buffer_kwargs, and the blocks it names are long gone
+        self.shared = None
+        self.shared_names = None
+        super().__init__(*args, **kwargs)
+
+    def attach(self, shared_names):
+        """Uses the env's shared arrays from the next reset() (the start of the next rollout)."""
+        self.shared_names = shared_names
+
+    def detach(self):
+        """Closes this process's mapping of the shared arrays and goes back to private storage."""
+        self.shared_names = None
+        if self.shared is None:
+            return
+        # Drop every view first; SharedMemory.close() fails while views exist
+        self.observations = self.action_masks = None
+        shared, self.shared = self.shared, None
+        shared.close()
+        super().reset()
+
+    def reset(self):
+        super().reset()
+        if self.shared_names is None:
+            return
+        if self.shared is None:
+            spec = shared_spec(self.buffer_size, self.n_envs, self.observation_space, self.mask_dims)
+            self.shared = SharedArrays(spec, self.shared_names)
+        self.observations = self.shared["obs"][:self.buffer_size]
+        self.action_masks = self.shared["mask"][:self.buffer_size]
+
+    def add(self, obs, action, reward, episode_start, value, log_prob, action_masks=None):
+        if self.shared is None or not np.may_share_memory(obs, self.observations[self.pos]):
+            super().add(obs, action, reward, episode_start, value, log_prob, action_masks=action_masks)
+            return
+        # The workers wrote this row's observation and mask already; only record the small per-step values
+        if len(log_prob.shape) == 0:
+            log_prob = log_prob.reshape(-1, 1)
+        self.actions[self.pos] = np.array(action).reshape((self.n_envs, self.action_dim))
+        self.rewards[self.pos] = np.array(reward)
+        self.episode_starts[self.pos] = np.array(episode_start)
+        self.values[self.pos] = value.clone().cpu().numpy().flatten()
+        self.log_probs[self.pos] = log_prob.clone().cpu().numpy()
+        self.pos += 1
+        if self.pos == self.buffer_size:
+            self.full = True
+
+    def get(self, batch_size=None):
+        if self.shared is None:
+            yield from super().get(batch_size)
+            return
+        assert self.full, ""
+        total = self.buffer_size * self.n_envs
+        indices = np.random.permutation(total)
+        if not self.generator_ready:
+            # (step, env) -> flat rows without copying; every array uses the same order
+            for tensor in ["observations", "actions", "values", "log_probs", "advantages", "returns", "action_masks"]:
+                arr = self.__dict__[tensor]
+                self.__dict__[tensor] = arr.reshape(total, *arr.shape[2:])
+            self.generator_ready = True
+
+        if batch_size is None:
+            batch_size = total
+        start_idx = 0
+        while start_idx < total:
+            yield self._get_samples(indices[start_idx:start_idx + batch_size])
+            start_idx += batch_size
+
+
+def _bench_steps(venv, steps, seed=0):
+    rng = np.random.default_rng(seed)
+    venv.reset()
+    start = time.perf_counter()
+    for _ in range(steps):
+        masks = np.stack(venv.env_method("action_masks"))
+        actions = [rng.choice(np.flatnonzero(m)) for m in masks]
+        venv.step(np.array(actions))
+    return steps * venv.num_envs / (time.perf_counter() - start)
+
+
+def benchmark(n_envs=8, steps=1000, env_name="p1", opponent="random", compact_obs=False):
+    """Env steps per second (with mask fetch, as MaskablePPO does) for SubprocVecEnv vs SharedMemoryVecEnv."""
+    import importlib
+    from functools import partial
+    from stable_baselines3.common.vec_env import SubprocVecEnv
+    from train_runner import ENV_TYPES
+
+    module_name, class_name = ENV_TYPES[env_name]
+    env_cls = getattr(importlib.import_module(module_name), class_name)
+    env_fns = [partial(env_cls, num_players=4, opponent_model_path=opponent, compact_obs=compact_obs)
+               for _ in range(n_envs)]
+
+    results = {}
+    for label, make in [("subproc", lambda: SubprocVecEnv(env_fns)),
+                        ("shared_memory", lambda: SharedMemoryVecEnv(env_fns, n_steps=steps))]:
+        venv = make()
+        venv.seed(0)
+        _bench_steps(venv, 20)  # warm up the workers
+        venv.seed(0)
+        results[label] = _bench_steps(venv, steps)
+        venv.close()
+        print(f"{label:<14}: {results[label]:8.0f} env steps/s")
+    print(f"Speedup: {results['shared_memory'] / results['subproc']:.2f}x ({n_envs} envs, {steps} steps)")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SharedMemoryVecEnv against SubprocVecEnv")
+    parser.add_argument("--n-envs", type=int, nargs="*", default=[4, 8])
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--env", default="p1")
+    parser.add_argument("--opponent", default="random")
+    parser.add_argument("--compact-obs", action="store_true")
+    args = parser.parse_args()
+    for n_envs in args.n_envs:
+        benchmark(n_envs, args.steps, args.env, args.opponent, args.compact_obs)
+
+
+if __name__ == "__main__":
+    main()
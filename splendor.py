@@ -6,10 +6,9 @@ import glob
 import os
 import json
 import re # Added for validation
-import numpy as np # Keep numpy for obs handling
-from itertools import combinations
 # from sb3_contrib import MaskablePPO # Removed
 from ai_lite import LiteModel # New lightweight engine
+import splendor_features
 from game import Game
 from classdef import Gem, Card, Player # Import Card for type hinting in UI
 from client import Network
@@ -231,7 +230,6 @@ class SplendorApp:
         self.popup_rect = pygame.Rect(260, 150, 480, 400)
         self.popup_buttons = []
         self.reserved_card_rects = []
-        self.combos_3 = list(combinations(range(5), 3))
         self.loaded_model = None
         self.ai_agents = {}
         
@@ -2399,10 +2397,10 @@ class SplendorApp:
         
         if model:
             try:
-                obs = self._get_obs_for_player(p_idx)
-                mask = self._get_action_mask_for_player(p_idx)
+                obs = splendor_features.get_model_obs(self.game, p_idx, model.num_players, model.obs_dim)
+                mask = splendor_features.get_action_mask(self.game, p_idx)
                 action_idx, _ = model.predict(obs, action_masks=mask, deterministic=False)
-                action = self._map_action(int(action_idx), p_idx)
+                action = splendor_features.map_action(int(action_idx), self.game, p_idx)
             except Exception as e:
                 print(f"AI Prediction Error: {e}")
                 action = None # Fallback to random
@@ -2644,109 +2642,6 @@ class SplendorApp:
             pygame.quit()
             sys.exit()
 
-    def _get_action_mask_for_player(self, p_idx):
-        mask = [False] * 52
-        p = self.game.players[p_idx]
-        bank = self.game.bank
-        
-        # --- CASE A: MUST DISCARD (> 10 tokens) ---
-        if p.token_count() > 10:
-            for i in range(6):
-                if p.tokens[i] > 0: mask[46 + i] = True
-            return mask
-
-        # --- CASE B: NORMAL TURN ---
-        # 0-4: Take 2
-        for i in range(5):
-            if bank[i] >= 4: mask[i] = True
-        # 5-14: Take 3
-        for i, combo in enumerate(self.combos_3):
-            if all(bank[c] > 0 for c in combo): mask[5 + i] = True
-        # 15-26: Buy Board
-        for i in range(12):
-            tier, slot = (i // 4) + 1, i % 4
-            if slot < len(self.game.board[tier]) and p.can_buy(self.game.board[tier][slot]):
-                mask[15 + i] = True
-        # 27-29: Buy Reserved
-        for i in range(min(3, len(p.keeped))):
-            if p.can_buy(p.keeped[i]): mask[27 + i] = True
-        # 30-41: Reserve Board
-        if p.can_reserve_card():
-            for i in range(12):
-                tier, slot = (i // 4) + 1, i % 4
-                if slot < len(self.game.board[tier]): mask[30 + i] = True
-        # 42-44: Reserve Deck
-        if p.can_reserve_card():
-            for i in range(3):
-                if len(self.game.decks[i+1]) > 0: mask[42 + i] = True
-        # 45: Pass
-        mask[45] = True
-        return mask
-
-    def _map_action(self, idx, p_idx):
-        p = self.game.players[p_idx]
-        if 0 <= idx <= 4:
-            t = [0]*6; t[idx] = 2
-            return {'type': 'get_token', 'tokens': t}
-        if 5 <= idx <= 14:
-            t = [0]*6
-            for c in self.combos_3[idx - 5]: t[c] = 1
-            return {'type': 'get_token', 'tokens': t}
-        if 15 <= idx <= 26:
-            tier, slot = ((idx - 15) // 4) + 1, (idx - 15) % 4
-            if slot < len(self.game.board[tier]):
-                return {'type': 'buy_card', 'card': self.game.board[tier][slot], 'tier': tier}
-        if 27 <= idx <= 29:
-            slot = idx - 27
-            if slot < len(p.keeped):
-                return {'type': 'buy_reserved', 'card': p.keeped[slot]}
-        if 30 <= idx <= 41:
-            tier, slot = ((idx - 30) // 4) + 1, (idx - 30) % 4
-            if slot < len(self.game.board[tier]):
-                return {'type': 'reserve_card', 'card': self.game.board[tier][slot], 'tier': tier}
-        if 42 <= idx <= 44:
-            return {'type': 'reserve_deck', 'tier': idx - 41}
-        if 46 <= idx <= 51:
-            return {'type': 'discard_token', 'gem_idx': idx - 46}
-        return {'type': 'do_nothing'}
-
-    def _get_obs_for_player(self, p_idx):
-        import numpy as np # Local import if needed
-        obs = []
-        obs.extend(self.game.bank) # 6
-        
-        # Board (84)
-        for t in [1, 2, 3]: 
-            for s in range(4):
-                if s < len(self.game.board[t]):
-                    c = self.game.board[t][s]
-                    obs.extend(c.cost); obs.append(c.points); obs.append(c.gem.value)
-                else: obs.extend([0]*7)
-        
-        # Subject Player (33)
-        p = self.game.players[p_idx]
-        obs.extend(p.tokens); obs.extend(p.card_gem()); obs.append(p.points())
-        for i in range(3):
-            if i < len(p.keeped):
-                c = p.keeped[i]; obs.extend(c.cost); obs.append(c.points); obs.append(c.gem.value)
-            else: obs.extend([0]*7)
-            
-        # Opponents (39) - We must rotate the view so "Opponent 1" is relative
-        # E.g. if p_idx is 1, opponents are 2, 3, 0.
-        num_p = len(self.game.players)
-        for i in range(1, num_p):
-            op_idx = (p_idx + i) % num_p
-            op = self.game.players[op_idx]
-            obs.extend(op.tokens); obs.extend(op.card_gem()); obs.append(op.points()); obs.append(len(op.keeped))
-            
-        # Nobles (25)
-        for i in range(5):
-            if i < len(self.game.tiles): obs.extend(self.game.tiles[i].cost)
-            else: obs.extend([0]*5)
-            
-        obs.extend([0] * (250 - len(obs))) # Pad
-        return np.array(obs, dtype=np.float32)
-
 if __name__ == "__main__":
     app = SplendorApp()
     app.run()
@@ -0,0 +1,209 @@
+import os
+import gymnasium as gym
+from gymnasium import spaces
+import numpy as np
+from game import Game
+import random
+import torch as th
+from sb3_contrib import MaskablePPO
+from stable_baselines3.common.vec_env import DummyVecEnv, VecMonitor
+from env_timing import PhaseTimer
+from compact_obs import make_observation_space
+from obs_layout import model_players
+from rewards import make_reward
+import splendor_features
+
+
+class SplendorEnv(gym.Env):
+    """
+    Splendor environment: the agent plays seat 0, the other seats are played by
+    Random Bots or a loaded Model. The reward comes from a reward scheme
+    (see rewards.py), e.g. reward="p2" or reward="win_only+step_penalty".
+    """
+    metadata = {'render.modes': ['console']}
+
+    def __init__(self, num_players=4, opponent_model_path=None, timing=False, compact_obs=False, reward="p1"):
+        super(SplendorEnv, self).__init__()
+
+        self.num_players = num_players
+        self.compact_obs = compact_obs
+        self.reward_fn = make_reward(reward)
+
+        # Load opponent model if provided
+        self.opponent_model = None
+        if opponent_model_path and opponent_model_path.lower() != "random":
+            # Check if path already includes 'models/' to avoid double prefixing if passed correctly
+            if not opponent_model_path.startswith("models/") and not os.path.isabs(opponent_model_path):
+                 opponent_model_path = f"models/{opponent_model_path}"
+
+            print(f"Loading opponent model from {opponent_model_path}...")
+            try:
+                self.opponent_model = MaskablePPO.load(opponent_model_path)
+                # The opponent reads its own layout and player count, whatever this env uses
+                self.opponent_obs_dim = self.opponent_model.observation_space.shape[0]
+                self.opponent_players = model_players(self.opponent_model)
+                print("Opponent model loaded.")
+            except Exception as e:
+                self.opponent_model = None
+                print(f"Failed to load opponent model: {e}. Falling back to Random.")
+
+        self.action_space = spaces.Discrete(splendor_features.NUM_ACTIONS)
+        # compact_obs: uint8 observations trimmed to the player count (see compact_obs.py)
+        self.observation_space = make_observation_space(num_players, compact=compact_obs)
+
+        # Optional per-phase timing (see env_timing.py); None keeps step() on the fast path
+        self.timer = PhaseTimer() if timing else None
+
+    def reset(self, seed=None, options=None):
+        timer = self.timer
+        if timer: timer.mark()
+        super().reset(seed=seed)
+        # Every episode owns an RNG drawn from the env's seeded stream. It drives the
+        # deck shuffle and all opponent choices, so reset(options={"episode_seed": s})
+        # replays an episode bit-exactly given the same agent actions.
+        if options and "episode_seed" in options:
+            self.episode_seed = options["episode_seed"]
+        else:
+            self.episode_seed = int(self.np_random.integers(2**63 - 1))
+        self.rng = random.Random(self.episode_seed)
+        self.game = Game(p_count=self.num_players, rng=self.rng)
+        self.agent_idx = 0
+        obs = self._get_obs_for_player(self.agent_idx)
+        if timer:
+            timer.lap("reset")
+            timer.resets += 1
+        return obs, {"episode_seed": self.episode_seed}
+
+    def step(self, action_idx):
+        outcome, points_gained = self._play(action_idx)
+        terminated = outcome != 0
+        reward = float(self.reward_fn(np.array([outcome]), np.array([points_gained]), np.array([terminated]))[0])
+        if self.timer: self.timer.lap("reward")
+        obs, info = self._finish_step(terminated)
+        return obs, reward, terminated, False, info
+
+    def _play(self, action_idx):
+        """
+        Plays the agent's move and the opponents' turns up to the agent's next turn.
+        Returns (outcome, points_gained) with outcome +1 agent won, -1 agent lost, 0 running.
+        """
+        timer = self.timer
+        if timer: timer.mark()
+        action = self._map_action(action_idx, self.agent_idx)
+        agent = self.game.players[self.agent_idx]
+        prev_points = agent.points()
+
+        # 1. Execute Agent Action
+        try:
+            winner = self.game.step(action)
+        except:
+            winner = None
+        if timer: timer.lap("agent_step")
+
+        # 2. Opponents' Turns
+        if self.game.curr_player_idx != self.agent_idx:
+            while self.game.curr_player_idx != self.agent_idx and not self.game.game_over:
+                current_p_idx = self.game.curr_player_idx
+
+                if self.opponent_model:
+                    obs = splendor_features.get_model_obs(self.game, current_p_idx, self.opponent_players,
+                                                          self.opponent_obs_dim)
+                    if timer: timer.lap("opp_obs")
+                    mask = self._get_action_mask_for_player(current_p_idx)
+                    if timer: timer.lap("opp_mask")
+                    act_idx = self._sample_opponent_action(obs, mask)
+                    opp_action = self._map_action(act_idx, current_p_idx)
+                else:
+                    opts = self.game.get_valid_actions()
+                    opp_action = self.rng.choice(opts)
+                if timer: timer.lap("opp_predict")
+
+                self.game.step(opp_action)
+                winner = self.game.check_winner()
+                if timer:
+                    timer.lap("opp_apply")
+                    timer.opponent_moves += 1
+
+        outcome = 0
+        if winner:
+            outcome = 1 if winner == agent else -1
+        return outcome, agent.points() - prev_points
+
+    def _finish_step(self, terminated):
+        obs = self._get_obs_for_player(self.agent_idx)
+        timer = self.timer
+        if timer:
+            timer.lap("final_obs")
+            timer.agent_steps += 1
+        info = {"episode_seed": self.episode_seed} if terminated else {}
+        return obs, info
+
+    def _sample_opponent_action(self, obs, mask):
+        """Samples from the opponent policy with the episode RNG instead of torch's global one."""
+        policy = self.opponent_model.policy
+        with th.no_grad():
+            obs_t, _ = policy.obs_to_tensor(obs)
+            dist = policy.get_distribution(obs_t, action_masks=np.asarray(mask))
+            probs = dist.distribution.probs[0].cpu().numpy().astype(np.float64)
+        # Inverse-CDF draw; side='right' can never land on a masked (zero probability) action
+        idx = int(np.searchsorted(np.cumsum(probs), self.rng.random() * probs.sum(), side='right'))
+        return min(idx, int(np.flatnonzero(probs)[-1]))
+
+    def pop_timings(self):
+        """Returns and clears the accumulated phase timings (None if timing is off)."""
+        return self.timer.pop() if self.timer else None
+
+    def action_masks(self):
+        return self._get_action_mask_for_player(self.agent_idx)
+
+    def _get_action_mask_for_player(self, p_idx):
+        return splendor_features.get_action_mask(self.game, p_idx)
+
+    def _map_action(self, idx, p_idx):
+        return splendor_features.map_action(idx, self.game, p_idx)
+
+    def _get_obs_for_player(self, p_idx):
+        return splendor_features.get_obs(self.game, p_idx, compact=self.compact_obs)
+
+
+class SplendorVecEnv(DummyVecEnv):
+    """
+    DummyVecEnv for SplendorEnv instances (unwrapped; use VecMonitor for episode stats).
+    Each step plays all games first and then computes every reward in one call of
+    the reward function on arrays. All envs use the first env's reward scheme.
+    """
+    def __init__(self, env_fns):
+        super().__init__(env_fns)
+        self.reward_fn = self.envs[0].reward_fn
+        self.buf_outcome = np.zeros(self.num_envs, dtype=np.int8)
+        self.buf_points = np.zeros(self.num_envs, dtype=np.float32)
+
+    def step_wait(self):
+        for env_idx, env in enumerate(self.envs):
+            self.buf_outcome[env_idx], self.buf_points[env_idx] = env._play(self.actions[env_idx])
+        terminated = self.buf_outcome != 0
+        self.buf_rews[:] = self.reward_fn(self.buf_outcome, self.buf_points, terminated)
+        self.buf_dones[:] = terminated
+
+        for env_idx, env in enumerate(self.envs):
+            if env.timer: env.timer.mark()
+            obs, info = env._finish_step(terminated[env_idx])
+            info["TimeLimit.truncated"] = False
+            if terminated[env_idx]:
+                # save final observation where user can get it, then reset
+                info["terminal_observation"] = obs
+                obs, self.reset_infos[env_idx] = env.reset()
+            self.buf_infos[env_idx] = info
+            self._save_obs(env_idx, obs)
+        return self._obs_from_buf(), np.copy(self.buf_rews), np.copy(self.buf_dones), list(self.buf_infos)
+
+
+def make_vec_env(n_envs, seed=None, env_cls=SplendorEnv, monitor_file=None, **env_kwargs):
+    """
+    Builds VecMonitor(SplendorVecEnv) with `n_envs` envs; env i is seeded with seed + i.
+    monitor_file is passed to VecMonitor (a directory gives <dir>/monitor.csv).
+    """
+    venv = SplendorVecEnv([lambda: env_cls(**env_kwargs) for _ in range(n_envs)])
+    if seed is not None:
+        venv.seed(seed)
+    return VecMonitor(venv, filename=monitor_file, info_keywords=("episode_seed",))
@@ -0,0 +1,107 @@
+import numpy as np
+from itertools import combinations
+from obs_layout import to_model_layout
+
+# Observation / action-mask / action encoders on Game objects, shared by
+# SplendorEnv and code that works on games directly (search, batched evaluation, ...).
+NUM_ACTIONS = 52
+OBS_SIZE = 250
+COMBOS_3 = list(combinations(range(5), 3))
+
+
+def get_obs(game, p_idx, compact=False):
+    """Observation of player p_idx (padded float32, or uint8 trimmed to the player count if compact)."""
+    obs = []
+    obs.extend(game.bank)
+    for t in [1, 2, 3]:
+        for s in range(4):
+            if s < len(game.board[t]):
+                c = game.board[t][s]
+                obs.extend(c.cost); obs.append(c.points); obs.append(c.gem.value)
+            else: obs.extend([0]*7)
+
+    p = game.players[p_idx]
+    obs.extend(p.tokens); obs.extend(p.card_gem()); obs.append(p.points())
+    for i in range(3):
+        if i < len(p.keeped):
+            c = p.keeped[i]; obs.extend(c.cost); obs.append(c.points); obs.append(c.gem.value)
+        else: obs.extend([0]*7)
+
+    num_p = len(game.players)
+    for i in range(1, num_p):
+        op = game.players[(p_idx + i) % num_p]
+        obs.extend(op.tokens); obs.extend(op.card_gem()); obs.append(op.points()); obs.append(len(op.keeped))
+
+    for i in range(5):
+        if i < len(game.tiles): obs.extend(game.tiles[i].cost)
+        else: obs.extend([0]*5)
+
+    if compact:
+        return np.array(obs, dtype=np.uint8)
+    obs.extend([0] * (OBS_SIZE - len(obs)))
+    return np.array(obs, dtype=np.float32)
+
+
+def get_model_obs(game, p_idx, num_players, obs_dim):
+    """Observation of player p_idx for a model trained for num_players with obs_dim inputs (any game size)."""
+    return to_model_layout(get_obs(game, p_idx, compact=True), num_players, obs_dim)
+
+
+def get_action_mask(game, p_idx):
+    """Boolean mask over the 52 actions for player p_idx."""
+    mask = [False] * NUM_ACTIONS
+    p = game.players[p_idx]
+    bank = game.bank
+
+    if p.token_count() > 10:
+        for i in range(6):
+            if p.tokens[i] > 0: mask[46 + i] = True
+        return mask
+
+    for i in range(5):
+        if bank[i] >= 4: mask[i] = True
+    for i, combo in enumerate(COMBOS_3):
+        if all(bank[c] > 0 for c in combo): mask[5 + i] = True
+    for i in range(12):
+        tier, slot = (i // 4) + 1, i % 4
+        if slot < len(game.board[tier]) and p.can_buy(game.board[tier][slot]):
+            mask[15 + i] = True
+    for i in range(min(3, len(p.keeped))):
+        if p.can_buy(p.keeped[i]): mask[27 + i] = True
+    if p.can_reserve_card():
+        for i in range(12):
+            tier, slot = (i // 4) + 1, i % 4
+            if slot < len(game.board[tier]): mask[30 + i] = True
+        for i in range(3):
+            if len(game.decks[i+1]) > 0: mask[42 + i] = True
+    mask[45] = True
+    return mask
+
+
+def map_action(idx, game, p_idx):
+    """Action index (0-51) -> action dict for Game.step."""
+    p = game.players[p_idx]
+    if 0 <= idx <= 4:
+        t = [0]*6; t[idx] = 2
+        return {'type': 'get_token', 'tokens': t}
+    if 5 <= idx <= 14:
+        t = [0]*6
+        for c in COMBOS_3[idx - 5]: t[c] = 1
+        return {'type': 'get_token', 'tokens': t}
+    if 15 <= idx <= 26:
+        tier, slot = ((idx - 15) // 4) + 1, (idx - 15) % 4
+        if slot < len(game.board[tier]):
+            return {'type': 'buy_card', 'card': game.board[tier][slot], 'tier': tier}
+    if 27 <= idx <= 29:
+        slot = idx - 27
+        if slot < len(p.keeped):
+            return {'type': 'buy_reserved', 'card': p.keeped[slot]}
+    if 30 <= idx <= 41:
+        tier, slot = ((idx - 30) // 4) + 1, (idx - 30) % 4
+        if slot < len(game.board[tier]):
+            return {'type': 'reserve_card', 'card': game.board[tier][slot], 'tier': tier}
+    if 42 <= idx <= 44:
+        return {'type': 'reserve_deck', 'tier': idx - 41}
+    if 46 <= idx <= 51:
+        return {'type': 'discard_token', 'gem_idx': idx - 46}
+    return {'type': 'do_nothing'}
@@ -0,0 +1,349 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+
+from train_runner import DEFAULT_JOB, THREAD_ENV_VARS, final_model_path, job_dirs
+
+DB_NAME = "sweeps.db"
+
+# Example config:
+# {
+#   "name": "lr_sweep",
+#   "base": {"env": "p1", "opponent": "random"},
+#   "space": {"learning_rate": {"log_uniform": [1e-4, 1e-3]}, "n_steps": [1024, 2048],
+#             "ent_coef": [0.0, 0.01], "batch_size": [64, 128]},
+#   "search": "random", "trials": 12, "seed": 0,
+#   "rungs": [50000, 100000, 200000],
+#   "eval_games_per_seat": 10, "min_peers": 3, "max_retries": 1
+# }
+DEFAULT_SWEEP = {
+    "base": {},
+    "space": {},
+    "search": "random",
+    "trials": 8,
+    "seed": 0,
+    "rungs": [50000, 100000, 200000],
+    "eval_games_per_seat": 10,
+    "min_peers": 3,
+    "max_retries": 1,   # times a crashed rung segment is rerun before the trial is marked failed
+}
+
+
+def init_db(db_path):
+    conn = sqlite3.connect(db_path)
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS trials (
+            sweep TEXT NOT NULL,
+            trial TEXT NOT NULL,
+            params TEXT NOT NULL,
+            status TEXT NOT NULL,
+            rungs_done INTEGER NOT NULL DEFAULT 0,
+            failures INTEGER NOT NULL DEFAULT 0,
+            win_rate REAL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (sweep, trial)
+        )
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS rung_results (
+            sweep TEXT NOT NULL,
+            trial TEXT NOT NULL,
+            rung INTEGER NOT NULL,
+            timesteps INTEGER NOT NULL,
+            win_rate REAL NOT NULL,
+            games INTEGER NOT NULL,
+            seconds REAL,
+            PRIMARY KEY (sweep, trial, rung)
+        )
+    ''')
+    # Databases from before retries lack the failures column
+    c.execute("PRAGMA table_info(trials)")
+    if "failures" not in [row[1] for row in c.fetchall()]:
+        c.execute("ALTER TABLE trials ADD COLUMN failures INTEGER NOT NULL DEFAULT 0")
+    conn.commit()
+    return conn
+
+
+def sample_params(space, search, trials, seed):
+    """
+    Returns the list of hyperparameter dicts for a sweep.
+    A space entry is a list of choices, {"uniform": [lo, hi]} or {"log_uniform": [lo, hi]}.
+    search="grid" takes the product of the lists; "random" draws `trials` points.
+    """
+    keys = sorted(space)
+    if search == "grid":
+        for k in keys:
+            if not isinstance(space[k], list):
+                raise ValueError(f"Grid search needs a list of values for '{k}'")
+        return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+    rng = random.Random(seed)
+    points = []
+    for _ in range(trials):
+        params = {}
+        for k in keys:
+            spec = space[k]
+            if isinstance(spec, list):
+                params[k] = rng.choice(spec)
+            elif "uniform" in spec:
+                params[k] = rng.uniform(*spec["uniform"])
+            elif "log_uniform" in spec:
+                lo, hi = spec["log_uniform"]
+                params[k] = math.exp(rng.uniform(math.log(lo), math.log(hi)))
+            else:
+                raise ValueError(f"Unknown search space entry for '{k}': {spec}")
+        points.append(params)
+    return points
+
+
+def register_trials(conn, sweep, retry_failed=False):
+    """
+    Creates the sweep's trials on first run; a resumed sweep reuses the stored ones.
+    With retry_failed, failed trials get a fresh retry budget and continue from their last rung.
+    """
+    c = conn.cursor()
+    c.execute("SELECT COUNT(*) FROM trials WHERE sweep = ?", (sweep["name"],))
+    if c.fetchone()[0] == 0:
+        points = sample_params(sweep["space"], sweep["search"], sweep["trials"], sweep["seed"])
+        for i, params in enumerate(points):
+            c.execute("INSERT INTO trials (sweep, trial, params, status) VALUES (?, ?, ?, 'pending')",
+                      (sweep["name"], f"{sweep['name']}_t{i:03d}", json.dumps(params)))
+    # Trials that were running when the sweep was interrupted continue from their last rung
+    c.execute("UPDATE trials SET status = 'pending' WHERE sweep = ? AND status = 'running'", (sweep["name"],))
+    if retry_failed:
+        c.execute("UPDATE trials SET status = 'pending', failures = 0 WHERE sweep = ? AND status = 'failed'",
+                  (sweep["name"],))
+    conn.commit()
+
+
+def _rung_file(name, rung):
+    _, model_dir = job_dirs(name)
+    return os.path.join(model_dir, f"rung_{rung}.json")
+
+
+def trial_job(sweep, trial, params):
+    job = dict(DEFAULT_JOB)
+    job.update(sweep["base"])
+    job.update(params)
+    job["name"] = trial
+    job["resume"] = True
+    # Rung evaluations replace the per-checkpoint background evaluator
+    job["eval_games_per_seat"] = 0
+    if job["seed"] is None:
+        job["seed"] = sweep["seed"]
+    if job["compact_obs"] is None:
+        job["compact_obs"] = job["num_players"] != 4
+    return job
+
+
+def run_segment(job, rung, timesteps, games_per_seat, eval_seed, threads=None):
+    """
+    Trains `job` up to `timesteps` (continuing from its checkpoint) and plays the
+    fixed-seed match set against random bots. The result goes to models/<name>/rung_<rung>.json.
+    """
+    from train_runner import run_job
+    from checkpoints import atomic_write_json
+    from background_eval import play_match_set
+    from evaluate_models import ModelWrapper
+
+    run_job(dict(job, timesteps=timesteps), threads=threads)
+
+    start = time.time()
+    candidate = ModelWrapper(job["name"], final_model_path(job["name"]))
+    # Every trial plays the same deals, so win rates are directly comparable
+    num_players = job["num_players"]
+    win_rate = play_match_set(candidate, ModelWrapper("random"), games_per_seat, eval_seed, num_players=num_players)
+    result = {"rung": rung, "timesteps": timesteps, "win_rate": win_rate,
+              "games": num_players * games_per_seat, "seconds": round(time.time() - start, 2)}
+    atomic_write_json(_rung_file(job["name"], rung), result)
+    print(f"[rung {rung}] {job['name']} at {timesteps} steps: win rate vs random {win_rate:.2%}")
+
+
+def _spawn_segment(job, rung, sweep, threads):
+    log_dir, _ = job_dirs(job["name"])
+    os.makedirs(log_dir, exist_ok=True)
+
+    child_env = dict(os.environ)
+    for var in THREAD_ENV_VARS:
+        child_env[var] = str(threads)
+
+    segment = {"job": job, "rung": rung, "timesteps": sweep["rungs"][rung],
+               "games_per_seat": sweep["eval_games_per_seat"], "eval_seed": sweep["seed"]}
+    log_file = open(os.path.join(log_dir, "train.log"), "a")
+    cmd = [sys.executable, os.path.abspath(__file__), "--run-segment", json.dumps(segment), "--threads", str(threads)]
+    proc = subprocess.Popen(cmd, stdout=log_file, stderr=subprocess.STDOUT, env=child_env)
+    return proc, log_file
+
+
+def should_stop(conn, sweep_name, trial, rung, win_rate, min_peers):
+    """Median stopping rule: stop if below the median of the other trials at the same rung."""
+    c = conn.cursor()
+    c.execute("SELECT win_rate FROM rung_results WHERE sweep = ? AND rung = ? AND trial != ?",
+              (sweep_name, rung, trial))
+    peers = [row[0] for row in c.fetchall()]
+    if len(peers) < min_peers:
+        return False
+    return win_rate < statistics.median(peers)
+
+
+def record_result(conn, sweep, trial, result):
+    """Stores a rung result and moves the trial to its next state. Returns the new status."""
+    name = sweep["name"]
+    rung = result["rung"]
+    c = conn.cursor()
+    c.execute("INSERT OR REPLACE INTO rung_results (sweep, trial, rung, timesteps, win_rate, games, seconds) "
+              "VALUES (?, ?, ?, ?, ?, ?, ?)",
+              (name, trial, rung, result["timesteps"], result["win_rate"], result["games"], result["seconds"]))
+    if rung + 1 == len(sweep["rungs"]):
+        status = "completed"
+    elif should_stop(conn, name, trial, rung, result["win_rate"], sweep["min_peers"]):
+        status = "stopped"
+    else:
+        status = "pending"
+    c.execute("UPDATE trials SET status = ?, rungs_done = ?, win_rate = ?, updated_at = CURRENT_TIMESTAMP "
+              "WHERE sweep = ? AND trial = ?", (status, rung + 1, result["win_rate"], name, trial))
+    conn.commit()
+    return status
+
+
+def _next_task(conn, sweep_name, busy):
+    """Picks the pending trial to run next: trials further along first, then new ones in order."""
+    c = conn.cursor()
+    c.execute("SELECT trial, params, rungs_done FROM trials WHERE sweep = ? AND status = 'pending' "
+              "ORDER BY rungs_done DESC, trial", (sweep_name,))
+    for trial, params, rungs_done in c.fetchall():
+        if trial not in busy:
+            return trial, json.loads(params), rungs_done
+    return None
+
+
+def run_sweep(sweep, db_path=DB_NAME, cores=None, threads_per_trial=1, retry_failed=False):
+    """
+    Runs (or resumes) a sweep. Each trial trains in rung segments in its own process;
+    at most cores // threads_per_trial segments run at a time. After every rung the
+    trial is evaluated and stopped early if it is below the median of its peers.
+    A segment that crashes is rerun up to max_retries times before the trial is
+    marked failed; retry_failed puts failed trials back in the queue.
+    """
+    cfg = dict(DEFAULT_SWEEP)
+    cfg.update(sweep)
+    sweep = cfg
+    name = sweep["name"]
+    max_parallel = max(1, (cores or os.cpu_count() or 1) // threads_per_trial)
+
+    conn = init_db(db_path)
+    register_trials(conn, sweep, retry_failed)
+    print(f"Sweep '{name}': rungs {sweep['rungs']}, {max_parallel} trial(s) in parallel, "
+          f"{threads_per_trial} thread(s) each")
+
+    running = {}
+    while True:
+        while len(running) < max_parallel:
+            task = _next_task(conn, name, running)
+            if task is None:
+                break
+            trial, params, rung = task
+            rung_file = _rung_file(trial, rung)
+            if os.path.exists(rung_file):
+                # Finished before an interruption but never recorded
+                with open(rung_file) as f:
+                    status = record_result(conn, sweep, trial, json.load(f))
+                print(f"[resume] {trial} rung {rung} -> {status}")
+                continue
+            job = trial_job(sweep, trial, params)
+            conn.execute("UPDATE trials SET status = 'running' WHERE sweep = ? AND trial = ?", (name, trial))
+            conn.commit()
+            proc, log_file = _spawn_segment(job, rung, sweep, threads_per_trial)
+            running[trial] = (proc, log_file, rung, time.time())
+            print(f"[start] {trial} rung {rung} ({sweep['rungs'][rung]} steps) {params}")
+
+        if not running:
+            break
+
+        for trial, (proc, log_file, rung, started) in list(running.items()):
+            code = proc.poll()
+            if code is None:
+                continue
+            log_file.close()
+            del running[trial]
+            elapsed = time.time() - started
+            rung_file = _rung_file(trial, rung)
+            if code != 0 or not os.path.exists(rung_file):
+                c = conn.cursor()
+                c.execute("UPDATE trials SET failures = failures + 1 WHERE sweep = ? AND trial = ?", (name, trial))
+                c.execute("SELECT failures FROM trials WHERE sweep = ? AND trial = ?", (name, trial))
+                failures = c.fetchone()[0]
+                status = "pending" if failures <= sweep["max_retries"] else "failed"
+                c.execute("UPDATE trials SET status = ? WHERE sweep = ? AND trial = ?", (status, name, trial))
+                conn.commit()
+                retry = " (retrying)" if status == "pending" else ""
+                print(f"[fail]  {trial} rung {rung} exited with code {code} after {elapsed:.0f}s{retry}")
+                continue
+            with open(rung_file) as f:
+                result = json.load(f)
+            status = record_result(conn, sweep, trial, result)
+            print(f"[done]  {trial} rung {rung}: win rate {result['win_rate']:.2%} -> {status} ({elapsed:.0f}s)")
+
+        if running:
+            time.sleep(1.0)
+
+    print_results(conn, name)
+    conn.close()
+
+
+def print_results(conn, sweep_name):
+    c = conn.cursor()
+    c.execute("SELECT trial, params, status, rungs_done, win_rate FROM trials WHERE sweep = ? "
+              "ORDER BY rungs_done DESC, win_rate DESC", (sweep_name,))
+    rows = c.fetchall()
+    print(f"\n=== Sweep {sweep_name} ===")
+    print(f"{'Trial':<24} | {'Status':<9} | {'Rungs':<5} | {'Win Rate':<8} | Params")
+    print("-" * 80)
+    for trial, params, status, rungs_done, win_rate in rows:
+        wr = "-" if win_rate is None else f"{win_rate:.2%}"
+        print(f"{trial:<24} | {status:<9} | {rungs_done:<5} | {wr:<8} | {params}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hyperparameter sweep with median early stopping")
+    parser.add_argument("config", nargs="?", help="Sweep JSON (name, base, space, search, trials, rungs, ...)")
+    parser.add_argument("--db", default=DB_NAME, help="SQLite results database")
+    parser.add_argument("--cores", type=int, default=None, help="Core budget (default: all cores)")
+    parser.add_argument("--threads", type=int, default=1, help="Math threads per trial")
+    parser.add_argument("--show", metavar="SWEEP", help="Print the results table of a sweep and exit")
+    parser.add_argument("--retry-failed", action="store_true", help="Requeue failed trials when resuming")
+    parser.add_argument("--run-segment", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_segment:
+        seg = json.loads(args.run_segment)
+        run_segment(seg["job"], seg["rung"], seg["timesteps"], seg["games_per_seat"], seg["eval_seed"],
+                    threads=args.threads)
+        return 0
+
+    if args.show:
+        conn = init_db(args.db)
+        print_results(conn, args.show)
+        conn.close()
+        return 0
+
+    if not args.config:
+        parser.error("a sweep config is required")
+    with open(args.config) as f:
+        sweep = json.load(f)
+    run_sweep(sweep, db_path=args.db, cores=args.cores, threads_per_trial=args.threads,
+              retry_failed=args.retry_failed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
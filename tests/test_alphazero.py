@@ -0,0 +1,31 @@
+import random
+
+import numpy as np
+
+import alphazero
+from splendor_features import NUM_ACTIONS, OBS_SIZE
+
+
+def _params(hidden=8):
+    rng = np.random.default_rng(0)
+    shapes = {"fc0": (OBS_SIZE, hidden), "fc1": (hidden, hidden), "act": (hidden, NUM_ACTIONS), "val": (hidden, 4)}
+    params = {}
+    for name, shape in shapes.items():
+        params[f"{name}_w"] = rng.normal(scale=0.1, size=shape).astype(np.float32)
+        params[f"{name}_b"] = np.zeros(shape[1], dtype=np.float32)
+    return params
+
+
+def test_seeded_self_play_leaves_global_random_alone():
+    random.seed(1)
+    np.random.seed(1)
+    expected = (random.random(), np.random.random())
+    random.seed(1)
+    np.random.seed(1)
+
+    first, _ = alphazero.self_play(_params(), num_games=2, simulations=2, turn_limit=6, seed=3)
+    assert (random.random(), np.random.random()) == expected
+
+    second, _ = alphazero.self_play(_params(), num_games=2, simulations=2, turn_limit=6, seed=3)
+    assert len(first) == len(second)
+    assert all((a[2] == b[2]).all() for a, b in zip(first, second))
@@ -0,0 +1,45 @@
+import io
+import queue
+import random
+
+from sb3_contrib import MaskablePPO
+
+import background_eval
+import evaluate_models
+from splendor_env import SplendorEnv
+
+
+def test_evaluator_loads_in_memory_checkpoint(tmp_path, monkeypatch):
+    model = MaskablePPO("MlpPolicy", SplendorEnv(), n_steps=64, batch_size=64, policy_kwargs={"net_arch": [8]})
+    buf = io.BytesIO()
+    model.save(buf)
+
+    wrappers = []
+
+    class RecordingWrapper(evaluate_models.ModelWrapper):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            wrappers.append(self)
+
+    monkeypatch.setattr(evaluate_models, "ModelWrapper", RecordingWrapper)
+    jobs = queue.Queue()
+    jobs.put((buf.getvalue(), 64, "ckpt_64.zip"))
+    jobs.put(None)
+    config = {"threads": 1, "log_dir": str(tmp_path), "model_dir": str(tmp_path), "seed": 0,
+              "games_per_seat": 1, "turn_limit": 8, "num_players": 4}
+    background_eval._evaluator_main(jobs, config)
+
+    candidate = next(w for w in wrappers if w.name == "ckpt_64")
+    assert not candidate.is_random
+    assert candidate.model is not None
+
+
+def test_match_set_is_reproducible_and_leaves_global_random_alone():
+    random.seed(7)
+    expected = random.random()
+    random.seed(7)
+
+    bot = evaluate_models.ModelWrapper("random")
+    first = background_eval.play_match_set(bot, bot, games_per_seat=2, seed=3, turn_limit=40)
+    assert random.random() == expected
+    assert background_eval.play_match_set(bot, bot, games_per_seat=2, seed=3, turn_limit=40) == first
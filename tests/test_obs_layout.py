@@ -0,0 +1,35 @@
+import random
+
+import numpy as np
+
+import splendor_features
+from game import Game
+from obs_layout import (HEAD_SIZE, NOBLES_SIZE, OPPONENT_SIZE, PADDED_OBS_SIZE, compact_obs_size, remap_players,
+                        to_model_layout)
+
+
+def test_remap_players_keeps_blocks_aligned():
+    game = Game(4, rng=random.Random(0))
+    obs = splendor_features.get_obs(game, 0, compact=True)
+
+    two = remap_players(obs, 2)
+    assert len(two) == compact_obs_size(2)
+    assert (two[:HEAD_SIZE + OPPONENT_SIZE] == obs[:HEAD_SIZE + OPPONENT_SIZE]).all()
+    assert (two[-NOBLES_SIZE:] == obs[-NOBLES_SIZE:]).all()
+
+    back = remap_players(two, 4)
+    assert (back[:HEAD_SIZE + OPPONENT_SIZE] == obs[:HEAD_SIZE + OPPONENT_SIZE]).all()
+    assert not back[HEAD_SIZE + OPPONENT_SIZE:-NOBLES_SIZE].any()
+    assert (back[-NOBLES_SIZE:] == obs[-NOBLES_SIZE:]).all()
+    assert back.dtype == np.uint8
+
+
+def test_padded_model_of_other_player_count_reads_its_own_blocks():
+    game = Game(2, rng=random.Random(0))
+    obs = splendor_features.get_obs(game, 0, compact=True)
+
+    padded = to_model_layout(obs, 4, PADDED_OBS_SIZE)
+    assert padded.dtype == np.float32 and len(padded) == PADDED_OBS_SIZE
+    nobles_at = compact_obs_size(4) - NOBLES_SIZE
+    assert (padded[nobles_at:nobles_at + NOBLES_SIZE] == obs[-NOBLES_SIZE:]).all()
+    assert not padded[compact_obs_size(4):].any()
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from rating_ladder import (ANCHOR, ANCHOR_RATING, K_FACTOR, check_paths, distinct_orders, init_db, place_model,
+                           register_model, update_ratings)
+
+
+def test_duplicate_seats_count_once():
+    ratings = update_ratings({"a": ANCHOR_RATING, ANCHOR: ANCHOR_RATING}, ["a", ANCHOR, ANCHOR, ANCHOR], 0)
+    # One pairwise win over the anchor at equal ratings, worth the full k
+    assert ratings["a"] == pytest.approx(ANCHOR_RATING + K_FACTOR / 2)
+    assert ratings[ANCHOR] == ANCHOR_RATING
+
+
+def test_distinct_losers_share_k():
+    ratings = {m: ANCHOR_RATING for m in "abcd"}
+    update_ratings(ratings, ["a", "b", "c", "d"], 0)
+    # Three pairwise wins worth k / 3 each (applied in turn, so slightly under k / 2 in total)
+    assert ANCHOR_RATING + 0.45 * K_FACTOR < ratings["a"] < ANCHOR_RATING + K_FACTOR / 2
+    assert sum(ratings.values()) == pytest.approx(4 * ANCHOR_RATING)
+
+
+def test_missing_or_changed_model_files_are_reported(tmp_path):
+    conn = init_db(str(tmp_path / "ladder.db"))
+    path = tmp_path / "a.npz"
+    path.write_bytes(b"one")
+    h = register_model(conn, str(path))
+    lineup = sorted([h, ANCHOR, ANCHOR, ANCHOR])
+    assert check_paths(conn, lineup)[1] is None
+
+    path.write_bytes(b"two")
+    assert "changed" in check_paths(conn, lineup)[1]
+    path.unlink()
+    assert "not found" in check_paths(conn, lineup)[1]
+    conn.close()
+
+
+def test_only_distinct_seatings_are_played(tmp_path):
+    assert len(distinct_orders(["a", "b", "c", "d"])) == 24
+    assert len(distinct_orders(["a", ANCHOR, ANCHOR, ANCHOR])) == 4
+
+    path = str(tmp_path / "tiny.npz")
+    np.savez(path, act_w=np.zeros((250, 52), dtype=np.float32), act_b=np.zeros(52, dtype=np.float32))
+    db_path = str(tmp_path / "ladder.db")
+    place_model(path, db_path, games_per_perm=1)
+    conn = init_db(db_path)
+    assert conn.execute("SELECT COUNT(*) FROM games").fetchone()[0] == 4
+    conn.close()
@@ -0,0 +1,38 @@
+import numpy as np
+from sb3_contrib import MaskablePPO
+
+import evaluate_models
+import splendor_features
+from obs_layout import NOBLES_SIZE, PADDED_OBS_SIZE, compact_obs_size
+from splendor_env import SplendorEnv
+
+
+def test_padded_opponent_in_2p_env_reads_the_4p_layout(tmp_path, monkeypatch):
+    # Untagged padded model, like those of the 4-player training scripts
+    path = str(tmp_path / "padded.zip")
+    MaskablePPO("MlpPolicy", SplendorEnv(), n_steps=64, batch_size=64, policy_kwargs={"net_arch": [8]}).save(path)
+    env = SplendorEnv(num_players=2, opponent_model_path=path)
+    assert env.opponent_model is not None and env.opponent_players == 4
+    wrapper = evaluate_models.ModelWrapper("padded", path, backend="lite")
+
+    seen = []
+    sample = env._sample_opponent_action
+
+    def recording_sample(obs, mask):
+        game, p_idx = env.game, env.game.curr_player_idx
+        seen.append((obs, splendor_features.get_model_obs(game, p_idx, wrapper.num_players, wrapper.obs_dim),
+                     [t.cost for t in game.tiles]))
+        return sample(obs, mask)
+
+    monkeypatch.setattr(env, "_sample_opponent_action", recording_sample)
+    env.reset(seed=0)
+    env.step(45)
+
+    obs, wrapper_obs, nobles = seen[0]
+    assert obs.shape == (PADDED_OBS_SIZE,) and (obs == wrapper_obs).all()
+    # Nobles sit after three opponent blocks, the missing two opponents are empty
+    nobles_at = compact_obs_size(4) - NOBLES_SIZE
+    expected = np.zeros(NOBLES_SIZE)
+    expected[:len(nobles) * 5] = np.ravel(nobles)[:NOBLES_SIZE]
+    assert (obs[nobles_at:nobles_at + NOBLES_SIZE] == expected).all()
+    assert not obs[compact_obs_size(2) - NOBLES_SIZE:nobles_at].any()
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+
+import sweep
+
+
+def _crashing_segment(job, rung, sweep_cfg, threads):
+    proc = subprocess.Popen([sys.executable, "-c", "raise SystemExit(1)"])
+    return proc, open(os.devnull, "w")
+
+
+def _statuses(db_path):
+    conn = sweep.init_db(db_path)
+    rows = dict(conn.execute("SELECT trial, status || '/' || failures FROM trials").fetchall())
+    conn.close()
+    return rows
+
+
+def test_crashed_trials_are_retried_then_failed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(sweep, "_spawn_segment", _crashing_segment)
+    cfg = {"name": "crash", "space": {"ent_coef": [0.0]}, "search": "grid", "max_retries": 2, "rungs": [64]}
+    db_path = str(tmp_path / "sweeps.db")
+
+    sweep.run_sweep(cfg, db_path=db_path, cores=1)
+    assert _statuses(db_path) == {"crash_t000": "failed/3"}
+
+    sweep.run_sweep(dict(cfg, max_retries=0), db_path=db_path, cores=1, retry_failed=True)
+    assert _statuses(db_path) == {"crash_t000": "failed/1"}
@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+
+from trajectory_recorder import TrajectoryDataset, TrajectoryRecorder
+
+
+def _record(out_dir, num_players):
+    recorder = TrajectoryRecorder(str(out_dir), obs_dim=250, shard_size=4, metadata={"num_players": num_players})
+    recorder.add(np.zeros(250, dtype=np.float32), np.ones(52, dtype=bool), 45, 0.0, True)
+    recorder.close()
+
+
+def test_mixed_player_counts_are_rejected(tmp_path):
+    _record(tmp_path / "a", 4)
+    _record(tmp_path / "b", 4)
+    assert TrajectoryDataset(str(tmp_path)).num_players == 4
+
+    _record(tmp_path / "c", 2)
+    with pytest.raises(ValueError, match="2-player"):
+        TrajectoryDataset(str(tmp_path))
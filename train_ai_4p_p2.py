@@ -1,6 +1,7 @@
 from splendor_env_4p_p2 import SplendorEnv4PP2
 from sb3_contrib import MaskablePPO
 from stable_baselines3.common.monitor import Monitor
+from checkpoints import CheckpointCallback
 import os
 
 # 0. Configuration
@@ -56,10 +57,15 @@ else:
         verbose=1,
         tensorboard_log=log_dir
     )
+# Player count, saved with the model (model_converter tags the .npz with it)
+model.num_players = 4
+
 # 3. Train
 print(f"Starting training: {model_name} (against {opp_name})")
 TIMESTEPS = 200000
-model.learn(total_timesteps=TIMESTEPS)
+# Periodic checkpoints so a crash does not lose the whole run
+checkpoint_cb = CheckpointCallback(f"models/{model_name}_checkpoints", save_freq=20000)
+model.learn(total_timesteps=TIMESTEPS, callback=checkpoint_cb)
 
 # 4. Save Model
 model.save(f"models/{model_name}")
@@ -0,0 +1,397 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Environment classes by short name (imported lazily so thread limits apply before torch loads)
+ENV_TYPES = {
+    "p1": ("splendor_env_4p_p1", "SplendorEnv4PP1"),
+    "p2": ("splendor_env_4p_p2", "SplendorEnv4PP2"),
+}
+
+# Same defaults as train_ai_4p_p1.py / train_ai_4p_p2.py
+DEFAULT_JOB = {
+    "name": None,
+    "env": "p1",
+    "opponent": "random",
+    "start_model": None,
+    "timesteps": 200000,
+    "seed": None,
+    "learning_rate": 3e-4,
+    "batch_size": 64,
+    "n_steps": 2048,
+    "ent_coef": 0.01,
+    "gamma": 0.99,
+    "checkpoint_freq": 20000,
+    "keep_checkpoints": 3,
+    "keep_every": None,
+    "resume": True,
+    "eval_games_per_seat": 10,
+    "env_timing": False,
+    "num_players": 4,
+    "compact_obs": None,  # None: tight layout for 2/3 players, padded for 4 (see compact_obs.py)
+    "reward": None,
+    "n_envs": 1,
+    "vec_env": "dummy",
+    "record_dir": None,
+    "bc_data": None,
+    "bc_epochs": 5,
+}
+
+THREAD_ENV_VARS = ["OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"]
+
+
+def job_dirs(name):
+    """Returns (log_dir, model_dir) owned by a single job."""
+    return f"logs/logs_{name}/", f"models/{name}/"
+
+
+def final_model_path(name):
+    """Where a job's trained model ends up: models/<name>.zip, next to the baseline models."""
+    return f"models/{name}.zip"
+
+
+def resolve_model_path(name):
+    """Accepts 'ai_4p_p1', 'ai_4p_p1.zip' or 'models/ai_4p_p1.zip' style names."""
+    path = name if name.endswith(".zip") else f"{name}.zip"
+    if not os.path.exists(path) and not path.startswith("models/"):
+        path = f"models/{path}"
+    return path
+
+
+def expand_jobs(config):
+    """
+    Turns a config dict into a flat list of job dicts.
+    Config format:
+        {"defaults": {...}, "jobs": [{"name": "a", "seeds": [0, 1]}, ...]}
+    A job with "seeds" is expanded into one job per seed named '<name>_s<seed>'.
+    """
+    defaults = dict(DEFAULT_JOB)
+    defaults.update(config.get("defaults", {}))
+
+    jobs = []
+    for i, spec in enumerate(config.get("jobs", [])):
+        base = dict(defaults)
+        base.update(spec)
+        if not base["name"]:
+            base["name"] = f"ai_{base['num_players']}p_{base['env']}_job{i}"
+        if base["compact_obs"] is None:
+            base["compact_obs"] = base["num_players"] != 4
+        if base["env"] not in ENV_TYPES:
+            raise ValueError(f"Unknown env type '{base['env']}' (expected one of {list(ENV_TYPES)})")
+
+        seeds = base.pop("seeds", None)
+        if seeds:
+            for seed in seeds:
+                job = dict(base)
+                job["seed"] = seed
+                job["name"] = f"{base['name']}_s{seed}"
+                jobs.append(job)
+        else:
+            jobs.append(base)
+
+    names = [j["name"] for j in jobs]
+    if len(names) != len(set(names)):
+        raise ValueError(f"Job names must be unique: {names}")
+    return jobs
+
+
+def build_env(job, log_dir, resuming=False):
+    import importlib
+    from stable_baselines3.common.monitor import Monitor
+
+    module_name, class_name = ENV_TYPES[job["env"]]
+    env_cls = getattr(importlib.import_module(module_name), class_name)
+    env_kwargs = {"num_players": job["num_players"], "opponent_model_path": job["opponent"], "timing": job["env_timing"],
+                  "compact_obs": job["compact_obs"]}
+    if job["reward"]:
+        # Reward scheme override, e.g. "win_loss+step_penalty" (see rewards.py)
+        env_kwargs["reward"] = job["reward"]
+
+    if job["n_envs"] > 1:
+        if job["record_dir"]:
+            raise ValueError("record_dir is only supported with n_envs=1")
+        # A resumed run writes a second monitor file next to the first (load_results reads both)
+        monitor_file = os.path.join(log_dir, f"resume_{int(time.time())}") if resuming else log_dir
+        if job["vec_env"] == "shm":
+            # One process per game, observations passed through shared memory (see shm_vec_env.py)
+            from functools import partial
+            from stable_baselines3.common.vec_env import VecMonitor
+            from shm_vec_env import SharedMemoryVecEnv
+            venv = SharedMemoryVecEnv([partial(env_cls, **env_kwargs) for _ in range(job["n_envs"])],
+                                      n_steps=job["n_steps"])
+            if job["seed"] is not None:
+                venv.seed(job["seed"])
+            return VecMonitor(venv, filename=monitor_file, info_keywords=("episode_seed",))
+        # Several games stepped together in this process, rewards computed for all of them at once
+        from splendor_env import make_vec_env
+        return make_vec_env(job["n_envs"], seed=job["seed"], env_cls=env_cls, monitor_file=monitor_file,
+                            **env_kwargs)
+
+    env = env_cls(**env_kwargs)
+    if job["record_dir"]:
+        from trajectory_recorder import TrajectoryRecorder, RecordTrajectories
+        space = env.observation_space
+        recorder = TrajectoryRecorder(
+            os.path.join(job["record_dir"], job["name"]), obs_dim=space.shape[0], obs_dtype=space.dtype,
+            metadata={"source": "training", "env": job["env"], "num_players": job["num_players"], "compact_obs": job["compact_obs"]},
+        )
+        env = RecordTrajectories(env, recorder)
+    # Keep the episode log of the interrupted run when resuming.
+    # monitor.csv gets each episode's seed, so any episode can be replayed for profiling.
+    return Monitor(env, log_dir, override_existing=not resuming, info_keywords=("episode_seed",))
+
+
+def rollout_buffer_args(job, env):
+    """rollout_buffer_class (and kwargs) matching the job's observation layout and vec env."""
+    if job["n_envs"] > 1 and job["vec_env"] == "shm":
+        # The buffer stores observations in the env's shared arrays (bound by bind_rollout_buffer).
+        # Empty kwargs also replace the shared_names saved in checkpoints of older versions.
+        from shm_vec_env import SharedMaskableRolloutBuffer
+        return {"rollout_buffer_class": SharedMaskableRolloutBuffer, "rollout_buffer_kwargs": {}}
+    if job["compact_obs"]:
+        from compact_obs import CompactMaskableRolloutBuffer
+        return {"rollout_buffer_class": CompactMaskableRolloutBuffer}
+    return {}
+
+
+def bind_rollout_buffer(model, env):
+    """Points a shared-memory rollout buffer at the vec env's arrays; the names are never saved with the model."""
+    from shm_vec_env import SharedMaskableRolloutBuffer
+    if isinstance(model.rollout_buffer, SharedMaskableRolloutBuffer):
+        model.rollout_buffer.attach(env.venv.shared_names())
+
+
+def build_model(job, env, log_dir):
+    from sb3_contrib import MaskablePPO
+
+    hparams = {
+        "learning_rate": job["learning_rate"],
+        "batch_size": job["batch_size"],
+        "n_steps": job["n_steps"],
+        "ent_coef": job["ent_coef"],
+        "gamma": job["gamma"],
+    }
+    hparams.update(rollout_buffer_args(job, env))
+
+    if job["start_model"]:
+        start_path = resolve_model_path(job["start_model"])
+        print(f"Loading starting weights from {start_path}...")
+        try:
+            model = MaskablePPO.load(start_path, env=env, verbose=1, tensorboard_log=log_dir, **hparams)
+            if job["seed"] is not None:
+                model.set_random_seed(job["seed"])
+            return model
+        except Exception as e:
+            print(f"Failed to load weights: {e}. Starting from scratch.")
+
+    print("Initializing agent from scratch...")
+    return MaskablePPO("MlpPolicy", env, verbose=1, tensorboard_log=log_dir, seed=job["seed"], **hparams)
+
+
+def run_job(job, threads=None):
+    """
+    Trains a single job in the current process.
+    If the job has a checkpoint and "resume" is set, training continues from it
+    up to job["timesteps"]; raising "timesteps" in the config extends a finished run.
+    """
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    from sb3_contrib import MaskablePPO
+    from checkpoints import CheckpointCallback, latest_checkpoint
+    from background_eval import BackgroundEvalCallback
+    from env_timing import EnvTimingCallback
+
+    name = job["name"]
+    log_dir, model_dir = job_dirs(name)
+    ckpt_dir = os.path.join(model_dir, "checkpoints")
+    os.makedirs(log_dir, exist_ok=True)
+    os.makedirs(model_dir, exist_ok=True)
+
+    resume_path = latest_checkpoint(ckpt_dir) if job["resume"] else None
+    env = build_env(job, log_dir, resuming=bool(resume_path))
+    if resume_path:
+        print(f"Resuming from checkpoint {resume_path}...")
+        model = MaskablePPO.load(resume_path, env=env, verbose=1, tensorboard_log=log_dir,
+                                 **rollout_buffer_args(job, env))
+    else:
+        if job["bc_data"] and not job["start_model"]:
+            # Supervised warm start from recorded games, then PPO continues from those weights
+            from pretrain_bc import pretrain
+            bc_path = os.path.join(model_dir, "bc")
+            pretrain(job["bc_data"], bc_path, epochs=job["bc_epochs"], seed=job["seed"] or 0)
+            job = dict(job, start_model=bc_path)
+        model = build_model(job, env, log_dir)
+    # Saved with the model and its checkpoints; model_converter tags the .npz with it
+    model.num_players = job["num_players"]
+    bind_rollout_buffer(model, env)
+
+    checkpoint_cb = CheckpointCallback(
+        ckpt_dir,
+        save_freq=job["checkpoint_freq"],
+        keep_last=job["keep_checkpoints"],
+        keep_every=job["keep_every"],
+    )
+    callbacks = [checkpoint_cb]
+    if job["eval_games_per_seat"]:
+        # Evaluation runs in its own single-threaded process fed by each checkpoint
+        eval_cb = BackgroundEvalCallback(log_dir, model_dir, games_per_seat=job["eval_games_per_seat"],
+                                         seed=job["seed"] or 0, num_players=job["num_players"])
+        checkpoint_cb.on_save.append(eval_cb.on_checkpoint)
+        callbacks.append(eval_cb)
+    if job["env_timing"]:
+        callbacks.append(EnvTimingCallback())
+
+    remaining = job["timesteps"] - model.num_timesteps
+    print(f"Starting training: {name} (env={job['env']}, against {job['opponent']}, seed={job['seed']})")
+    if remaining > 0:
+        # reset_num_timesteps=False keeps the step counter, so the schedule ends at job["timesteps"]
+        model.learn(total_timesteps=remaining, callback=callbacks, reset_num_timesteps=not resume_path)
+    else:
+        print(f"Already trained for {model.num_timesteps} timesteps, nothing to do.")
+
+    if hasattr(model.rollout_buffer, "detach"):
+        model.rollout_buffer.detach()
+    env.close()
+
+    # Saved where opponent / start_model names are looked up (see resolve_model_path)
+    save_path = final_model_path(name)
+    model.save(save_path)
+    print(f"\nTraining finished. Model saved as {save_path}")
+
+
+def _spawn_job(job, threads):
+    log_dir, _ = job_dirs(job["name"])
+    os.makedirs(log_dir, exist_ok=True)
+
+    child_env = dict(os.environ)
+    for var in THREAD_ENV_VARS:
+        child_env[var] = str(threads)
+
+    log_file = open(os.path.join(log_dir, "train.log"), "a")
+    cmd = [sys.executable, os.path.abspath(__file__), "--run-job", json.dumps(job), "--threads", str(threads)]
+    proc = subprocess.Popen(cmd, stdout=log_file, stderr=subprocess.STDOUT, env=child_env)
+    return proc, log_file
+
+
+def launch_jobs(jobs, max_parallel=None, threads_per_job=1):
+    """
+    Runs jobs as separate processes, at most `max_parallel` at a time.
+    Each process is limited to `threads_per_job` math threads so parallel jobs
+    do not oversubscribe the cores. Returns the list of failed job names.
+    """
+    if not max_parallel:
+        max_parallel = max(1, (os.cpu_count() or 1) // threads_per_job)
+
+    pending = list(jobs)
+    running = []
+    failed = []
+    print(f"Launching {len(jobs)} job(s): {max_parallel} in parallel, {threads_per_job} thread(s) each")
+
+    while pending or running:
+        while pending and len(running) < max_parallel:
+            job = pending.pop(0)
+            proc, log_file = _spawn_job(job, threads_per_job)
+            running.append((job, proc, log_file, time.time()))
+            print(f"[start] {job['name']} (pid {proc.pid}) -> logs/logs_{job['name']}/train.log")
+
+        for entry in running[:]:
+            job, proc, log_file, started = entry
+            code = proc.poll()
+            if code is None:
+                continue
+            log_file.close()
+            running.remove(entry)
+            elapsed = time.time() - started
+            if code == 0:
+                print(f"[done]  {job['name']} in {elapsed:.0f}s")
+            else:
+                print(f"[fail]  {job['name']} exited with code {code} after {elapsed:.0f}s")
+                failed.append(job["name"])
+
+        if running:
+            time.sleep(1.0)
+
+    return failed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Splendor training runner")
+    parser.add_argument("--config", help="JSON file with 'defaults' and 'jobs' entries")
+    parser.add_argument("--name", help="Base name for the trained model")
+    parser.add_argument("--env", choices=list(ENV_TYPES), default=DEFAULT_JOB["env"])
+    parser.add_argument("--opponent", default=DEFAULT_JOB["opponent"], help="Opponent model name or 'random'")
+    parser.add_argument("--start-model", default=None, help="Model to load starting weights from")
+    parser.add_argument("--timesteps", type=int, default=DEFAULT_JOB["timesteps"])
+    parser.add_argument("--seeds", type=int, nargs="*", default=None, help="One job is launched per seed")
+    parser.add_argument("--checkpoint-freq", type=int, default=DEFAULT_JOB["checkpoint_freq"],
+                        help="Save a checkpoint every N timesteps (0 = only at the end)")
+    parser.add_argument("--keep-checkpoints", type=int, default=DEFAULT_JOB["keep_checkpoints"])
+    parser.add_argument("--no-resume", action="store_true", help="Ignore existing checkpoints")
+    parser.add_argument("--eval-games", type=int, default=DEFAULT_JOB["eval_games_per_seat"],
+                        help="Background evaluation games per seat for each checkpoint (0 = off)")
+    parser.add_argument("--parallel", type=int, default=None, help="Max concurrent jobs (default: cores / threads)")
+    parser.add_argument("--threads", type=int, default=1, help="Math threads per job")
+    parser.add_argument("--players", type=int, choices=[2, 3, 4], default=DEFAULT_JOB["num_players"],
+                        help="Players per game (2/3-player jobs default to the tight observation layout)")
+    parser.add_argument("--compact-obs", action="store_true", default=None,
+                        help="uint8 observations trimmed to the player count")
+    parser.add_argument("--bc-data", default=None, help="Behavior-cloning pretraining data (recorded trajectories)")
+    parser.add_argument("--record-dir", default=None, help="Record the agent's transitions under <dir>/<name>")
+    parser.add_argument("--env-timing", action="store_true", help="Log per-phase env timings to TensorBoard")
+    parser.add_argument("--reward", default=None, help="Reward scheme override, e.g. p2 or win_loss+step_penalty")
+    parser.add_argument("--n-envs", type=int, default=DEFAULT_JOB["n_envs"], help="Games stepped together per job")
+    parser.add_argument("--vec-env", choices=["dummy", "shm"], default=DEFAULT_JOB["vec_env"],
+                        help="With --n-envs > 1: step games in-process (dummy) or in shared-memory workers (shm)")
+    parser.add_argument("--run-job", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.run_job:
+        run_job(json.loads(args.run_job), threads=args.threads)
+        return 0
+
+    if args.config:
+        with open(args.config) as f:
+            config = json.load(f)
+    else:
+        spec = {
+            "name": args.name or f"ai_{args.players}p_{args.env}_new",
+            "env": args.env,
+            "opponent": args.opponent,
+            "start_model": args.start_model,
+            "timesteps": args.timesteps,
+            "checkpoint_freq": args.checkpoint_freq,
+            "keep_checkpoints": args.keep_checkpoints,
+            "resume": not args.no_resume,
+            "eval_games_per_seat": args.eval_games,
+            "env_timing": args.env_timing,
+            "num_players": args.players,
+            "compact_obs": args.compact_obs,
+            "reward": args.reward,
+            "n_envs": args.n_envs,
+            "vec_env": args.vec_env,
+            "record_dir": args.record_dir,
+            "bc_data": args.bc_data,
+        }
+        if args.seeds:
+            spec["seeds"] = args.seeds
+        config = {"jobs": [spec]}
+
+    jobs = expand_jobs(config)
+    failed = launch_jobs(jobs, max_parallel=args.parallel, threads_per_job=args.threads)
+    if failed:
+        print(f"\n{len(failed)} job(s) failed: {failed}")
+        return 1
+    print("\nAll jobs finished.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
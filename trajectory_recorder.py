@@ -0,0 +1,216 @@
+import json
+import os
+import gymnasium as gym
+import numpy as np
+
+INDEX_FILE = "index.json"
+FIELDS = ["obs", "mask", "action", "reward", "done"]
+
+
+def _shard_file(out_dir, shard_id, field):
+    return os.path.join(out_dir, f"shard_{shard_id:05d}_{field}.npy")
+
+
+class TrajectoryRecorder:
+    """
+    Appends (obs, mask, action, reward, done) transitions into fixed-size .npy
+    shards opened as memory maps. index.json lists the finished shards and how
+    many rows each holds; it is rewritten whenever a shard is completed and on
+    close(), so a crash only loses the shard that was being filled.
+    Recording into a directory that already has an index continues after its shards.
+    """
+    def __init__(self, out_dir, obs_dim, obs_dtype=np.float32, n_actions=52, shard_size=100_000, metadata=None):
+        self.out_dir = out_dir
+        self.obs_dim = obs_dim
+        self.obs_dtype = np.dtype(obs_dtype)
+        self.n_actions = n_actions
+        self.shard_size = shard_size
+        os.makedirs(out_dir, exist_ok=True)
+
+        self.index = {
+            "obs_dim": obs_dim,
+            "obs_dtype": self.obs_dtype.name,
+            "n_actions": n_actions,
+            "shard_size": shard_size,
+            "metadata": metadata or {},
+            "shards": [],
+        }
+        index_path = os.path.join(out_dir, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                old = json.load(f)
+            if old["obs_dim"] != obs_dim or old["obs_dtype"] != self.obs_dtype.name:
+                raise ValueError(f"{out_dir} holds {old['obs_dtype']} x {old['obs_dim']} observations, "
+                                 f"cannot append {self.obs_dtype.name} x {obs_dim}")
+            self.index["shards"] = old["shards"]
+
+        self.arrays = None
+        self.count = 0
+
+    def _open_shard(self):
+        shard_id = len(self.index["shards"])
+        specs = {
+            "obs": (self.obs_dtype, (self.shard_size, self.obs_dim)),
+            "mask": (np.bool_, (self.shard_size, self.n_actions)),
+            "action": (np.int16, (self.shard_size,)),
+            "reward": (np.float32, (self.shard_size,)),
+            "done": (np.bool_, (self.shard_size,)),
+        }
+        self.arrays = {
+            field: np.lib.format.open_memmap(_shard_file(self.out_dir, shard_id, field), mode="w+",
+                                             dtype=dtype, shape=shape)
+            for field, (dtype, shape) in specs.items()
+        }
+        self.count = 0
+
+    def add(self, obs, mask, action, reward, done):
+        if self.arrays is None:
+            self._open_shard()
+        i = self.count
+        self.arrays["obs"][i] = obs
+        self.arrays["mask"][i] = mask
+        self.arrays["action"][i] = action
+        self.arrays["reward"][i] = reward
+        self.arrays["done"][i] = done
+        self.count += 1
+        if self.count == self.shard_size:
+            self._finish_shard()
+
+    def _finish_shard(self):
+        for arr in self.arrays.values():
+            arr.flush()
+        self.index["shards"].append({"id": len(self.index["shards"]), "count": self.count})
+        self.arrays = None
+        self.count = 0
+        self._write_index()
+
+    def _write_index(self):
+        path = os.path.join(self.out_dir, INDEX_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.index, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def close(self):
+        """Finishes the current (possibly partial) shard."""
+        if self.arrays is not None and self.count > 0:
+            self._finish_shard()
+        self.arrays = None
+
+    def __len__(self):
+        return sum(s["count"] for s in self.index["shards"]) + self.count
+
+
+class RecordTrajectories(gym.Wrapper):
+    """
+    Gym wrapper that records the agent's transitions of a SplendorEnv4PP* env.
+    The action mask is cached between action_masks() and step(), so MaskablePPO
+    does not pay for it twice.
+    """
+    def __init__(self, env, recorder):
+        super().__init__(env)
+        self.recorder = recorder
+        self._last_obs = None
+        self._last_mask = None
+
+    def reset(self, **kwargs):
+        obs, info = self.env.reset(**kwargs)
+        self._last_obs = obs
+        self._last_mask = None
+        return obs, info
+
+    def action_masks(self):
+        if self._last_mask is None:
+            self._last_mask = self.env.unwrapped.action_masks()
+        return self._last_mask
+
+    def step(self, action):
+        mask = self.action_masks()
+        obs, reward, terminated, truncated, info = self.env.step(action)
+        self.recorder.add(self._last_obs, mask, int(action), reward, terminated or truncated)
+        self._last_obs = obs
+        self._last_mask = None
+        return obs, reward, terminated, truncated, info
+
+    def close(self):
+        self.recorder.close()
+        super().close()
+
+
+def _num_players(index):
+    """Player count of a recording (untagged recordings are 4-player)."""
+    return index.get("metadata", {}).get("num_players", 4)
+
+
+class TrajectoryDataset:
+    """
+    Reads shards written by TrajectoryRecorder. `root` may be a recorder directory
+    or any parent of several (e.g. one per training job); every index.json below
+    it is picked up. Shards are opened as read-only memory maps, and a minibatch
+    only touches the rows it samples.
+    """
+    def __init__(self, root):
+        self.shards = []
+        self.info = None
+        for dirpath, _, files in sorted(os.walk(root)):
+            if INDEX_FILE not in files:
+                continue
+            with open(os.path.join(dirpath, INDEX_FILE)) as f:
+                index = json.load(f)
+            if self.info is None:
+                self.info = index
+            elif (index["obs_dim"], index["obs_dtype"]) != (self.info["obs_dim"], self.info["obs_dtype"]):
+                raise ValueError(f"{dirpath}: observation layout differs from {self.info['obs_dtype']} x "
+                                 f"{self.info['obs_dim']}")
+            elif _num_players(index) != _num_players(self.info):
+                # Padded observations have the same length for every player count, but not the same blocks
+                raise ValueError(f"{dirpath}: recorded {_num_players(index)}-player games, "
+                                 f"others {_num_players(self.info)}-player")
+            for shard in index["shards"]:
+                if shard["count"] > 0:
+                    self.shards.append({"dir": dirpath, "id": shard["id"], "count": shard["count"], "arrays": None})
+        if not self.shards:
+            raise FileNotFoundError(f"No recorded trajectories under {root}")
+
+        self.counts = np.array([s["count"] for s in self.shards])
+        self.offsets = np.concatenate([[0], np.cumsum(self.counts)])
+        self.obs_dim = self.info["obs_dim"]
+        self.obs_dtype = np.dtype(self.info["obs_dtype"])
+        self.metadata = self.info.get("metadata", {})
+        # The same for every recording under root (checked above)
+        self.num_players = _num_players(self.info)
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def _arrays(self, shard_idx):
+        shard = self.shards[shard_idx]
+        if shard["arrays"] is None:
+            shard["arrays"] = {f: np.load(_shard_file(shard["dir"], shard["id"], f), mmap_mode="r") for f in FIELDS}
+        return shard["arrays"]
+
+    def gather(self, indices):
+        """Returns a dict of arrays for global row indices (rows are read in sorted order)."""
+        indices = np.sort(np.asarray(indices))
+        shard_ids = np.searchsorted(self.offsets, indices, side="right") - 1
+        parts = {f: [] for f in FIELDS}
+        for shard_idx in np.unique(shard_ids):
+            local = indices[shard_ids == shard_idx] - self.offsets[shard_idx]
+            arrays = self._arrays(shard_idx)
+            for f in FIELDS:
+                parts[f].append(arrays[f][local])
+        return {f: np.concatenate(parts[f]) for f in FIELDS}
+
+    def iter_minibatches(self, batch_size, num_batches=None, seed=None):
+        """Yields uniformly sampled minibatches forever (or `num_batches` of them)."""
+        rng = np.random.default_rng(seed)
+        n = 0
+        while num_batches is None or n < num_batches:
+            yield self.gather(rng.choice(len(self), size=min(batch_size, len(self)), replace=False))
+            n += 1
+
+    def iter_epoch(self, batch_size, seed=None, indices=None):
+        """Yields minibatches that cover every row (or every row in `indices`) exactly once, in random order."""
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(len(self) if indices is None else np.asarray(indices))
+        for start in range(0, len(order), batch_size):
+            yield self.gather(order[start:start + batch_size])